@@ -0,0 +1,40 @@
+{
+    'name': 'WML ITSM',
+    'summary': 'Server-side helpers for the WestMetro ITSM digests and automations',
+    'description': """
+Support models called from the ITSM server actions created by the
+itsm_*.py setup scripts:
+
+* wml.itsm.digest.renderer - renders the Jinja digest mail templates,
+  compiling each template once per write_date.
+* wml.itsm.metric.daily - nightly snapshot of opened, closed and open
+  request counts per day, team, type and priority, read by the weekly
+  management summary instead of scanning request.request.
+* wml.itsm.sla.engine - SLA compliance, breach and warning counts per
+  team and priority, evaluated with NumPy over the whole window at once.
+* wml.itsm.user.load - open requests per assigned user, kept up to date
+  on every create, reassignment, close and unlink. Assignment rules with
+  the least_loaded team choice (the 'ITSM Team Assignment' policy of
+  itsm_teams_v3.py) pick their user from it in one lookup instead of
+  counting open requests. A nightly cron (and every module update)
+  reconciles the counters with the requests.
+* request.request - stored, indexed SLA deadline per open request and a
+  one-minute cron that sends the Escalation Alert for due requests only.
+  Requests already overdue when the module is installed are not alerted.
+""",
+    'version': '16.0.1.0.0',
+    'category': 'Services/Helpdesk',
+    'author': 'WestMetro Limited',
+    'website': 'https://www.westmetrong.com',
+    'license': 'LGPL-3',
+    'depends': ['mail', 'generic_request', 'generic_team', 'generic_assignment', 'generic_assignment_team'],
+    'external_dependencies': {'python': ['jinja2', 'numpy']},
+    'data': [
+        'security/ir.model.access.csv',
+        'data/ir_cron.xml',
+        'data/user_load_data.xml',
+    ],
+    'post_init_hook': 'post_init_hook',
+    'installable': True,
+    'application': False,
+}
@@ -0,0 +1,6 @@
+from . import digest_renderer
+from . import generic_assign_policy_rule
+from . import metric_daily
+from . import request_request
+from . import sla_engine
+from . import user_load
@@ -0,0 +1,63 @@
+from datetime import date, datetime, time, timedelta
+
+from jinja2.runtime import LoopContext
+from jinja2.sandbox import SandboxedEnvironment
+
+from odoo import api, models
+
+# Values whose methods templates may call (strftime, loop.cycle, ...)
+SAFE_OWNERS = (str, int, float, date, datetime, time, timedelta, list, tuple, dict, LoopContext)
+
+
+class DigestSandbox(SandboxedEnvironment):
+    """Sandbox where templates only call methods of plain values and the Jinja globals.
+
+    Records in the values can be read (req.name, req.type_id.name) but
+    none of their methods, nor those of env or cr reached through them,
+    can be called, so a template cannot write, unlink or run SQL.
+    """
+
+    def is_safe_callable(self, obj):
+        if not (isinstance(getattr(obj, '__self__', None), SAFE_OWNERS)
+                or any(obj is helper for helper in self.globals.values())):
+            return False
+        return super().is_safe_callable(obj)
+
+
+# Bodies are HTML and get autoescaped; subjects are plain text
+HTML_ENV = DigestSandbox(autoescape=True)
+TEXT_ENV = DigestSandbox(autoescape=False)
+
+# (db, template id, field, lang) -> (write_date, compiled template).
+# Per process; an edited template gets a new write_date and is recompiled.
+_compiled_cache = {}
+
+
+class DigestRenderer(models.AbstractModel):
+    _name = 'wml.itsm.digest.renderer'
+    _description = 'ITSM Digest Template Renderer'
+
+    @api.model
+    def _compiled(self, template, field):
+        """Return the compiled Jinja template for `template[field]`."""
+        key = (self.env.cr.dbname, template.id, field, self.env.lang)
+        cached = _compiled_cache.get(key)
+        if cached and cached[0] == template.write_date:
+            return cached[1]
+        jinja_env = HTML_ENV if field == 'body_html' else TEXT_ENV
+        compiled = jinja_env.from_string(template[field] or '')
+        _compiled_cache[key] = (template.write_date, compiled)
+        return compiled
+
+    @api.model
+    def render(self, template, values_list):
+        """Render `template` once per values dict.
+
+        Returns a list of (subject, body_html) pairs in the order of
+        `values_list`. The template is parsed at most once per process
+        until its write_date changes, so each call is substitution only.
+        """
+        template.ensure_one()
+        subject = self._compiled(template, 'subject')
+        body = self._compiled(template, 'body_html')
+        return [(subject.render(values), body.render(values)) for values in values_list]
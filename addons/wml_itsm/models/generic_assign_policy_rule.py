@@ -0,0 +1,24 @@
+from odoo import models
+
+
+class GenericAssignPolicyRule(models.Model):
+    _inherit = 'generic.assign.policy.rule'
+
+    def _get_assignee_team(self, record):
+        """Least loaded team member of a request from the wml.itsm.user.load counters.
+
+        The stock least_loaded choice counts the open records of every
+        member on each assignment; for request.request policies the
+        counters give the same answer in one read (as superuser, since
+        portal users may open requests too), in the rule's sort direction.
+        Policies of other models and other choice types are left to
+        generic_assignment_team.
+        """
+        if (self.assign_team_choice_type != 'least_loaded'
+                or self.policy_id.model_id.model != 'request.request'):
+            return super()._get_assignee_team(record)
+        team = self.assign_team_id
+        if not team and self.policy_id.assign_team_field_id:
+            team = record[self.policy_id.assign_team_field_id.name]
+        return self.env['wml.itsm.user.load'].sudo().least_loaded(
+            team.user_ids, self.assign_team_sort_direction or 'asc')
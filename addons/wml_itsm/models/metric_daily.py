@@ -0,0 +1,57 @@
+from datetime import datetime, time, timedelta
+
+from odoo import api, fields, models
+
+GROUPBY = ['team_id', 'type_id', 'priority']
+COUNT_FIELDS = ['opened_count', 'closed_count', 'backlog_count']
+
+
+def _group_key(group):
+    """(team id, type id, priority) of a read_group result row."""
+    return tuple(group[f][0] if isinstance(group[f], (list, tuple)) else group[f] for f in GROUPBY)
+
+
+class MetricDaily(models.Model):
+    _name = 'wml.itsm.metric.daily'
+    _description = 'ITSM Daily Metrics Snapshot'
+    _order = 'date desc, team_id, type_id, priority'
+
+    date = fields.Date(required=True, index=True)
+    team_id = fields.Many2one('generic.team', ondelete='cascade', index=True)
+    type_id = fields.Many2one('request.type', ondelete='cascade')
+    priority = fields.Char()
+    opened_count = fields.Integer('Opened')
+    closed_count = fields.Integer('Closed')
+    backlog_count = fields.Integer('Open at End of Day')
+
+    @api.model
+    def snapshot_day(self, day):
+        """Rebuild the rows of `day` (UTC) from request.request.
+
+        One row per team, type and priority with at least one non-zero
+        count. Rerunning a day replaces its rows. Returns the row count.
+        """
+        start = datetime.combine(day, time.min)
+        end = start + timedelta(days=1)
+        requests = self.env['request.request']
+        rows = {}
+        for column, domain in [
+            ('opened_count', [('create_date', '>=', start), ('create_date', '<', end)]),
+            ('closed_count', [('date_closed', '>=', start), ('date_closed', '<', end)]),
+            ('backlog_count', [('create_date', '<', end),
+                               '|', ('date_closed', '=', False), ('date_closed', '>=', end)]),
+        ]:
+            for group in requests.read_group(domain, GROUPBY, GROUPBY, lazy=False):
+                counts = rows.setdefault(_group_key(group), dict.fromkeys(COUNT_FIELDS, 0))
+                counts[column] = group['__count']
+
+        self.search([('date', '=', day)]).unlink()
+        self.create([dict(zip(GROUPBY, key), date=day, **counts) for key, counts in rows.items()])
+        return len(rows)
+
+    @api.model
+    def _cron_snapshot(self, days=1):
+        """Snapshot the last `days` complete days, oldest first."""
+        today = fields.Date.context_today(self)
+        for offset in range(days, 0, -1):
+            self.snapshot_day(today - timedelta(days=offset))
@@ -0,0 +1,162 @@
+from collections import Counter
+from datetime import timedelta
+
+from odoo import api, fields, models, tools
+
+from .sla_engine import DEFAULT_TARGET_HOURS, RESOLUTION_TARGET_HOURS
+
+PORTAL_URL = 'https://servicedesk.westmetro.ng'
+ESCALATION_TEMPLATE = 'ITSM: Escalation Alert'
+
+# Fields whose change can move a request in or out of a user's open load
+LOAD_FIELDS = {'user_id', 'stage_id', 'closed'}
+
+# Due, unalerted requests in deadline order. Written in SQL so that its
+# conditions imply the predicate of request_request_sla_due_index (the
+# ORM turns sla_alerted = False into "IS NULL OR = false", which the
+# planner cannot match against it) and a tick stays an index scan.
+SLA_DUE_QUERY = """
+    SELECT id FROM request_request
+     WHERE sla_deadline <= %s AND sla_alerted IS NOT TRUE
+     ORDER BY sla_deadline
+     LIMIT %s
+"""
+
+
+def _duration_label(delta):
+    """'2d 3h 15m' style label for a timedelta."""
+    minutes = int(delta.total_seconds() // 60)
+    days, minutes = divmod(minutes, 24 * 60)
+    hours, minutes = divmod(minutes, 60)
+    return ' '.join(f'{value}{unit}' for value, unit in ((days, 'd'), (hours, 'h'), (minutes, 'm'))
+                    if value) or '0m'
+
+
+def _open_by_user(requests):
+    """Counter of the open requests among `requests`, by assigned user id."""
+    return Counter(request.user_id.id for request in requests if request.user_id and not request.closed)
+
+
+class RequestRequest(models.Model):
+    _inherit = 'request.request'
+
+    # Resolution deadline of an open request, cleared once it is closed.
+    # The partial index created in init() keeps pending deadlines in
+    # order, so the breach tick reads only the requests that are due.
+    # A request is alerted at most once: a reopen or a priority change
+    # recomputes its deadline but does not send a second alert.
+    sla_deadline = fields.Datetime(
+        compute='_compute_sla_deadline', store=True, readonly=True, copy=False)
+    sla_alerted = fields.Boolean(
+        default=False, copy=False,
+        help="Escalation alert already sent for this request.")
+
+    def init(self):
+        super().init()
+        tools.create_index(self.env.cr, 'request_request_sla_due_index', self._table, ['sla_deadline'],
+                           where='sla_deadline IS NOT NULL AND sla_alerted IS NOT TRUE')
+
+    # Open requests per user (wml.itsm.user.load) follow every create,
+    # reassignment, close and unlink, so the least_loaded assignment reads
+    # one counter per candidate instead of counting requests.
+    @api.model_create_multi
+    def create(self, vals_list):
+        requests = super().create(vals_list)
+        self.env['wml.itsm.user.load']._apply_deltas(_open_by_user(requests))
+        return requests
+
+    def write(self, vals):
+        if not LOAD_FIELDS.intersection(vals):
+            return super().write(vals)
+        before = _open_by_user(self)
+        result = super().write(vals)
+        deltas = _open_by_user(self)
+        deltas.subtract(before)
+        self.env['wml.itsm.user.load']._apply_deltas(deltas)
+        return result
+
+    def unlink(self):
+        deltas = {user_id: -count for user_id, count in _open_by_user(self).items()}
+        result = super().unlink()
+        self.env['wml.itsm.user.load']._apply_deltas(deltas)
+        return result
+
+    @api.depends('create_date', 'priority', 'closed')
+    def _compute_sla_deadline(self):
+        """Runs only for requests whose priority or closed state changed."""
+        for request in self:
+            if request.closed or not request.create_date:
+                request.sla_deadline = False
+            else:
+                hours = RESOLUTION_TARGET_HOURS.get(request.priority, DEFAULT_TARGET_HOURS)
+                request.sla_deadline = request.create_date + timedelta(hours=hours)
+
+    @api.model
+    def _sla_mark_backlog_alerted(self):
+        """Mark the requests already past their deadline as alerted.
+
+        Called once after install: the deadlines are then computed for the
+        whole backlog, and only breaches from then on should be alerted.
+        """
+        self.flush_model(['sla_deadline', 'sla_alerted'])
+        self.env.cr.execute("""
+            UPDATE request_request SET sla_alerted = TRUE
+             WHERE sla_deadline <= %s AND sla_alerted IS NOT TRUE
+        """, [fields.Datetime.now()])
+        self.invalidate_model(['sla_alerted'])
+
+    @api.model
+    def _cron_sla_breach_tick(self, limit=500):
+        """Send the Escalation Alert for open requests past their deadline.
+
+        Reads only due, unalerted requests in deadline order, so a tick
+        costs the same whatever the size of the backlog. When more than
+        `limit` are due the cron is triggered again straight away.
+        """
+        now = fields.Datetime.now()
+        self.flush_model(['sla_deadline', 'sla_alerted'])
+        self.env.cr.execute(SLA_DUE_QUERY, [now, limit])
+        due = self.browse([row[0] for row in self.env.cr.fetchall()])
+        if not due:
+            return
+        template = self.env['mail.template'].search([('name', '=', ESCALATION_TEMPLATE)], limit=1)
+        if template:
+            self._send_escalation_alerts(due, template, now)
+        due.write({'sla_alerted': True})
+        if len(due) == limit:
+            self.env.ref('wml_itsm.ir_cron_sla_breach_tick')._trigger()
+
+    @api.model
+    def _send_escalation_alerts(self, requests, template, now):
+        """Render the alert once per request and queue all mails in one create."""
+        values_list = []
+        recipients = []
+        for request in requests:
+            emails = []
+            for email in (request.user_id.email, request.team_id.leader_id.email):
+                if email and email not in emails:
+                    emails.append(email)
+            if not emails:
+                continue
+            target = timedelta(hours=RESOLUTION_TARGET_HOURS.get(request.priority, DEFAULT_TARGET_HOURS))
+            time_open = _duration_label(now - request.create_date)
+            values_list.append({
+                'request': request,
+                'portal_url': PORTAL_URL,
+                'time_open': time_open,
+                'sla_target': _duration_label(target),
+                'actual_time': time_open,
+                'sla_status': 'BREACHED',
+            })
+            recipients.append(','.join(emails))
+
+        rendered = self.env['wml.itsm.digest.renderer'].render(template, values_list)
+        self.env['mail.mail'].create([{
+            'subject': subject,
+            'body_html': body_html,
+            'email_to': email_to,
+            'email_from': template.email_from,
+            'mail_server_id': template.mail_server_id.id,
+            'state': 'outgoing',
+            'auto_delete': False,
+        } for email_to, (subject, body_html) in zip(recipients, rendered)])
@@ -0,0 +1,151 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+from odoo import api, fields, models
+
+# Resolution targets in hours by request.request priority, keyed on the
+# generic_request selection ('1' Lowest .. '5' Highest), not on the
+# helpdesk codes ('0' .. '3'). Taken from the "Incident Management"
+# resolution rows of the SLAS matrix in itsm_shell_importer.py
+# (Critical 4h / High 8h / Medium 1d / Low 3d), Lowest sharing the Low
+# target; a priority without an entry falls back to DEFAULT_TARGET_HOURS.
+RESOLUTION_TARGET_HOURS = {'5': 4, '4': 8, '3': 24, '2': 72, '1': 72}
+DEFAULT_TARGET_HOURS = 72
+
+# Open requests past this share of their target count as warnings
+WARNING_RATIO = 0.8
+
+
+def evaluate(created, closed, target, now, warning_ratio=WARNING_RATIO):
+    """Classify every request against its target in one pass.
+
+    `created` and `closed` are epoch seconds (NaN for open requests) and
+    `target` the allowed seconds, all float arrays of the same length.
+    Returns boolean arrays (met, breached, warning).
+    """
+    deadline = created + target
+    is_open = np.isnan(closed)
+    met = ~is_open & (closed <= deadline)
+    breached = np.where(is_open, now > deadline, closed > deadline)
+    warning = is_open & ~breached & (now - created >= warning_ratio * target)
+    return met, breached, warning
+
+
+def aggregate(keys, created, closed, met, breached, warning):
+    """Sum the evaluation per group key (an int array, one key per request).
+
+    Returns (unique keys, totals) where totals maps a measure name to an
+    array aligned with the unique keys.
+    """
+    groups, inverse = np.unique(keys, return_inverse=True)
+    size = len(groups)
+    is_closed = ~np.isnan(closed)
+    hours = np.where(is_closed, closed - created, 0.0) / 3600.0
+    return groups, {
+        'total': np.bincount(inverse, minlength=size),
+        'met': np.bincount(inverse, weights=met, minlength=size).astype(int),
+        'breached': np.bincount(inverse, weights=breached, minlength=size).astype(int),
+        'warning': np.bincount(inverse, weights=warning, minlength=size).astype(int),
+        'closed': np.bincount(inverse, weights=is_closed, minlength=size).astype(int),
+        'hours': np.bincount(inverse, weights=hours, minlength=size),
+    }
+
+
+def _summary(met, breached, warning, total, closed, hours):
+    met, breached, closed, hours = int(met), int(breached), int(closed), float(hours)
+    decided = met + breached
+    return {
+        'total': int(total),
+        'met': met,
+        'breached': breached,
+        'warning': int(warning),
+        'compliance': round(100.0 * met / decided, 1) if decided else 100.0,
+        'avg_resolution': round(hours / closed, 1) if closed else 0.0,
+    }
+
+
+class SlaEngine(models.AbstractModel):
+    _name = 'wml.itsm.sla.engine'
+    _description = 'ITSM SLA Compliance Engine'
+
+    @api.model
+    def _load_columns(self, date_from, date_to):
+        """Team, priority, created and closed columns of the window's requests."""
+        self.env['request.request'].flush_model(['team_id', 'priority', 'create_date', 'date_closed'])
+        self.env.cr.execute("""
+            SELECT COALESCE(team_id, 0),
+                   COALESCE(priority, ''),
+                   EXTRACT(EPOCH FROM create_date),
+                   EXTRACT(EPOCH FROM date_closed)
+              FROM request_request
+             WHERE create_date >= %s AND create_date < %s
+        """, [date_from, date_to])
+        rows = self.env.cr.fetchall()
+        if not rows:
+            return None
+        team_ids, priorities, created, closed = zip(*rows)
+        return (np.array(team_ids, dtype=np.int64),
+                np.array(priorities, dtype=str),
+                np.array(created, dtype=float),
+                np.array([np.nan if value is None else value for value in closed], dtype=float))
+
+    @api.model
+    def compute(self, date_from, date_to, now=None, targets=None):
+        """SLA compliance of the requests created in [date_from, date_to).
+
+        Open requests are judged as of `now` (default: current time).
+        `targets` overrides RESOLUTION_TARGET_HOURS ({priority: hours}).
+        Returns plain data usable from server actions::
+
+            {'overall': {...}, 'by_priority': [...], 'by_team': [...],
+             'by_team_priority': [...]}
+
+        where every entry holds total, met, breached, warning,
+        compliance (%) and avg_resolution (hours), plus its keys.
+        """
+        targets = dict(RESOLUTION_TARGET_HOURS, **(targets or {}))
+        now = fields.Datetime.to_datetime(now) or datetime.utcnow()
+        columns = self._load_columns(fields.Datetime.to_datetime(date_from),
+                                     fields.Datetime.to_datetime(date_to))
+        result = {'overall': _summary(0, 0, 0, 0, 0, 0.0),
+                  'by_priority': [], 'by_team': [], 'by_team_priority': []}
+        if columns is None:
+            return result
+        team_ids, priorities, created, closed = columns
+
+        # Priority codes -> small ints, so targets and groups are array lookups
+        priority_codes, priority_idx = np.unique(priorities, return_inverse=True)
+        target_hours = np.array([targets.get(code, DEFAULT_TARGET_HOURS) for code in priority_codes], dtype=float)
+        target = target_hours[priority_idx] * 3600.0
+        # Naive datetimes are UTC in Odoo, as EXTRACT(EPOCH ...) assumes above
+        met, breached, warning = evaluate(created, closed, target, now.replace(tzinfo=timezone.utc).timestamp())
+
+        measures = ('met', 'breached', 'warning', 'total', 'closed', 'hours')
+        result['overall'] = _summary(met.sum(), breached.sum(), warning.sum(), len(created),
+                                     (~np.isnan(closed)).sum(), np.nansum(closed - created) / 3600.0)
+
+        teams = self.env['generic.team'].browse([int(tid) for tid in np.unique(team_ids) if tid])
+        team_names = {team.id: team.name for team in teams}
+
+        groups, totals = aggregate(priority_idx, created, closed, met, breached, warning)
+        for i, group in enumerate(groups):
+            entry = _summary(*(totals[m][i] for m in measures))
+            entry.update(priority=str(priority_codes[group]), target_hours=float(target_hours[group]))
+            result['by_priority'].append(entry)
+
+        groups, totals = aggregate(team_ids, created, closed, met, breached, warning)
+        for i, group in enumerate(groups):
+            entry = _summary(*(totals[m][i] for m in measures))
+            entry.update(team_id=int(group), team_name=team_names.get(int(group), ''))
+            result['by_team'].append(entry)
+
+        stride = len(priority_codes)
+        groups, totals = aggregate(team_ids * stride + priority_idx, created, closed, met, breached, warning)
+        for i, group in enumerate(groups):
+            team_id, priority = divmod(int(group), stride)
+            entry = _summary(*(totals[m][i] for m in measures))
+            entry.update(team_id=team_id, team_name=team_names.get(team_id, ''),
+                         priority=str(priority_codes[priority]))
+            result['by_team_priority'].append(entry)
+        return result
@@ -0,0 +1,3 @@
+from . import test_sla_breach
+from . import test_sla_engine
+from . import test_user_load
@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests.common import TransactionCase
+
+from ..models.request_request import ESCALATION_TEMPLATE, SLA_DUE_QUERY
+
+
+class TestSlaBreach(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = cls.env['res.users'].create({
+            'name': 'ITSM Agent', 'login': 'itsm.agent', 'email': 'itsm.agent@example.com'})
+        request_type = cls.env['request.type'].create({'name': 'ITSM SLA Test', 'code': 'ITSM-SLA-TEST'})
+        stage = cls.env['request.stage'].create({
+            'name': 'New', 'code': 'new', 'request_type_id': request_type.id})
+        request_type.write({'start_stage_id': stage.id})
+        cls.env['mail.template'].create({
+            'name': ESCALATION_TEMPLATE,
+            'model_id': cls.env.ref('generic_request.model_request_request').id,
+            'subject': 'SLA breached: {{ request.name }}',
+            'body_html': '<p>{{ request.name }} is {{ sla_status }}</p>',
+            'email_from': 'servicedesk@example.com',
+        })
+        cls.overdue, cls.pending = cls.env['request.request'].create([{
+            'type_id': request_type.id,
+            'request_text': text,
+            'user_id': cls.user.id,
+        } for text in ('Overdue request', 'Pending request')])
+        # Deadlines are computed from create_date (now): move one into the past
+        cls.env['request.request'].flush_model()
+        cls.env.cr.execute("UPDATE request_request SET sla_deadline = %s WHERE id = %s",
+                           [fields.Datetime.now() - timedelta(hours=1), cls.overdue.id])
+        cls.env['request.request'].invalidate_model(['sla_deadline'])
+
+    def _alerts(self):
+        return self.env['mail.mail'].search([('email_to', '=', self.user.email)])
+
+    def test_tick_alerts_due_requests_once(self):
+        requests = self.env['request.request']
+        requests._cron_sla_breach_tick()
+        self.assertTrue(self.overdue.sla_alerted)
+        self.assertFalse(self.pending.sla_alerted)
+        self.assertEqual(self._alerts().mapped('subject'), [f'SLA breached: {self.overdue.name}'])
+
+        # Neither a second tick nor a recomputed deadline alerts again
+        self.overdue.write({'priority': '5'})
+        self.assertTrue(self.overdue.sla_alerted)
+        requests._cron_sla_breach_tick()
+        self.assertEqual(len(self._alerts()), 1)
+
+    def test_backlog_overdue_at_install_is_not_alerted(self):
+        requests = self.env['request.request']
+        requests._sla_mark_backlog_alerted()
+        self.assertTrue(self.overdue.sla_alerted)
+        self.assertFalse(self.pending.sla_alerted)
+        requests._cron_sla_breach_tick()
+        self.assertFalse(self._alerts())
+
+    def test_due_query_uses_the_partial_index(self):
+        self.env.cr.execute("SET LOCAL enable_seqscan = off")
+        self.env.cr.execute("EXPLAIN " + SLA_DUE_QUERY, [fields.Datetime.now(), 500])
+        plan = '\n'.join(row[0] for row in self.env.cr.fetchall())
+        self.assertIn('request_request_sla_due_index', plan)
@@ -0,0 +1,62 @@
+import numpy as np
+
+from odoo.tests.common import TransactionCase
+
+from ..models.sla_engine import RESOLUTION_TARGET_HOURS, aggregate, evaluate
+
+NAN = float('nan')
+HOUR = 3600.0
+
+
+class TestSlaEngine(TransactionCase):
+
+    def test_every_priority_has_a_target(self):
+        """Every request.request priority has its own resolution target."""
+        selection = self.env['request.request'].fields_get(['priority'])['priority']['selection']
+        self.assertEqual(set(RESOLUTION_TARGET_HOURS), {code for code, _label in selection})
+
+    def test_evaluate(self):
+        """Closed requests are judged at closing, open ones at `now`."""
+        # 10h target, judged at hour 20: closed in time, closed late, open
+        # and breached, open past 80% (warning), open and fresh, closed
+        # exactly on the deadline
+        created = np.array([0, 0, 0, 12, 18, 0]) * HOUR
+        closed = np.array([5, 11, NAN, NAN, NAN, 10]) * HOUR
+        target = np.full(6, 10 * HOUR)
+        met, breached, warning = evaluate(created, closed, target, 20 * HOUR)
+        self.assertEqual(met.tolist(), [True, False, False, False, False, True])
+        self.assertEqual(breached.tolist(), [False, True, True, False, False, False])
+        self.assertEqual(warning.tolist(), [False, False, False, True, False, False])
+
+    def test_aggregate_matches_a_plain_loop(self):
+        """Per-group sums equal those of a plain Python loop over the requests."""
+        rng = np.random.default_rng(7)
+        size = 200
+        keys = rng.integers(0, 5, size)
+        created = rng.uniform(0, 100, size) * HOUR
+        closed = np.where(rng.random(size) < 0.6, created + rng.uniform(0, 30, size) * HOUR, NAN)
+        target = rng.choice([4.0, 8.0, 24.0], size) * HOUR
+        now = 110 * HOUR
+        met, breached, warning = evaluate(created, closed, target, now)
+        groups, totals = aggregate(keys, created, closed, met, breached, warning)
+
+        expected = {}
+        for i in range(size):
+            entry = expected.setdefault(int(keys[i]), dict.fromkeys(totals, 0))
+            entry['total'] += 1
+            entry['met'] += int(met[i])
+            entry['breached'] += int(breached[i])
+            entry['warning'] += int(warning[i])
+            if not np.isnan(closed[i]):
+                entry['closed'] += 1
+                entry['hours'] += (closed[i] - created[i]) / HOUR
+        self.assertEqual(groups.tolist(), sorted(expected))
+        for index, key in enumerate(groups.tolist()):
+            for measure in ('total', 'met', 'breached', 'warning', 'closed'):
+                self.assertEqual(int(totals[measure][index]), expected[key][measure], (key, measure))
+            self.assertAlmostEqual(float(totals['hours'][index]), expected[key]['hours'], places=6)
+
+        # Met and breached exclude each other, and a breached request is no warning
+        decided = met.astype(int) + breached.astype(int)
+        self.assertTrue((decided <= 1).all())
+        self.assertFalse((warning & breached).any())
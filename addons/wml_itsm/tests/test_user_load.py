@@ -0,0 +1,52 @@
+from odoo.tests.common import TransactionCase
+
+
+class TestUserLoad(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user_busy = cls.env['res.users'].create({'name': 'ITSM Busy', 'login': 'itsm.busy'})
+        cls.user_free = cls.env['res.users'].create({'name': 'ITSM Free', 'login': 'itsm.free'})
+        cls.team = cls.env['generic.team'].create({
+            'name': 'ITSM Load Test',
+            'leader_id': cls.user_busy.id,
+            'user_ids': [(6, 0, (cls.user_busy | cls.user_free).ids)],
+        })
+        request_type = cls.env['request.type'].create({'name': 'ITSM Load Test', 'code': 'ITSM-LOAD-TEST'})
+        stage = cls.env['request.stage'].create({
+            'name': 'New', 'code': 'new', 'request_type_id': request_type.id})
+        request_type.write({'start_stage_id': stage.id})
+        cls.request = cls.env['request.request'].create({
+            'type_id': request_type.id,
+            'request_text': 'Least loaded assignment test',
+            'team_id': cls.team.id,
+        })
+        cls.policy = cls.env['generic.assign.policy'].create({
+            'name': 'ITSM Load Test',
+            'model_id': cls.env.ref('generic_request.model_request_request').id,
+            'assign_team_field_id': cls.env['ir.model.fields']._get('request.request', 'team_id').id,
+        })
+
+    def _rule(self, direction):
+        return self.env['generic.assign.policy.rule'].create({
+            'name': 'Least Loaded Member',
+            'policy_id': self.policy.id,
+            'assign_type': 'team',
+            'assign_team_choice_type': 'least_loaded',
+            'assign_team_sort_direction': direction,
+        })
+
+    def test_least_loaded_reads_the_counters(self):
+        """The member of the request's team with the lowest counter, not the lowest id."""
+        rule = self._rule('asc')
+        self.env['wml.itsm.user.load']._apply_deltas({self.user_busy.id: 3, self.user_free.id: 1})
+        self.assertEqual(rule._get_assignee_team(self.request), self.user_free)
+        self.env['wml.itsm.user.load']._apply_deltas({self.user_free.id: 5})
+        self.assertEqual(rule._get_assignee_team(self.request), self.user_busy)
+
+    def test_sort_direction_desc(self):
+        """A descending rule picks the member with the highest counter."""
+        rule = self._rule('desc')
+        self.env['wml.itsm.user.load']._apply_deltas({self.user_busy.id: 3, self.user_free.id: 1})
+        self.assertEqual(rule._get_assignee_team(self.request), self.user_busy)
@@ -0,0 +1,19 @@
+{
+    'name': 'WML ITSM Helpdesk Routes',
+    'summary': 'Python route handlers for the WestMetro ITSM helpdesk automations',
+    'description': """
+Route handlers for the helpdesk.ticket routes created by
+itsm_shell_importer.py. The notes and notifications of every route are
+plain methods on helpdesk.ticket, so the route server actions hold a
+one-line records._itsm_route('<route key>') call instead of a code
+string that safe_eval parses on every trigger.
+""",
+    'version': '16.0.1.0.0',
+    'category': 'Services/Helpdesk',
+    'author': 'WestMetro Limited',
+    'website': 'https://www.westmetrong.com',
+    'license': 'LGPL-3',
+    'depends': ['helpdesk', 'base_automation'],
+    'installable': True,
+    'application': False,
+}
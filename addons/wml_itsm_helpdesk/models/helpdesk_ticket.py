@@ -0,0 +1,175 @@
+import re
+
+from odoo import _, api, models
+from odoo.exceptions import UserError
+
+# Handlers of the helpdesk routes created by itsm_shell_importer.py, keyed
+# by route_key(route name). The route server actions only hold a
+# records._itsm_route(key) call; the notes and notifications live here.
+
+# key -> (internal note, customer notification or None)
+ROUTE_NOTES = {
+    'inc_start_work': ('Work started on this incident.',
+                       'A technician is now working on your issue.'),
+    'inc_pause_sla_on_pending': ('Ticket on hold - awaiting information from requester. SLA timer paused.',
+                                 'We need additional information to proceed. Please reply with the requested details.'),
+    'inc_manual_escalation': ('Ticket escalated to L2 Support.',
+                              'Your ticket has been escalated to our senior support team.'),
+    'inc_resolve_from_in_progress': ('Incident resolved. Awaiting user confirmation.',
+                                     'Your incident has been resolved. Please confirm. If no response in 5 days, this ticket will auto-close.'),
+    'inc_resolve_from_escalated': ('Escalated incident resolved. Awaiting confirmation.',
+                                   'Your escalated incident has been resolved. Please confirm.'),
+    'inc_manual_close': ('Incident closed.',
+                         'Your incident has been closed. Thank you for contacting IT Support.'),
+    'sr_auto_acknowledge': ('Service request received. Your request is being processed.', None),
+    'sr_send_for_approval': ('Request sent for approval.', None),
+    'sr_approved': ('Request approved. Fulfillment started.',
+                    'Your service request has been approved.'),
+    'sr_rejected': ('Request rejected.',
+                    'Your service request could not be approved. Please contact your manager.'),
+    'sr_resolved': ('Service request fulfilled.',
+                    'Your service request has been completed. Please confirm.'),
+    'chg_submit_for_review': ('Change request submitted for CAB review.', None),
+    'chg_cab_approved': ('Change approved by CAB. Schedule implementation window.',
+                         'Your change request has been approved.'),
+    'chg_cab_rejected': ('Change rejected by CAB.',
+                         'Your change request was not approved.'),
+    'chg_start_implementation': ('Implementation started.', None),
+    'chg_emergency_stop': ('EMERGENCY STOP triggered! Immediate attention required. Rollback may be necessary.', None),
+    'chg_verification': ('Implementation complete. Running verification checks.', None),
+    'chg_closed_successful': ('Change completed successfully.', None),
+    'chg_closed_failed': ('Change failed. Rollback completed.', None),
+    'prb_assign_investigation': ('Problem assigned for investigation.', None),
+    'prb_start_rca': ('Root cause analysis started.', None),
+    'prb_workaround_found': ('Workaround documented. Consider publishing to Knowledge Base.', None),
+    'prb_escalate_to_vendor': ('Problem escalated to vendor for resolution.', None),
+    'prb_root_cause_fixed': ('Root cause fixed. Permanent solution deployed.', None),
+    'prb_close': ('Problem closed. Fix verified in production.', None),
+    'ast_auto_acknowledge': ('Asset request received. Checking entitlement and availability.', None),
+    'ast_manager_approved': ('Manager approved. IT reviewing availability.', None),
+    'ast_pending_stock': ('Asset out of stock. Procurement request created.',
+                          'Your requested asset is currently out of stock. You will be notified when available.'),
+    'ast_ready_for_delivery': ('Asset ready for delivery.',
+                               'Your asset is ready for pickup/delivery.'),
+    'ast_delivered': ('Asset delivered and signed off.', None),
+    'acc_data_owner_approval': ('Access request sent to data owner for approval.', None),
+    'acc_security_review': ('Security review in progress.', None),
+    'acc_provisioning': ('All approvals obtained. Provisioning access.', None),
+    'acc_access_granted': ('Access granted.',
+                           'Your access has been provisioned. Please verify it is working.'),
+    'acc_rejected': ('Access request rejected.',
+                     'Your access request could not be approved.'),
+    'inq_auto_acknowledge': ('Thank you for your inquiry. A team member will respond shortly.', None),
+    'inq_escalate_to_expert': ('Inquiry escalated to subject matter expert.', None),
+    'inq_answered': ('Inquiry answered.',
+                     'Your inquiry has been answered. Please let us know if you need anything else.'),
+    'onb_ready_for_day_1': ('All onboarding tasks complete. Ready for new hire Day 1 handover.', None),
+    'off_audit_complete': ('Offboarding complete. Final security audit required before archiving.', None),
+    'mnt_approved': ('Maintenance window approved. User notifications should be sent.', None),
+    'mnt_issue_alert': ('Issue encountered during maintenance! Assess impact and consider extending window or aborting.', None),
+    'mnt_all_clear': ('Maintenance completed successfully. All systems operational.', None),
+}
+
+ONBOARDING_CHECKLIST = """Onboarding Checklist:
+- Create AD/Email account
+- Provision laptop/workstation
+- Configure required software
+- Set up phone/extension
+- Create badge/access card
+- Assign to security groups
+- Schedule Day 1 orientation
+- Prepare welcome documentation"""
+
+OFFBOARDING_CHECKLIST = """Offboarding Security Checklist:
+- Backup mailbox and files
+- Disable AD account
+- Revoke VPN access
+- Disable badge/physical access
+- Remove from security groups
+- Collect laptop/equipment
+- Collect mobile devices
+- Transfer shared resources
+- Archive account
+- Final security audit"""
+
+ROUTE_NOTES['onb_generate_checklist'] = (ONBOARDING_CHECKLIST, None)
+ROUTE_NOTES['off_generate_revocation_checklist'] = (OFFBOARDING_CHECKLIST, None)
+
+# on_time routes: key -> note logged on every ticket they close
+AUTO_CLOSE_NOTES = {
+    'inc_auto_close_after_5_days': 'Incident auto-closed after 5 days with no response.',
+    'sr_auto_close_after_3_days': 'Request auto-closed after 3 days with no response.',
+    'acc_auto_confirm_after_3_days': 'Access auto-confirmed after 3 days.',
+    'inq_auto_close_after_5_days': 'Inquiry auto-closed after 5 days.',
+}
+
+# Routes with their own _itsm_route_<key> method
+CUSTOM_ROUTES = ('inc_auto_acknowledge', 'inc_notify_on_assignment', 'inc_reopen_ticket')
+
+
+def route_key(name):
+    """'INC: Auto-Close After 5 Days' -> 'inc_auto_close_after_5_days'."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+class HelpdeskTicket(models.Model):
+    _inherit = 'helpdesk.ticket'
+
+    @api.model
+    def _itsm_route_keys(self):
+        """Keys of every route handler this module implements."""
+        return sorted(set(ROUTE_NOTES) | set(AUTO_CLOSE_NOTES) | set(CUSTOM_ROUTES))
+
+    def _itsm_route(self, key, close_stage_id=None):
+        """Run the route handler `key` on these tickets.
+
+        Called from the ITSM route server actions. `close_stage_id` is the
+        stage the auto-close routes move tickets to. Private, so it cannot
+        be called over RPC to post notes or move tickets to any stage.
+        """
+        if key in AUTO_CLOSE_NOTES:
+            if not close_stage_id:
+                raise UserError(_("ITSM route %s needs a close stage.", key))
+            return self._itsm_auto_close(close_stage_id, AUTO_CLOSE_NOTES[key])
+        if key in CUSTOM_ROUTES:
+            return getattr(self, '_itsm_route_' + key)()
+        if key not in ROUTE_NOTES:
+            raise UserError(_("Unknown ITSM route handler: %s", key))
+        note, customer_note = ROUTE_NOTES[key]
+        return self._itsm_post_notes(note, customer_note)
+
+    def _itsm_post_notes(self, note, customer_note=None):
+        for ticket in self:
+            ticket.message_post(body=note)
+            if customer_note and ticket.partner_id:
+                ticket._itsm_notify_customer(customer_note)
+
+    def _itsm_notify_customer(self, body):
+        self.ensure_one()
+        self.message_post(body=body, message_type='notification', partner_ids=self.partner_id.ids)
+
+    def _itsm_auto_close(self, close_stage_id, note):
+        """Move the tickets to the close stage in one write and log `note` in one batch."""
+        tickets = self.filtered(lambda t: t.stage_id.id != close_stage_id)
+        if tickets:
+            tickets.write({'stage_id': close_stage_id})
+            tickets._message_log_batch(bodies=dict.fromkeys(tickets.ids, note))
+
+    def _itsm_route_inc_auto_acknowledge(self):
+        for ticket in self:
+            if ticket.partner_id.email:
+                ticket._itsm_notify_customer(
+                    'Your incident has been received and logged. A technician will be assigned shortly.')
+            ticket.message_post(body='Incident received and triaged automatically.')
+
+    def _itsm_route_inc_notify_on_assignment(self):
+        for ticket in self.filtered('user_id'):
+            ticket.message_post(body='Ticket assigned to %s.' % ticket.user_id.name,
+                                partner_ids=ticket.user_id.partner_id.ids)
+
+    def _itsm_route_inc_reopen_ticket(self):
+        for ticket in self:
+            ticket.message_post(body='Incident reopened.')
+            if ticket.user_id:
+                ticket.message_post(body='This ticket has been reopened.',
+                                    partner_ids=ticket.user_id.partner_id.ids)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+classify_type Benchmark + Golden Check
+========================================
+Classifies 1M synthetic request type codes with the compiled matcher in
+itsm_classify.py and with the original loop-over-endswith version kept
+below as the golden reference. Exits non-zero on the first mismatch.
+
+Run (no Odoo needed):
+    python3 benchmarks/bench_classify_type.py [--count 1000000] [--seed 7]
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from itsm_classify import (  # noqa: E402
+    CHANGE_SUFFIXES, INCIDENT_SUFFIXES, ONBOARD_SUFFIXES, SALES_SUFFIXES,
+    SERVICE_REQUEST_SUFFIXES, SPECIAL_OVERRIDES, classify_type,
+)
+
+
+def classify_type_reference(code):
+    """The classifier as shipped in itsm_restructure_v4.py before compilation."""
+    if code in SPECIAL_OVERRIDES:
+        return SPECIAL_OVERRIDES[code]
+
+    upper = code.upper()
+
+    for suffix in CHANGE_SUFFIXES:
+        if upper.endswith(suffix):
+            return 'change'
+
+    for suffix in ONBOARD_SUFFIXES:
+        if upper.endswith(suffix):
+            return 'onboarding'
+
+    for suffix in SALES_SUFFIXES:
+        if upper.endswith(suffix):
+            return 'sales'
+
+    for suffix in SERVICE_REQUEST_SUFFIXES:
+        if upper.endswith(suffix):
+            return 'service_request'
+
+    for suffix in INCIDENT_SUFFIXES:
+        if upper.endswith(suffix):
+            return 'incident'
+
+    # Default: incident
+    return 'incident'
+
+
+PREFIXES = ['TAXLY', 'ATRS', 'AKRAA', 'AKRLITE', 'AKRBULK', 'VENDRA', '3P', 'ERPDEP',
+            'ERPINT', 'FIBER', 'MICRO', 'LEASED', 'ACCT', 'GEN', 'SALES', 'api']
+ALL_SUFFIXES = (CHANGE_SUFFIXES + ONBOARD_SUFFIXES + SALES_SUFFIXES
+                + SERVICE_REQUEST_SUFFIXES + INCIDENT_SUFFIXES)
+NOISE = ['', '-', '-NEW', '-AUDIT', '-KEY', 'CHANGE', '-CHANGE-X', '--REQ', '-TRAINX']
+
+
+def edge_codes():
+    """Hand-picked codes: every suffix, case variants, overrides, near misses."""
+    codes = list(SPECIAL_OVERRIDES) + [code.lower() for code in SPECIAL_OVERRIDES]
+    for suffix in ALL_SUFFIXES + NOISE:
+        for prefix in ('X', 'ERPDEP', 'A-B', ''):
+            code = prefix + suffix
+            codes += [code, code.lower(), code.title()]
+    # Suffixes stacked on suffixes exercise the priority order
+    for first in ALL_SUFFIXES:
+        for second in ALL_SUFFIXES:
+            codes.append('SVC' + first + second)
+    return codes
+
+
+def synthetic_codes(count, seed):
+    rnd = random.Random(seed)
+    pool = ALL_SUFFIXES * 4 + NOISE
+    overrides = list(SPECIAL_OVERRIDES)
+    codes = []
+    for _ in range(count):
+        roll = rnd.random()
+        if roll < 0.02:
+            codes.append(rnd.choice(overrides))
+            continue
+        code = rnd.choice(PREFIXES)
+        if roll < 0.10:
+            code += rnd.choice(pool)
+        code += rnd.choice(pool)
+        codes.append(code.lower() if roll > 0.95 else code)
+    return codes
+
+
+def timed(func, codes):
+    start = time.perf_counter()
+    results = [func(code) for code in codes]
+    return results, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    print("\n" + "=" * 60)
+    print("  classify_type BENCHMARK")
+    print("=" * 60)
+
+    edges = edge_codes()
+    for code in edges:
+        expected, got = classify_type_reference(code), classify_type(code)
+        if expected != got:
+            print(f"  ✗ Golden mismatch on {code!r}: expected {expected}, got {got}")
+            return 1
+    print(f"  ✓ Golden check: {len(edges)} edge codes match")
+
+    codes = synthetic_codes(args.count, args.seed)
+    expected, ref_time = timed(classify_type_reference, codes)
+    got, new_time = timed(classify_type, codes)
+    for code, want, have in zip(codes, expected, got):
+        if want != have:
+            print(f"  ✗ Golden mismatch on {code!r}: expected {want}, got {have}")
+            return 1
+    print(f"  ✓ Golden check: {len(codes)} synthetic codes match")
+
+    print(f"\n  Reference (endswith loops): {ref_time:.3f}s  ({ref_time / len(codes) * 1e9:.0f} ns/code)")
+    print(f"  Compiled matcher:           {new_time:.3f}s  ({new_time / len(codes) * 1e9:.0f} ns/code)")
+    print(f"  Speedup:                    {ref_time / new_time:.1f}x")
+    print("=" * 60)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Setup Script Scaling Benchmark
+================================
+Runs the itsm_*.py setup scripts against the in-memory env of
+itsm_fake_env.py, seeded with 10, 1,000 and 10,000 request types plus
+their requests. Each script runs once on the fresh data and once more
+as a rerun. For every script and size it reports ORM round trips, raw
+SQL statements, commits, runtime and the section with the most queries
+(from the itsm_report run report), so round-trip growth can be checked
+without a production-sized Odoo.
+
+Runtimes measure the scripts plus the fake, not PostgreSQL: compare the
+round trips across sizes, and the runtimes only against each other.
+
+Run (no Odoo needed):
+    python3 benchmarks/bench_scaling.py [--sizes 10 1000 10000]
+        [--requests-per-type 2] [--scripts itsm_shell_importer_v2.py ...]
+        [--json results.json]
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import traceback
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_DIR = tempfile.mkdtemp(prefix='itsm_bench_')
+JOURNAL_DIR = tempfile.mkdtemp(prefix='itsm_bench_journal_')
+
+# Read by the script helpers when they are first imported
+os.environ['ITSM_SCRIPT_DIR'] = REPO_DIR
+os.environ['ITSM_REPORT_DIR'] = REPORT_DIR
+os.environ['ITSM_JOURNAL_DIR'] = JOURNAL_DIR
+os.environ.pop('ITSM_RESUME', None)  # every measured run is a full one
+os.environ['ITSM_WORKERS'] = '1'  # the fake env cannot be shared with forked workers
+sys.path.insert(0, REPO_DIR)
+
+from itsm_fake_env import FakeEnv, run_script, seed  # noqa: E402
+
+# In deployment order
+SCRIPTS = [
+    'itsm_teams_v3.py',
+    'itsm_shell_importer_v2.py',
+    'itsm_restructure_v4.py',
+    'itsm_shell_importer.py',
+    'itsm_digest_emails.py',
+]
+
+
+def heaviest_section():
+    """(name, queries) of the section with the most queries in the last run report."""
+    reports = glob.glob(os.path.join(REPORT_DIR, '*.json'))
+    if not reports:
+        return None, 0
+    with open(max(reports, key=os.path.getmtime)) as f:
+        sections = json.load(f)['sections']
+    if not sections:
+        return None, 0
+    top = max(sections, key=lambda s: s['queries'])
+    return top['name'], top['queries']
+
+
+def measure(env, script):
+    """Run `script` once on `env`; returns its figures."""
+    for path in glob.glob(os.path.join(REPORT_DIR, '*')):
+        os.remove(path)
+    env.calls.clear()
+    env.cr.executed = []
+    commits = env.cr.commits
+    output = io.StringIO()
+    error = None
+    start = time.perf_counter()
+    try:
+        with contextlib.redirect_stdout(output):
+            run_script(env, os.path.join(REPO_DIR, script))
+    except Exception:
+        error = traceback.format_exc()
+    seconds = time.perf_counter() - start
+    section, section_queries = heaviest_section()
+    return {
+        'calls': env.round_trips,
+        'sql': len(env.cr.executed),
+        'commits': env.cr.commits - commits,
+        'seconds': round(seconds, 4),
+        'heaviest_section': section,
+        'heaviest_queries': section_queries,
+        'error': error,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 1000, 10000])
+    parser.add_argument('--requests-per-type', type=int, default=2)
+    parser.add_argument('--scripts', nargs='+', default=SCRIPTS)
+    parser.add_argument('--json', help="also write the results to this file")
+    args = parser.parse_args()
+
+    print("\n" + "=" * 78)
+    print("  SETUP SCRIPT SCALING BENCHMARK")
+    print("=" * 78)
+
+    results = []
+    failed = False
+    for size in args.sizes:
+        start = time.perf_counter()
+        env = seed(FakeEnv(), n_types=size, requests_per_type=args.requests_per_type)
+        print(f"\n  {size} request types, {size * args.requests_per_type} requests"
+              f" (seeded in {time.perf_counter() - start:.1f}s)")
+        print(f"  {'Script':<28}{'Pass':<7}{'Calls':>7}{'SQL':>6}{'Commits':>9}{'Time (s)':>10}  Heaviest section")
+        for script in args.scripts:
+            for run in ('fresh', 'rerun'):
+                result = measure(env, script)
+                results.append(dict(result, size=size, script=script, run=run))
+                if result['error']:
+                    failed = True
+                    print(f"  ✗ {script} ({run}) failed:\n{result['error']}")
+                    break
+                section = f"{result['heaviest_section']} ({result['heaviest_queries']} queries)"
+                print(f"  {script:<28}{run:<7}{result['calls']:>7}{result['sql']:>6}{result['commits']:>9}"
+                      f"{result['seconds']:>10.3f}  {section}")
+
+    # Round trips that grow with the number of request types
+    if len(args.sizes) > 1:
+        print("\n  Round trips from %d to %d request types:" % (args.sizes[0], args.sizes[-1]))
+        for script in args.scripts:
+            for run in ('fresh', 'rerun'):
+                calls = [r['calls'] for r in results
+                         if r['script'] == script and r['run'] == run and not r['error']]
+                if len(calls) == len(args.sizes):
+                    trend = ' → '.join(str(c) for c in calls)
+                    mark = '✓' if calls[-1] == calls[0] else '○'
+                    print(f"  {mark} {script:<28}{run:<7}{trend}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\n  → Results: {args.json}")
+    print("=" * 78)
+    shutil.rmtree(REPORT_DIR, ignore_errors=True)
+    shutil.rmtree(JOURNAL_DIR, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
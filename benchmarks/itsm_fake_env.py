@@ -0,0 +1,572 @@
+"""
+WestMetro ITSM - In-Memory Stand-In for the Odoo Shell `env`
+===============================================================
+Runs the itsm_*.py setup scripts without Odoo or PostgreSQL. Every model
+the scripts touch is a dict of rows ({id: {field: value}}) and every
+ORM call (search, search_read, search_count, read, read_group, create,
+write, unlink) is counted per model, so the number of round trips a
+script makes can be measured and compared across data sizes.
+
+    env = seed(FakeEnv(), n_types=1000, requests_per_type=2)
+    run_script(env, 'itsm_shell_importer_v2.py')
+    print(env.round_trips, env.calls.most_common(5))
+
+Only what the scripts use is modelled: domains with the usual operators
+and dotted paths, many2one and many2many fields (SCHEMA), commands 3-6
+on many2many writes, savepoints and rollback. Raw SQL is recorded, not
+run. Server action code strings can be exec'd against it as well
+(message_post, _message_log_batch, read_group).
+It is not an ORM: no computed fields, constraints or access rights.
+
+Rows created, written and unlinked are also reported to itsm_report,
+so the run report of a fake run carries row counts like a real one.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import collections
+import contextlib
+import datetime
+import fnmatch
+import itertools
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from itsm_report import count_rows  # noqa: E402
+
+# ============================================================
+# SCHEMA
+# ============================================================
+# model -> {relational field: ('m2o' | 'm2m', comodel)}. Any other field
+# is stored as given.
+SCHEMA = {
+    'ir.model': {},
+    'ir.model.fields': {},
+    'ir.model.data': {},
+    'ir.module.category': {},
+    'ir.module.module': {},
+    'ir.config_parameter': {},
+    'ir.actions.server': {'model_id': ('m2o', 'ir.model')},
+    'ir.cron': {'ir_actions_server_id': ('m2o', 'ir.actions.server'), 'user_id': ('m2o', 'res.users')},
+    'res.groups': {'category_id': ('m2o', 'ir.module.category')},
+    'res.partner': {},
+    'res.users': {'partner_id': ('m2o', 'res.partner')},
+    'mail.template': {'model_id': ('m2o', 'ir.model')},
+    'mail.mail': {},
+    'mail.message': {},
+    'helpdesk.team': {},
+    'helpdesk.stage': {'team_ids': ('m2m', 'helpdesk.team')},
+    'helpdesk.ticket.type': {},
+    'helpdesk.sla': {'team_id': ('m2o', 'helpdesk.team'), 'stage_id': ('m2o', 'helpdesk.stage')},
+    'helpdesk.ticket': {'team_id': ('m2o', 'helpdesk.team'), 'stage_id': ('m2o', 'helpdesk.stage'),
+                        'user_id': ('m2o', 'res.users'), 'partner_id': ('m2o', 'res.partner')},
+    'base.automation': {'model_id': ('m2o', 'ir.model'), 'trg_date_id': ('m2o', 'ir.model.fields')},
+    'generic.team': {'leader_id': ('m2o', 'res.users'), 'user_ids': ('m2m', 'res.users')},
+    'generic.service': {'team_id': ('m2o', 'generic.team')},
+    'generic.assign.policy': {'model_id': ('m2o', 'ir.model')},
+    'generic.assign.policy.rule': {'policy_id': ('m2o', 'generic.assign.policy')},
+    'request.category': {},
+    'request.type': {'start_stage_id': ('m2o', 'request.stage')},
+    'request.stage.type': {},
+    'request.stage': {'request_type_id': ('m2o', 'request.type'), 'type_id': ('m2o', 'request.stage.type')},
+    'request.stage.route': {'request_type_id': ('m2o', 'request.type'),
+                            'stage_from_id': ('m2o', 'request.stage'),
+                            'stage_to_id': ('m2o', 'request.stage')},
+    'request.request': {'type_id': ('m2o', 'request.type'), 'stage_id': ('m2o', 'request.stage'),
+                        'team_id': ('m2o', 'generic.team'), 'service_id': ('m2o', 'generic.service'),
+                        'user_id': ('m2o', 'res.users'), 'author_id': ('m2o', 'res.partner')},
+}
+
+
+# ============================================================
+# CURSOR AND ENVIRONMENT
+# ============================================================
+class FakeCursor:
+    """Transaction of a FakeEnv: commit, rollback and savepoints over an undo log."""
+
+    def __init__(self, env):
+        self.env = env
+        self.dbname = 'fake'
+        self.commits = 0
+        self.rollbacks = 0
+        self.executed = []       # (query, params) of every raw SQL statement
+        self.sql_log_count = 0   # ORM calls + raw SQL, like Odoo's cursor counter
+        self.rowcount = 0
+        self._undo = []
+
+    def commit(self):
+        self.commits += 1
+        self._undo = []
+
+    def rollback(self):
+        self.rollbacks += 1
+        self._rewind(0)
+
+    def _rewind(self, mark):
+        while len(self._undo) > mark:
+            self._undo.pop()()
+
+    @contextlib.contextmanager
+    def savepoint(self, flush=True):
+        mark = len(self._undo)
+        try:
+            yield
+        except Exception:
+            self._rewind(mark)
+            raise
+
+    def execute(self, query, params=None, log_exceptions=True):
+        """Record raw SQL without running it."""
+        self.sql_log_count += 1
+        self.executed.append((query, params))
+        self.rowcount = 0
+
+    def fetchall(self):
+        return []
+
+    def fetchone(self):
+        return None
+
+
+class FakeEnv:
+    """Dict-backed stand-in for the `env` of odoo-bin shell."""
+
+    def __init__(self, schema=None):
+        self.schema = dict(SCHEMA if schema is None else schema)
+        self.tables = {name: {} for name in self.schema}
+        self.calls = collections.Counter()  # (model, method) -> calls
+        self._ids = itertools.count(1)
+        self.cr = FakeCursor(self)
+        self.context = {}
+        self.uid = 1
+
+    def __getitem__(self, model):
+        if model not in self.schema:
+            raise KeyError(model)
+        return Recordset(self, model, ())
+
+    def __contains__(self, model):
+        return model in self.schema
+
+    @property
+    def user(self):
+        return self['res.users'].browse(self.uid)
+
+    def invalidate_all(self):
+        pass
+
+    def count(self, model, method):
+        self.calls[(model, method)] += 1
+        self.cr.sql_log_count += 1
+
+    @property
+    def round_trips(self):
+        """ORM calls made so far (raw SQL not included, see cr.executed)."""
+        return sum(self.calls.values())
+
+
+def _norm(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return str(value)
+    return value
+
+
+def _now():
+    return str(datetime.datetime.now().replace(microsecond=0))
+
+
+# ============================================================
+# RECORDSETS
+# ============================================================
+class Recordset:
+    """Ordered ids of one model; field access reads the row dicts."""
+
+    def __init__(self, env, model, ids):
+        self.env = env
+        self._name = model
+        self._ids = tuple(ids)
+
+    @property
+    def ids(self):
+        return list(self._ids)
+
+    @property
+    def id(self):
+        return self._ids[0] if self._ids else False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def __bool__(self):
+        return bool(self._ids)
+
+    def __iter__(self):
+        for rid in self._ids:
+            yield Recordset(self.env, self._name, (rid,))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Recordset(self.env, self._name, self._ids[index])
+        return Recordset(self.env, self._name, (self._ids[index],))
+
+    def __eq__(self, other):
+        return isinstance(other, Recordset) and other._name == self._name and set(other._ids) == set(self._ids)
+
+    def __hash__(self):
+        return hash((self._name, self._ids))
+
+    def __or__(self, other):
+        return Recordset(self.env, self._name, list(dict.fromkeys(self._ids + other._ids)))
+
+    def __repr__(self):
+        return '%s%r' % (self._name, self._ids)
+
+    @property
+    def _table(self):
+        return self.env.tables[self._name]
+
+    @property
+    def _fields(self):
+        return self.env.schema[self._name]
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        if len(self._ids) > 1:
+            raise ValueError('Expected singleton: %r' % self)
+        field = self._fields.get(name)
+        row = self._table.get(self._ids[0], {}) if self._ids else {}
+        if field and field[0] == 'm2o':
+            return Recordset(self.env, field[1], [row[name]] if row.get(name) else [])
+        if field and field[0] == 'm2m':
+            return Recordset(self.env, field[1], row.get(name) or [])
+        if name == 'display_name':
+            return row.get('name', False)
+        return row.get(name, False)
+
+    def ensure_one(self):
+        if len(self._ids) != 1:
+            raise ValueError('Expected singleton: %r' % self)
+        return self
+
+    def exists(self):
+        return Recordset(self.env, self._name, [i for i in self._ids if i in self._table])
+
+    def with_context(self, *args, **kwargs):
+        if kwargs.get('active_test') is False:
+            records = Recordset(self.env, self._name, self._ids)
+            records._active_test = False
+            return records
+        return self
+
+    def sudo(self, *args):
+        return self
+
+    def mapped(self, name):
+        values = [getattr(rec, name) for rec in self]
+        if values and isinstance(values[0], Recordset):
+            out = Recordset(self.env, values[0]._name, ())
+            for value in values:
+                out |= value
+            return out
+        return values
+
+    def filtered(self, func):
+        if isinstance(func, str):
+            name = func
+            func = lambda rec: getattr(rec, name)  # noqa: E731
+        return Recordset(self.env, self._name, [rec.id for rec in self if func(rec)])
+
+    def browse(self, ids):
+        if isinstance(ids, int):
+            ids = [ids]
+        return Recordset(self.env, self._name, ids or [])
+
+    def invalidate_model(self, fnames=None):
+        pass
+
+    def invalidate_recordset(self, fnames=None):
+        pass
+
+    def modified(self, fnames, create=False, before=False):
+        pass
+
+    def flush_model(self, fnames=None):
+        pass
+
+    # -- domains --------------------------------------------------
+    def _resolve(self, rid, path):
+        """(field, values) of a dotted `path` on row `rid`."""
+        model, ids = self._name, [rid]
+        parts = path.split('.')
+        for i, part in enumerate(parts):
+            field = self.env.schema[model].get(part)
+            values = []
+            for j in ids:
+                if part == 'id':
+                    values.append(j)
+                    continue
+                value = self.env.tables[model].get(j, {}).get(part, False)
+                if field and field[0] == 'm2m':
+                    values.extend(value or [])
+                else:
+                    values.append(value)
+            if i == len(parts) - 1:
+                return field, values
+            model = field[1]
+            ids = [v for v in values if v]
+        return None, []
+
+    @staticmethod
+    def _match_leaf(field, values, op, target):
+        target = _norm(target)
+        if field and field[0] == 'm2m' and op in ('in', '=', 'not in', '!='):
+            targets = set(target) if isinstance(target, (list, tuple, set, frozenset)) else {target}
+            if op in ('in', '='):
+                return bool(targets & set(values)) if target else not values
+            return not (targets & set(values))
+        for value in values or [False]:
+            value = _norm(value)
+            if op == '=' and value == target:
+                return True
+            if op == '!=' and value != target:
+                return True
+            if op in ('in', 'child_of') and value in target:
+                return True
+            if op == 'not in' and value not in target:
+                return True
+            if op in ('ilike', 'like') and value and str(target).lower() in str(value).lower():
+                return True
+            if op in ('=like', '=ilike') and value and fnmatch.fnmatchcase(
+                    str(value).lower(), str(target).lower().replace('%', '*').replace('_', '?')):
+                return True
+            if value is False or value is None:
+                continue
+            if (op == '<' and value < target or op == '<=' and value <= target
+                    or op == '>' and value > target or op == '>=' and value >= target):
+                return True
+        return False
+
+    def _eval(self, rid, domain):
+        stack = []
+        for term in reversed(domain or []):
+            if term == '&':
+                stack.append(stack.pop() and stack.pop())
+            elif term == '|':
+                a, b = stack.pop(), stack.pop()
+                stack.append(a or b)
+            elif term == '!':
+                stack.append(not stack.pop())
+            else:
+                path, op, target = term
+                field, values = self._resolve(rid, path)
+                stack.append(self._match_leaf(field, values, op, target))
+        return all(stack)
+
+    def _search_ids(self, domain, limit=None, order=None, offset=0):
+        # Sets for `in` lists, or large id lists make every search quadratic
+        domain = [(t[0], t[1], frozenset(t[2]))
+                  if isinstance(t, (list, tuple)) and t[1] in ('in', 'not in') and isinstance(t[2], (list, tuple))
+                  else t for t in domain or []]
+        # Archived rows are skipped unless the domain mentions `active` or active_test is off
+        mentions_active = (not getattr(self, '_active_test', True)
+                           or any(isinstance(t, (list, tuple)) and t[0] == 'active' for t in domain))
+        ids = [rid for rid, row in self._table.items()
+               if (mentions_active or row.get('active', True) is not False) and self._eval(rid, domain)]
+        if order:
+            for spec in reversed([s.strip() for s in order.split(',')]):
+                fname, _, direction = spec.partition(' ')
+                ids.sort(key=lambda i: (self._table[i].get(fname) is False, _norm(self._table[i].get(fname)) or 0),
+                         reverse=direction.strip().lower() == 'desc')
+        ids = ids[offset:]
+        return ids[:limit] if limit else ids
+
+    # -- ORM calls (counted) --------------------------------------
+    def search(self, domain, limit=None, order=None, offset=0):
+        self.env.count(self._name, 'search')
+        return Recordset(self.env, self._name, self._search_ids(domain, limit, order, offset))
+
+    def search_count(self, domain, limit=None):
+        self.env.count(self._name, 'search_count')
+        return len(self._search_ids(domain, limit))
+
+    def _row(self, rid, fields):
+        row = self._table[rid]
+        out = {'id': rid}
+        for fname in fields or [k for k in row if k != 'id']:
+            field = self._fields.get(fname)
+            value = row.get(fname, False)
+            if field and field[0] == 'm2o':
+                value = (value, self.env.tables[field[1]].get(value, {}).get('name', '')) if value else False
+            elif field and field[0] == 'm2m':
+                value = list(value or [])
+            out[fname] = value
+        return out
+
+    def search_read(self, domain=None, fields=None, offset=0, limit=None, order=None):
+        self.env.count(self._name, 'search_read')
+        return [self._row(rid, fields) for rid in self._search_ids(domain, limit, order, offset)]
+
+    def read(self, fields=None):
+        self.env.count(self._name, 'read')
+        return [self._row(rid, fields) for rid in self._ids]
+
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        """Grouping on plain columns with count, sum, max and array_agg aggregates."""
+        self.env.count(self._name, 'read_group')
+        if isinstance(groupby, str):
+            groupby = [groupby]
+        keys = [g.split(':')[0] for g in (groupby[:1] if lazy else groupby)]
+        groups = {}
+        for rid in self._search_ids(domain):
+            row = self._table[rid]
+            groups.setdefault(tuple(row.get(k, False) for k in keys), []).append(rid)
+        count_key = '%s_count' % keys[0] if lazy and keys else '__count'
+        result = []
+        for key, rids in groups.items():
+            entry = {}
+            for fname, value in zip(keys, key):
+                field = self._fields.get(fname)
+                if field and field[0] == 'm2o' and value:
+                    value = (value, self.env.tables[field[1]].get(value, {}).get('name', ''))
+                entry[fname] = value
+            entry[count_key] = len(rids)
+            for spec in fields:
+                fname, _, agg = spec.partition(':')
+                if agg == 'sum':
+                    entry[fname] = sum(self._table[r].get(fname) or 0 for r in rids)
+                elif agg == 'max':
+                    entry[fname] = max((self._table[r].get(fname) or 0 for r in rids), default=0)
+                elif agg == 'array_agg':
+                    entry[fname] = [self._table[r].get(fname) for r in rids]
+            entry['__domain'] = list(domain or [])
+            result.append(entry)
+        return result
+
+    def _apply(self, rid, vals):
+        """Write `vals` into row `rid`, resolving many2many commands; undoable."""
+        table = self._table
+        previous = dict(table[rid])
+        for fname, value in vals.items():
+            field = self._fields.get(fname)
+            if field and field[0] == 'm2m' and isinstance(value, list):
+                current = list(table[rid].get(fname) or [])
+                for command in value:
+                    if not isinstance(command, (list, tuple)):
+                        current.append(command)
+                    elif command[0] == 4 and command[1] not in current:
+                        current.append(command[1])
+                    elif command[0] == 3 and command[1] in current:
+                        current.remove(command[1])
+                    elif command[0] == 6:
+                        current = list(command[2])
+                    elif command[0] == 5:
+                        current = []
+                value = current
+            elif isinstance(value, Recordset):
+                value = value.id
+            table[rid][fname] = value
+        self.env.cr._undo.append(lambda: table.__setitem__(rid, previous))
+
+    def create(self, vals_list):
+        self.env.count(self._name, 'create')
+        if isinstance(vals_list, dict):
+            vals_list = [vals_list]
+        now = _now()
+        table = self._table
+        ids = []
+        for vals in vals_list:
+            rid = next(self.env._ids)
+            table[rid] = {'create_date': now, 'write_date': now}
+            self.env.cr._undo.append(lambda rid=rid: table.pop(rid, None))
+            self._apply(rid, vals)
+            ids.append(rid)
+        count_rows('created', len(ids))
+        return Recordset(self.env, self._name, ids)
+
+    def write(self, vals):
+        self.env.count(self._name, 'write')
+        vals = dict(vals, write_date=_now())
+        for rid in self._ids:
+            self._apply(rid, vals)
+        count_rows('written', len(self._ids))
+        return True
+
+    def unlink(self):
+        self.env.count(self._name, 'unlink')
+        table = self._table
+        for rid in self._ids:
+            row = table.pop(rid, None)
+            if row is not None:
+                self.env.cr._undo.append(lambda rid=rid, row=row: table.__setitem__(rid, row))
+        count_rows('unlinked', len(self._ids))
+        return True
+
+    # -- mail.thread, for exec'ing server action code -----------------
+    def message_post(self, body='', **kwargs):
+        self.ensure_one()
+        return self.env['mail.message'].create({'model': self._name, 'res_id': self.id, 'body': body})
+
+    def _message_log_batch(self, bodies, **kwargs):
+        return self.env['mail.message'].create([
+            {'model': self._name, 'res_id': rid, 'body': body} for rid, body in bodies.items()])
+
+
+# ============================================================
+# RUNNING SCRIPTS
+# ============================================================
+def run_script(env, path):
+    """Execute a setup script with `env` as its shell global; returns its namespace.
+
+    exit() calls in the script end the run quietly, as in odoo-bin shell.
+    """
+    with open(path) as fh:
+        code = compile(fh.read(), path, 'exec')
+    namespace = {'env': env, '__name__': '__itsm_script__'}
+    try:
+        exec(code, namespace)
+    except SystemExit:
+        pass
+    return namespace
+
+
+TYPE_SUFFIXES = ['-SUBMIT', '-FEATURE', '-CHANGE', '-ONBOARD', '-QUERY', '-API', '-OUTAGE']
+SERVICES = ['Akraa', 'Vendra', 'Fiber Networks', 'Leased Lines', 'Account Services', 'General Sales']
+
+
+def seed(env, n_types=10, requests_per_type=0):
+    """Load the rows the scripts expect to find, `n_types` request types and their requests.
+
+    Call counters are reset and the seed is committed, so measurements
+    start from zero.
+    """
+    for model in ('request.request', 'generic.team', 'res.users', 'res.partner',
+                  'helpdesk.ticket', 'request.type', 'request.stage'):
+        env['ir.model'].create({'model': model, 'name': model})
+    for fname in ('team_id', 'user_id'):
+        env['ir.model.fields'].create({'model': 'request.request', 'name': fname})
+    for fname in ('write_date', 'stage_id'):
+        env['ir.model.fields'].create({'model': 'helpdesk.ticket', 'name': fname})
+    env['ir.module.category'].create({'name': 'Helpdesk'})
+    partner = env['res.partner'].create({'name': 'Admin', 'email': 'admin@example.com'})
+    env['res.users'].create({'name': 'Admin', 'login': 'admin', 'partner_id': partner.id,
+                             'email': 'admin@example.com'})
+    for code in ('INPROGRESS', 'ESCALATED', 'RESOLVED', 'CLOSED'):
+        env['request.stage.type'].create({'name': code.title(), 'code': code})
+    services = env['generic.service'].create([{'name': name, 'active': True} for name in SERVICES])
+    types = env['request.type'].create([
+        {'name': 'Type %d' % i, 'code': 'SVC%d%s' % (i, TYPE_SUFFIXES[i % len(TYPE_SUFFIXES)]), 'active': True}
+        for i in range(n_types)])
+    if requests_per_type:
+        service_ids = services.ids
+        env['request.request'].create([
+            {'name': 'REQ-%d-%d' % (type_id, j), 'type_id': type_id, 'priority': str(j % 4),
+             'service_id': service_ids[type_id % len(service_ids)], 'request_text': 'Seeded request'}
+            for type_id in types.ids for j in range(requests_per_type)])
+    env.calls.clear()
+    env.cr.sql_log_count = 0
+    env.cr.executed = []
+    env.cr.commit()
+    return env
@@ -0,0 +1,125 @@
+"""
+WestMetro ITSM - Request Type Workflow Classifier
+====================================================
+Maps a request.type code to one of the five workflow templates of
+itsm_restructure_v4.py. Pure Python, no Odoo dependency, so intake
+tooling can import it and classify per ticket.
+
+Benchmark and golden check: benchmarks/bench_classify_type.py
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+# ================================================================
+# CLASSIFICATION RULES
+# ================================================================
+INCIDENT_SUFFIXES = [
+    '-SUBMIT', '-VALID', '-CSID', '-API', '-REPORT', '-ACCESS', '-DEVICE',
+    '-COMPLY', '-TECH', '-UPLOAD', '-FORMAT', '-DELAY', '-ALERT',
+    '-REG', '-DASH', '-DOC', '-VENDOR', '-PO', '-MATCH', '-WF',
+    '-SYNC', '-LOGIN', '-CLIENT', '-OUTAGE', '-CONNECT', '-HARDWARE',
+    '-PERF', '-PWD', '-PAYMENT',
+]
+
+SERVICE_REQUEST_SUFFIXES = [
+    '-FEATURE', '-UPGRADE', '-DOWNGRADE', '-CONFIG', '-TEMPLATE',
+    '-ADDUSER', '-REMOVEUSER', '-ROLECHANGE', '-BILLING', '-INVOICE',
+    '-AMEND', '-RENEWAL', '-INSTALL', '-SURVEY', '-MAINT',
+    '-ESCALATE', '-CANCEL',
+]
+
+CHANGE_SUFFIXES = ['-CHANGE']
+
+ONBOARD_SUFFIXES = [
+    '-ONBOARD', '-GOLIVE', '-POSTLIVE', '-REQ', '-DATAMIG',
+    '-INTEG', '-UAT',
+]
+
+SALES_SUFFIXES = [
+    '-QUERY', '-PRICING', '-DEMO', '-PROPOSAL', '-PARTNER',
+    '-FEEDBACK', '-INFO', '-TRAIN', '-ADMINTRAIN',
+]
+
+# Special cases for types that don't match suffix rules
+SPECIAL_OVERRIDES = {
+    'api-key': 'service_request',
+    'ERPDEP-CONFIG': 'onboarding',
+    'ERPDEP-GOLIVE': 'onboarding',
+    'ERPDEP-POSTLIVE': 'onboarding',
+    'ERPDEP-REQ': 'onboarding',
+    'ERPDEP-DATAMIG': 'onboarding',
+    'ERPDEP-INTEG': 'onboarding',
+    'ERPDEP-UAT': 'onboarding',
+    'ERPINT-NEW': 'onboarding',
+    'AKRAA-AUDIT': 'incident',
+    'FIBER-MAINT': 'service_request',
+}
+
+
+# Priority order of the suffix lists: first match wins
+WORKFLOW_RULES = [
+    ('change',          CHANGE_SUFFIXES),
+    ('onboarding',      ONBOARD_SUFFIXES),
+    ('sales',           SALES_SUFFIXES),
+    ('service_request', SERVICE_REQUEST_SUFFIXES),
+    ('incident',        INCIDENT_SUFFIXES),
+]
+
+DEFAULT_WORKFLOW = 'incident'
+
+
+# ================================================================
+# COMPILED MATCHER
+# ================================================================
+class SuffixMatcher:
+    """First-match suffix classifier compiled once from priority-ordered rules.
+
+    Every suffix goes into one dict mapping suffix -> (priority, result).
+    When all suffixes start with the same anchor character (the '-' of
+    the code lists), only the tails starting at an anchor in the code are
+    looked up, usually one or two dict hits per code. Otherwise every
+    distinct suffix length is tried. Either way the lowest priority among
+    the matching suffixes wins, which is what scanning the lists in order
+    with endswith() returns.
+    """
+
+    def __init__(self, rules, default):
+        self.default = default
+        self.table = {}
+        for priority, (result, suffixes) in enumerate(rules):
+            for suffix in suffixes:
+                self.table.setdefault(suffix, (priority, result))
+        anchors = {suffix[0] for suffix in self.table if suffix}
+        self.anchor = anchors.pop() if len(anchors) == 1 and all(self.table) else None
+        self.lengths = sorted({len(suffix) for suffix in self.table})
+
+    def match(self, text):
+        """Return the result of the highest-priority suffix of `text`."""
+        table = self.table
+        best = None
+        if self.anchor is not None:
+            pos = text.rfind(self.anchor)
+            while pos >= 0:
+                hit = table.get(text[pos:])
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+                pos = text.rfind(self.anchor, 0, pos)
+        else:
+            size = len(text)
+            for length in self.lengths:
+                if length > size:
+                    break
+                hit = table.get(text[size - length:])
+                if hit is not None and (best is None or hit[0] < best[0]):
+                    best = hit
+        return best[1] if best is not None else self.default
+
+
+WORKFLOW_MATCHER = SuffixMatcher(WORKFLOW_RULES, DEFAULT_WORKFLOW)
+
+
+def classify_type(code):
+    """Classify a request type code into a workflow template."""
+    if code in SPECIAL_OVERRIDES:
+        return SPECIAL_OVERRIDES[code]
+    return WORKFLOW_MATCHER.match(code.upper())
@@ -0,0 +1,167 @@
+"""
+WestMetro ITSM - Shared Helpers for the Odoo Shell Scripts
+============================================================
+Imported by the itsm_*.py setup scripts. Keep this file in the same
+directory as the scripts on the server (default /opt/odoo, override
+with the ITSM_SCRIPT_DIR environment variable).
+
+Every helper takes the shell `env` explicitly so it can be reused by
+any script without relying on shell globals.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import hashlib
+import json
+
+
+# ============================================================
+# FIELD VALUE HELPERS
+# ============================================================
+def m2o_id(value):
+    """Return the id of a many2one value as returned by search_read."""
+    if isinstance(value, (list, tuple)):
+        return value[0] if value else False
+    return value or False
+
+
+def invalidate(records, fnames=None):
+    """Drop cached field values of `records` after a raw SQL update."""
+    if hasattr(records, 'invalidate_recordset'):
+        records.invalidate_recordset(fnames)  # Odoo 16+
+    else:
+        records.invalidate_cache(fnames, records.ids)
+
+
+def flush(model, fnames=None):
+    """Write pending ORM changes of `model` to the database before raw SQL reads it."""
+    if hasattr(model, 'flush_model'):
+        model.flush_model(fnames)  # Odoo 16+
+    else:
+        model.flush(fnames)
+
+
+def _plain(value):
+    """Reduce a search_read value to what a write() would take."""
+    if isinstance(value, (list, tuple)) and len(value) == 2 and isinstance(value[1], str):
+        return value[0]
+    return value
+
+
+# ============================================================
+# PREFETCH-AND-DIFF RECONCILE ENGINE
+# ============================================================
+def prefetch(env, model, domain, fields, keys_of):
+    """Load `model` in one search_read and index ids by business key.
+
+    `keys_of(row)` returns the keys a row answers to (a stage linked to
+    several teams answers to one key per team). When two rows share a
+    key the first one wins, like search(..., limit=1) did.
+    """
+    index = {}
+    for row in env[model].search_read(domain, fields):
+        for key in keys_of(row):
+            index.setdefault(key, row['id'])
+    return index
+
+
+def reconcile(env, model, declared, domain, fields, keys_of):
+    """Create whatever is declared but missing, in one multi-record create.
+
+    `declared` maps business key -> create vals, in the order the records
+    should be created. Returns `(ids, created)` where `ids` maps every
+    existing and newly created key to its record id and `created` is the
+    list of keys that were created. Existing records are never written.
+    """
+    ids = prefetch(env, model, domain, fields, keys_of)
+    missing = [key for key in declared if key not in ids]
+    if missing:
+        records = env[model].create([declared[key] for key in missing])
+        ids.update(zip(missing, records.ids))
+    return ids, missing
+
+
+# ============================================================
+# UPSERT IF CHANGED (CONTENT FINGERPRINTS)
+# ============================================================
+# Fingerprints of the last values the scripts wrote are kept in
+# ir.config_parameter as itsm.fingerprint.<model>.<id>. A record whose
+# declared values hash to the stored fingerprint is left alone, so
+# manual edits made in the UI survive until the declaration changes.
+FINGERPRINT_PREFIX = 'itsm.fingerprint.'
+
+
+def fingerprint(vals):
+    """Stable content hash of a vals dict."""
+    payload = json.dumps(vals, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def load_fingerprints(env, model):
+    """Return {record id: fingerprint} for every managed record of `model`."""
+    prefix = f"{FINGERPRINT_PREFIX}{model}."
+    rows = env['ir.config_parameter'].search_read([('key', '=like', prefix + '%')], ['key', 'value'])
+    fingerprints = {}
+    for row in rows:
+        rec_id = row['key'][len(prefix):]
+        if rec_id.isdigit():
+            fingerprints[int(rec_id)] = row['value']
+    return fingerprints
+
+
+def record_fingerprints(env, model, updates):
+    """Store the fingerprint of `updates` ({id: vals}) as written content."""
+    if not updates:
+        return
+    params = {f"{FINGERPRINT_PREFIX}{model}.{rec_id}": fingerprint(vals) for rec_id, vals in updates.items()}
+    env['ir.config_parameter'].search([('key', 'in', list(params))]).unlink()
+    env['ir.config_parameter'].create([{'key': key, 'value': value} for key, value in params.items()])
+
+
+def forget_fingerprints(env, model, ids=None):
+    """Delete the stored fingerprints of `ids`, or of every record of `model`."""
+    prefix = f"{FINGERPRINT_PREFIX}{model}."
+    if ids is None:
+        domain = [('key', '=like', prefix + '%')]
+    elif ids:
+        domain = [('key', 'in', [f"{prefix}{rec_id}" for rec_id in ids])]
+    else:
+        return
+    env['ir.config_parameter'].search(domain).unlink()
+
+
+def write_if_changed(env, model, updates, current=None):
+    """Write `updates` ({id: vals}) only to records whose content changed.
+
+    Without `current` the vals are compared with the fingerprint stored on
+    the previous write, and a changed record gets all of its vals. With
+    `current` ({id: search_read row}) each field is compared with the row
+    the caller already read and only the differing fields are written, so
+    unchanged fields fire no tracking or automations and keep any manual
+    edit. Records receiving identical vals share one write() call.
+    Fingerprints of records deleted since they were stored are dropped.
+    Returns the list of ids that were written.
+    """
+    stored = {}
+    if current is None:
+        stored = load_fingerprints(env, model)
+        gone = set(stored).difference(env[model].browse(list(stored)).exists().ids)
+        forget_fingerprints(env, model, gone)
+    batches = {}  # fingerprint -> (vals, ids)
+    for rec_id, vals in updates.items():
+        if current is not None:
+            row = current[rec_id]
+            vals = {field: value for field, value in vals.items() if _plain(row.get(field)) != value}
+            if not vals:
+                continue
+        elif stored.get(rec_id) == fingerprint(vals):
+            continue
+        batches.setdefault(fingerprint(vals), (vals, []))[1].append(rec_id)
+
+    written = []
+    for vals, ids in batches.values():
+        env[model].browse(ids).write(vals)
+        written.extend(ids)
+    if current is None:
+        record_fingerprints(env, model, {rec_id: updates[rec_id] for rec_id in written})
+    return written
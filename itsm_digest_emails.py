@@ -19,6 +19,21 @@ Digest Types:
 
 Mail Server: servicedesk@westmetro.ng (id=2)
 
+The server actions render the Jinja templates through the
+wml.itsm.digest.renderer model of the wml_itsm addon (addons/wml_itsm),
+which compiles each template once and reuses it until it is edited.
+The weekly summary reads the addon's daily metric snapshots
+(wml.itsm.metric.daily) when they cover the week, and its SLA figures
+from the addon's SLA engine (wml.itsm.sla.engine).
+The Escalation Alert is sent by the addon's one-minute SLA breach cron,
+which only reads requests whose stored deadline has passed.
+
+Existing templates and server actions are only written when their
+declared content changed since the last run, and existing crons only
+when they differ from their declaration, e.g. after being switched off
+(see itsm_common.py, which must sit next to this script or in
+ITSM_SCRIPT_DIR, like itsm_progress.py and itsm_report.py).
+
 Run:
     cd /opt/odoo/odoo
     sudo -u odoo python3 odoo-bin shell -c /opt/odoo/conf/odoo.conf \
@@ -28,8 +43,21 @@ Author: WestMetro Limited | www.westmetrong.com
 """
 
 from datetime import datetime, timedelta
+import os
+import sys
 import traceback
 
+# Scripts are piped through odoo-bin shell, so locate the shared helpers explicitly
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+if ITSM_SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, ITSM_SCRIPT_DIR)
+
+from itsm_common import forget_fingerprints, record_fingerprints, write_if_changed
+from itsm_progress import record
+from itsm_report import finish_run, section, start_run
+
+start_run(env, 'itsm_digest_emails')
+
 print("\n" + "=" * 70)
 print("  WML ITSM DIGEST EMAILS IMPLEMENTATION")
 print("=" * 70)
@@ -44,6 +72,7 @@ PORTAL_URL = "https://servicedesk.westmetro.ng"
 # ================================================================
 # STEP 1: GET MODEL IDs
 # ================================================================
+section('STEP 1: MODEL IDS')
 print("\n" + "-" * 70)
 print("  STEP 1: FETCHING MODEL IDs")
 print("-" * 70)
@@ -59,10 +88,15 @@ if not request_model:
 print(f"  request.request model_id: {request_model.id}")
 print(f"  generic.team model_id: {team_model.id if team_model else 'N/A'}")
 print(f"  res.users model_id: {user_model.id}")
+if 'wml.itsm.digest.renderer' in env:
+    print("  Digest renderer: wml_itsm installed")
+else:
+    print("  WARNING: wml_itsm addon not installed - digests will be sent unrendered")
 
 # ================================================================
 # STEP 2: CREATE MAIL TEMPLATES
 # ================================================================
+section('STEP 2: MAIL TEMPLATES')
 print("\n" + "-" * 70)
 print("  STEP 2: CREATING MAIL TEMPLATES")
 print("-" * 70)
@@ -581,32 +615,42 @@ MAIL_TEMPLATES = [
     },
 ]
 
+template_updates = {}  # id -> managed vals
+template_names = {}
+created_fingerprints = {}
+
 for tmpl in MAIL_TEMPLATES:
     existing = env['mail.template'].search([('name', '=', tmpl['name'])], limit=1)
-    model_rec = env['ir.model'].search([('model', '=', tmpl['model'])], limit=1)
+    managed = {
+        'subject': tmpl['subject'],
+        'body_html': tmpl['body_html'],
+        'email_from': tmpl['email_from'],
+        'mail_server_id': MAIL_SERVER_ID,
+    }
     
     if existing:
-        existing.write({
-            'subject': tmpl['subject'],
-            'body_html': tmpl['body_html'],
-            'email_from': tmpl['email_from'],
-            'mail_server_id': MAIL_SERVER_ID,
-        })
-        print(f"  ○ Updated: {tmpl['name']}")
+        template_updates[existing.id] = managed
+        template_names[existing.id] = tmpl['name']
     else:
-        vals = {
+        model_rec = env['ir.model'].search([('model', '=', tmpl['model'])], limit=1)
+        vals = dict(managed, **{
             'name': tmpl['name'],
-            'subject': tmpl['subject'],
-            'body_html': tmpl['body_html'],
-            'email_from': tmpl['email_from'],
             'model_id': model_rec.id if model_rec else False,
             'model': tmpl['model'],
-            'mail_server_id': MAIL_SERVER_ID,
             'auto_delete': False,
-        }
-        env['mail.template'].create(vals)
+        })
+        rec = env['mail.template'].create(vals)
+        created_fingerprints[rec.id] = managed
         templates_created += 1
-        print(f"  + Created: {tmpl['name']}")
+        record('created', tmpl['name'], f"  + Created: {tmpl['name']}")
+
+written = write_if_changed(env, 'mail.template', template_updates)
+record_fingerprints(env, 'mail.template', created_fingerprints)
+for tid, name in template_names.items():
+    if tid in written:
+        record('updated', name, f"  ○ Updated: {name}")
+    else:
+        record('unchanged', name, f"  ○ Unchanged: {name}")
 
 env.cr.commit()
 print(f"\n  -> {templates_created} templates created")
@@ -614,6 +658,7 @@ print(f"\n  -> {templates_created} templates created")
 # ================================================================
 # STEP 3: CREATE SERVER ACTIONS
 # ================================================================
+section('STEP 3: SERVER ACTIONS')
 print("\n" + "-" * 70)
 print("  STEP 3: CREATING SERVER ACTIONS")
 print("-" * 70)
@@ -629,50 +674,112 @@ today = fields.Date.context_today(env.user)
 yesterday = fields.Date.subtract(today, days=1)
 
 teams = env['generic.team'].search([('active', '=', True)])
+five_days_ago = fields.Date.subtract(today, days=5)
 
-for team in teams:
-    # Get team leader email
-    if not team.leader_id or not team.leader_id.email:
+# Stage code -> digest bucket for open requests
+NEW_CODES = ['logged', 'new', 'received', 'submitted', 'initiated', 'rfc-submitted']
+STAGE_BUCKETS = {}
+for code in NEW_CODES:
+    STAGE_BUCKETS[code] = 'new'
+for code in ['in-progress', 'triaged', 'fulfillment', 'implementation', 'configuration']:
+    STAGE_BUCKETS[code] = 'in_progress'
+for code in ['pending', 'pending-vendor', 'awaiting-resp', 'under-review', 'cab-review']:
+    STAGE_BUCKETS[code] = 'pending'
+
+# Counts for all teams at once: one grouped query per metric instead of
+# five queries per team
+stats = {}
+for team_id in teams.ids:
+    stats[team_id] = {'new': 0, 'in_progress': 0, 'pending': 0, 'resolved_yesterday': 0, 'aged': 0}
+
+domain_open = [('team_id', 'in', teams.ids), ('stage_id.closed', '=', False)]
+open_groups = env['request.request'].read_group(
+    domain_open, ['team_id', 'stage_id'], ['team_id', 'stage_id'], lazy=False)
+stage_ids = list(set(g['stage_id'][0] for g in open_groups if g['stage_id']))
+stage_codes = {}
+for row in env['request.stage'].search_read([('id', 'in', stage_ids)], ['code']):
+    stage_codes[row['id']] = row['code']
+for g in open_groups:
+    if not g['team_id'] or not g['stage_id']:
         continue
-    
-    # Count requests by stage for this team
-    domain_base = [('team_id', '=', team.id), ('stage_id.closed', '=', False)]
-    
-    new_requests = env['request.request'].search(domain_base + [('stage_id.code', 'in', ['logged', 'new', 'received', 'submitted', 'initiated', 'rfc-submitted'])])
-    in_progress = env['request.request'].search(domain_base + [('stage_id.code', 'in', ['in-progress', 'triaged', 'fulfillment', 'implementation', 'configuration'])])
-    pending = env['request.request'].search(domain_base + [('stage_id.code', 'in', ['pending', 'pending-vendor', 'awaiting-resp', 'under-review', 'cab-review'])])
-    
-    # Resolved yesterday
-    resolved_yesterday = env['request.request'].search_count([
-        ('team_id', '=', team.id),
+    bucket = STAGE_BUCKETS.get(stage_codes.get(g['stage_id'][0]))
+    if bucket:
+        stats[g['team_id'][0]][bucket] += g['__count']
+
+# Resolved yesterday
+for g in env['request.request'].read_group([
+        ('team_id', 'in', teams.ids),
         ('stage_id.closed', '=', True),
         ('write_date', '>=', str(yesterday)),
         ('write_date', '<', str(today)),
-    ])
-    
-    # Aged requests (open > 5 days)
-    five_days_ago = fields.Date.subtract(today, days=5)
-    aged = env['request.request'].search_count(domain_base + [('create_date', '<', str(five_days_ago))])
-    
-    # SLA counts (simplified)
-    sla_warning = 0
-    sla_breached = 0
-    
-    # Build email content
-    template = env['mail.template'].search([('name', '=', 'ITSM: Daily Team Digest')], limit=1)
-    if template:
-        # Queue email (state='outgoing') - Mail Queue Manager cron will send it
-        subject = '[WML ITSM] Daily Team Digest - %s - %s' % (team.name, str(today))
-        mail_values = {
+], ['team_id'], ['team_id'], lazy=False):
+    if g['team_id']:
+        stats[g['team_id'][0]]['resolved_yesterday'] = g['__count']
+
+# Aged requests (open > 5 days)
+for g in env['request.request'].read_group(
+        domain_open + [('create_date', '<', str(five_days_ago))], ['team_id'], ['team_id'], lazy=False):
+    if g['team_id']:
+        stats[g['team_id'][0]]['aged'] = g['__count']
+
+# New requests listed in each digest, for all teams in one search
+new_by_team = {}
+for req in env['request.request'].search(domain_open + [('stage_id.code', 'in', NEW_CODES)], order='create_date desc'):
+    new_by_team.setdefault(req.team_id.id, []).append(req)
+
+template = env['mail.template'].search([('name', '=', 'ITSM: Daily Team Digest')], limit=1)
+
+digest_teams = []
+digest_values = []
+for team in teams:
+    # Get team leader email
+    if not team.leader_id or not team.leader_id.email:
+        continue
+
+    team_stats = stats[team.id]
+    digest_teams.append(team)
+    digest_values.append({
+        'portal_url': portal_url,
+        'team_name': team.name,
+        'date_str': str(today),
+        'new_count': team_stats['new'],
+        'in_progress_count': team_stats['in_progress'],
+        'pending_count': team_stats['pending'],
+        'resolved_yesterday': team_stats['resolved_yesterday'],
+        'aged_count': team_stats['aged'],
+        # SLA counts (simplified)
+        'sla_warning_count': 0,
+        'sla_breached_count': 0,
+        'new_requests': new_by_team.get(team.id, []),
+    })
+
+if template and digest_teams:
+    # The renderer (wml_itsm addon) parses the template once per version
+    if 'wml.itsm.digest.renderer' in env:
+        rendered = env['wml.itsm.digest.renderer'].render(template, digest_values)
+    else:
+        rendered = [('[WML ITSM] Daily Team Digest - %s - %s' % (v['team_name'], v['date_str']), template.body_html)
+                    for v in digest_values]
+    # Collect the whole run, one message per (recipient, subject)
+    outgoing = []
+    seen = set()
+    for team, (subject, body_html) in zip(digest_teams, rendered):
+        key = (team.leader_id.email.strip().lower(), subject)
+        if key in seen:
+            continue
+        seen.add(key)
+        outgoing.append({
             'subject': subject,
-            'body_html': template.body_html,
+            'body_html': body_html,
             'email_to': team.leader_id.email,
             'email_from': 'servicedesk@westmetro.ng',
             'mail_server_id': 2,
             'state': 'outgoing',
             'auto_delete': False,
-        }
-        env['mail.mail'].create(mail_values)
+        })
+    # Queue emails (state='outgoing') in one create - Mail Queue Manager cron will send them
+    if outgoing:
+        env['mail.mail'].create(outgoing)
 '''
 
 # Python code for Weekly Management Summary (no imports - Odoo safe)
@@ -689,42 +796,118 @@ week_end = fields.Date.add(week_start, days=6)
 # Get leadership users (admin as fallback)
 leaders = env['res.users'].search([('id', '=', 2)])
 
-# Calculate metrics
-total_opened = env['request.request'].search_count([
-    ('create_date', '>=', str(week_start)),
-    ('create_date', '<=', str(week_end)),
-])
+# SLA compliance of the requests opened this week, from the wml_itsm SLA engine
+sla_by_team = {}
+priority_stats = []
+if 'wml.itsm.sla.engine' in env:
+    sla = env['wml.itsm.sla.engine'].compute(str(week_start), str(fields.Date.add(week_end, days=1)))
+    sla_compliance = sla['overall']['compliance']
+    for entry in sla['by_team']:
+        sla_by_team[entry['team_id']] = entry['compliance']
+    for entry in sla['by_priority']:
+        priority_stats.append({
+            'name': 'Priority %s' % entry['priority'] if entry['priority'] else 'Not set',
+            'total': entry['total'],
+            'met': entry['met'],
+            'breached': entry['breached'],
+            'compliance': entry['compliance'],
+            'avg_resolution': '%sh' % entry['avg_resolution'],
+        })
+else:
+    # SLA compliance (simplified)
+    sla_compliance = 85
+
+# Calculate metrics from the daily snapshots (wml_itsm addon): a few
+# pre-aggregated rows per day instead of scanning request.request.
+# Only a week with a snapshot for each of its 7 days is used; a partly
+# covered one (addon installed mid-week, missed cron) is counted live.
+week_domain = [('date', '>=', str(week_start)), ('date', '<=', str(week_end))]
+snapshot_days = 0
+if 'wml.itsm.metric.daily' in env:
+    snapshot_days = len(env['wml.itsm.metric.daily'].read_group(week_domain, ['date'], ['date:day']))
+has_snapshots = snapshot_days == 7
+team_stats = []
+if has_snapshots:
+    metrics = env['wml.itsm.metric.daily']
+    week = metrics.read_group(week_domain, ['opened_count:sum', 'closed_count:sum'], [])[0]
+    total_opened = week['opened_count'] or 0
+    total_closed = week['closed_count'] or 0
 
-total_closed = env['request.request'].search_count([
-    ('stage_id.closed', '=', True),
-    ('write_date', '>=', str(week_start)),
-    ('write_date', '<=', str(week_end)),
-])
+    # Backlog as of the last snapshot of the week
+    last_day = metrics.search(week_domain, order='date desc', limit=1).date
+    backlog_by_team = {}
+    open_backlog = 0
+    for g in metrics.read_group([('date', '=', last_day)], ['backlog_count:sum'], ['team_id']):
+        open_backlog += g['backlog_count'] or 0
+        if g['team_id']:
+            backlog_by_team[g['team_id'][0]] = g['backlog_count'] or 0
 
-open_backlog = env['request.request'].search_count([
-    ('stage_id.closed', '=', False),
-])
+    for g in metrics.read_group(week_domain + [('team_id', '!=', False)],
+                                ['opened_count:sum', 'closed_count:sum'], ['team_id']):
+        team_stats.append({
+            'name': g['team_id'][1],
+            'assigned': g['opened_count'] or 0,
+            'resolved': g['closed_count'] or 0,
+            'open': backlog_by_team.get(g['team_id'][0], 0),
+            'sla_pct': sla_by_team.get(g['team_id'][0], sla_compliance),
+        })
+else:
+    total_opened = env['request.request'].search_count([
+        ('create_date', '>=', str(week_start)),
+        ('create_date', '<=', str(week_end)),
+    ])
+
+    total_closed = env['request.request'].search_count([
+        ('stage_id.closed', '=', True),
+        ('write_date', '>=', str(week_start)),
+        ('write_date', '<=', str(week_end)),
+    ])
+
+    open_backlog = env['request.request'].search_count([
+        ('stage_id.closed', '=', False),
+    ])
 
-# SLA compliance (simplified)
-sla_compliance = 85
+summary_values = {
+    'portal_url': portal_url,
+    'week_number': week_start.isocalendar()[1],
+    'week_start': str(week_start),
+    'week_end': str(week_end),
+    'total_opened': total_opened,
+    'total_closed': total_closed,
+    'sla_compliance': sla_compliance,
+    'open_backlog': open_backlog,
+    'priority_stats': priority_stats,
+    'team_stats': team_stats,
+    'top_types': [],
+}
 
 template = env['mail.template'].search([('name', '=', 'ITSM: Weekly Management Summary')], limit=1)
 if template:
+    # Same content for every leader: render once
+    if 'wml.itsm.digest.renderer' in env:
+        subject, body_html = env['wml.itsm.digest.renderer'].render(template, [summary_values])[0]
+    else:
+        subject = '[WML ITSM] Weekly Management Summary - Week %s' % str(week_start)
+        body_html = template.body_html
+    # Collect the whole run, one message per recipient
+    outgoing = []
+    seen = set()
     for leader in leaders:
-        if not leader.email:
+        if not leader.email or leader.email.strip().lower() in seen:
             continue
-        subject = '[WML ITSM] Weekly Management Summary - Week %s' % str(week_start)
-        # Queue email (state='outgoing') - Mail Queue Manager cron will send it
-        mail_values = {
+        seen.add(leader.email.strip().lower())
+        outgoing.append({
             'subject': subject,
-            'body_html': template.body_html,
+            'body_html': body_html,
             'email_to': leader.email,
             'email_from': 'servicedesk@westmetro.ng',
             'mail_server_id': 2,
             'state': 'outgoing',
             'auto_delete': False,
-        }
-        env['mail.mail'].create(mail_values)
+        })
+    # Queue emails (state='outgoing') in one create - Mail Queue Manager cron will send them
+    if outgoing:
+        env['mail.mail'].create(outgoing)
 '''
 
 # Create server actions
@@ -743,18 +926,17 @@ SERVER_ACTIONS = [
 
 actions_created = 0
 action_ids = {}
+action_updates = {}
+created_fingerprints = {}
 
 for act in SERVER_ACTIONS:
     existing = env['ir.actions.server'].search([('name', '=', act['name'])], limit=1)
-    model_rec = env['ir.model'].search([('model', '=', act['model'])], limit=1)
     
     if existing:
-        existing.write({
-            'code': act['code'],
-        })
+        action_updates[existing.id] = {'code': act['code']}
         action_ids[act['name']] = existing.id
-        print(f"  ○ Updated: {act['name']}")
     else:
+        model_rec = env['ir.model'].search([('model', '=', act['model'])], limit=1)
         vals = {
             'name': act['name'],
             'state': 'code',
@@ -764,8 +946,17 @@ for act in SERVER_ACTIONS:
         }
         rec = env['ir.actions.server'].create(vals)
         action_ids[act['name']] = rec.id
+        created_fingerprints[rec.id] = {'code': act['code']}
         actions_created += 1
-        print(f"  + Created: {act['name']} (id={rec.id})")
+        record('created', act['name'], f"  + Created: {act['name']} (id={rec.id})")
+
+written = write_if_changed(env, 'ir.actions.server', action_updates)
+record_fingerprints(env, 'ir.actions.server', created_fingerprints)
+for name, aid in action_ids.items():
+    if aid in written:
+        record('updated', name, f"  ○ Updated: {name}")
+    elif aid in action_updates:
+        record('unchanged', name, f"  ○ Unchanged: {name}")
 
 env.cr.commit()
 print(f"\n  -> {actions_created} server actions created")
@@ -773,6 +964,7 @@ print(f"\n  -> {actions_created} server actions created")
 # ================================================================
 # STEP 4: CREATE SCHEDULED CRON JOBS
 # ================================================================
+section('STEP 4: CRON JOBS')
 print("\n" + "-" * 70)
 print("  STEP 4: CREATING SCHEDULED CRON JOBS")
 print("-" * 70)
@@ -796,24 +988,36 @@ CRON_JOBS = [
     },
 ]
 
+# Crons are compared with their live rows, not with a fingerprint, so a
+# cron switched off by hand or by running out of numbercall is switched
+# back on by the next run. Archived crons are found too.
+CRON_FIELDS = ['cron_name', 'ir_actions_server_id', 'interval_number', 'interval_type', 'active']
+cron_rows = {}  # cron name -> search_read row of the first cron of that name
+for row in env['ir.cron'].with_context(active_test=False).search_read(
+        [('cron_name', 'in', [cron['cron_name'] for cron in CRON_JOBS])], CRON_FIELDS, order='id'):
+    cron_rows.setdefault(row['cron_name'], row)
+
 crons_created = 0
+cron_updates = {}
+cron_names = {}
 
 for cron in CRON_JOBS:
-    existing = env['ir.cron'].search([('cron_name', '=', cron['cron_name'])], limit=1)
+    existing = cron_rows.get(cron['cron_name'])
     action_id = action_ids.get(cron['action_name'])
     
     if not action_id:
-        print(f"  ✗ Action not found for: {cron['cron_name']}")
+        record('error', cron['cron_name'], f"  ✗ Action not found for: {cron['cron_name']}")
         continue
     
+    managed = {
+        'ir_actions_server_id': action_id,
+        'interval_number': cron['interval_number'],
+        'interval_type': cron['interval_type'],
+        'active': True,
+    }
     if existing:
-        existing.write({
-            'ir_actions_server_id': action_id,
-            'interval_number': cron['interval_number'],
-            'interval_type': cron['interval_type'],
-            'active': True,
-        })
-        print(f"  ○ Updated: {cron['cron_name']}")
+        cron_updates[existing['id']] = managed
+        cron_names[existing['id']] = cron['cron_name']
     else:
         vals = {
             'cron_name': cron['cron_name'],
@@ -829,7 +1033,16 @@ for cron in CRON_JOBS:
         }
         env['ir.cron'].create(vals)
         crons_created += 1
-        print(f"  + Created: {cron['cron_name']}")
+        record('created', cron['cron_name'], f"  + Created: {cron['cron_name']}")
+
+written = write_if_changed(env, 'ir.cron', cron_updates,
+                           current={row['id']: row for row in cron_rows.values()})
+forget_fingerprints(env, 'ir.cron')  # left by runs that fingerprinted crons
+for cid, name in cron_names.items():
+    if cid in written:
+        record('updated', name, f"  ○ Updated: {name}")
+    else:
+        record('unchanged', name, f"  ○ Unchanged: {name}")
 
 env.cr.commit()
 print(f"\n  -> {crons_created} cron jobs created")
@@ -837,6 +1050,7 @@ print(f"\n  -> {crons_created} cron jobs created")
 # ================================================================
 # SUMMARY
 # ================================================================
+section('SUMMARY')
 print("\n" + "=" * 70)
 print("  IMPLEMENTATION COMPLETE")
 print("=" * 70)
@@ -863,3 +1077,5 @@ print("  4. Set up SLA rules for accurate breach tracking")
 print("  5. Adjust cron schedules if needed: Settings → Technical → Scheduled Actions")
 print("=" * 70)
 print()
+
+finish_run()
@@ -0,0 +1,159 @@
+"""
+WestMetro ITSM - Run Journal and Resume
+=========================================
+Records which request types a long script run has finished, so a run
+that died halfway (OOM, dropped SSH session, lock timeout) can be
+resumed at the first unfinished type instead of redone from the top.
+
+The journal of a run is a JSON-lines file named after the script and
+the run id:
+
+    {"run_id": "20261017-101500", "script": ..., "database": ..., "settings": ..., "started": ...}
+    {"step": "STEP 6", "ids": [12, 13, 14], "at": ...}
+    ...
+    {"finished": true, "at": ...}
+
+Units are only journaled after the transaction holding their work has
+been committed (see RunJournal.commit), so a journaled unit is always
+in the database. A crash between the commit and the journal write only
+means those units are redone, and the scripts are idempotent.
+
+    journal = open_journal(env, 'itsm_restructure_v4')
+    todo = [i for i in type_ids if i not in journal.done_ids('STEP 6')]
+    ...
+    journal.mark('STEP 6', rt.id)
+    journal.commit(env)       # env.cr.commit(), then journal the marks
+    ...
+    journal.finish()
+
+Configuration (environment variables):
+    ITSM_RESUME        run id to resume, or "last" for the latest run of
+                       the script (default: start a new run)
+    ITSM_JOURNAL_DIR   directory of the journals (default <ITSM_SCRIPT_DIR>/journal)
+
+Journals are appended to from itsm_parallel workers too: each batch is
+one write of one line to a file opened in append mode.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+JOURNAL_DIR = os.environ.get('ITSM_JOURNAL_DIR') or os.path.join(
+    os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo'), 'journal')
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class RunJournal:
+    """Units of work done by one run of a script, by step."""
+
+    def __init__(self, path, run_id, done, resumed):
+        self.path = path
+        self.run_id = run_id
+        self.resumed = resumed
+        self._done = done      # step -> set of ids already journaled
+        self._pending = {}     # step -> ids marked since the last commit
+
+    def done_ids(self, step):
+        """Ids journaled as done for `step`, by this run or the run it resumes."""
+        return self._done.get(step, set())
+
+    def mark(self, step, ids):
+        """Queue `ids` (an id or a list) as done; journaled by the next commit()."""
+        if isinstance(ids, int):
+            ids = [ids]
+        self._pending.setdefault(step, []).extend(ids)
+
+    def commit(self, env):
+        """Commit the transaction, then journal everything marked since the last commit."""
+        env.cr.commit()
+        pending, self._pending = self._pending, {}
+        lines = []
+        for step, ids in pending.items():
+            self._done.setdefault(step, set()).update(ids)
+            lines.append({'step': step, 'ids': ids, 'at': _now()})
+        self._append(lines)
+
+    def finish(self):
+        """Record the run as finished (a later resume then has nothing to do)."""
+        self._append([{'finished': True, 'at': _now()}])
+
+    def _append(self, lines):
+        if lines:
+            with open(self.path, 'a') as f:
+                f.write(''.join(json.dumps(line) + '\n' for line in lines))
+
+
+def _run_order(path):
+    """Sort key of a journal by its run id (20261017-101500 < 20261017-101500-2)."""
+    run_id = os.path.basename(path)[:-len('.jsonl')].split('-', 1)[1]
+    return [int(part) for part in re.findall(r'\d+', run_id)]
+
+
+def _read(path):
+    """(header, {step: set of ids}, finished) of a journal file."""
+    header, done, finished = None, {}, False
+    with open(path) as f:
+        for raw in f:
+            try:
+                line = json.loads(raw)
+            except ValueError:
+                continue  # last line cut short by the crash
+            if 'run_id' in line:
+                header = line
+            elif 'step' in line:
+                done.setdefault(line['step'], set()).update(line['ids'])
+            elif line.get('finished'):
+                finished = True
+    return header, done, finished
+
+
+def open_journal(env, script, **settings):
+    """Start the journal of a new run, or reopen the one named by ITSM_RESUME.
+
+    `settings` (e.g. the restructure mode) are stored with a new run and
+    must match when it is resumed. Prints which run is journaled and how
+    to resume it.
+    """
+    os.makedirs(JOURNAL_DIR, exist_ok=True)
+    resume = os.environ.get('ITSM_RESUME', '').strip()
+    if resume:
+        if resume == 'last':
+            paths = sorted(glob.glob(os.path.join(JOURNAL_DIR, f"{script}-*.jsonl")))
+            if not paths:
+                raise ValueError(f"ITSM_RESUME=last: no journal of {script} in {JOURNAL_DIR}")
+            path = max(paths, key=_run_order)
+        else:
+            path = os.path.join(JOURNAL_DIR, f"{script}-{resume}.jsonl")
+            if not os.path.exists(path):
+                raise ValueError(f"ITSM_RESUME={resume}: no journal {path}")
+        header, done, finished = _read(path)
+        if header['database'] != env.cr.dbname:
+            raise ValueError(f"Journal {path} belongs to database {header['database']}, not {env.cr.dbname}")
+        if header.get('settings', {}) != settings:
+            raise ValueError(f"Journal {path} was started with {header.get('settings')}, not {settings}")
+        journal = RunJournal(path, header['run_id'], done, resumed=True)
+        units = sum(len(ids) for ids in done.values())
+        state = "finished" if finished else "interrupted"
+        print(f"  Resuming run {journal.run_id} ({state}): {units} units already done")
+        return journal
+
+    run_id = base_id = datetime.now().strftime('%Y%m%d-%H%M%S')
+    path = os.path.join(JOURNAL_DIR, f"{script}-{run_id}.jsonl")
+    n = 1
+    while os.path.exists(path):  # several runs within one second
+        n += 1
+        run_id = f"{base_id}-{n}"
+        path = os.path.join(JOURNAL_DIR, f"{script}-{run_id}.jsonl")
+    journal = RunJournal(path, run_id, {}, resumed=False)
+    journal._append([{'run_id': run_id, 'script': script, 'database': env.cr.dbname,
+                      'settings': settings, 'started': _now()}])
+    print(f"  Run {run_id} (if interrupted, rerun with ITSM_RESUME={run_id})")
+    return journal
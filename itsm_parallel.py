@@ -0,0 +1,158 @@
+"""
+WestMetro ITSM - Parallel Apply Across Request Types
+======================================================
+Splits a list of request type ids across forked worker processes. Every
+stage and route is scoped by request_type_id, so each worker can rebuild
+its share on its own connection and in its own transaction. Counters,
+error lines and console output come back to the parent, which prints
+them in worker order and merges them into one summary.
+
+Used by itsm_shell_importer_v2.py and itsm_restructure_v4.py. The worker
+count comes from the ITSM_WORKERS environment variable; the default of 1
+runs in-process on the shell cursor exactly as before.
+
+Sections measured by itsm_report inside a worker are sent back with its
+report and merged into the run report of the parent.
+
+Linux only (os.fork). Each worker holds one extra PostgreSQL connection.
+Work functions must use the cursor of the env they are given: the
+registry of a worker still holds the connection pool inherited from the
+parent, so registry.cursor() (and ORM code that opens a new cursor)
+raises in a worker instead of sharing the parent's sockets.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import io
+import os
+import pickle
+import sys
+import traceback
+
+from itsm_report import count_cursor, end_section, merge_sections, worker_begin, worker_sections
+
+WORKERS = max(1, int(os.environ.get('ITSM_WORKERS', 1)))
+
+
+def partition(ids, workers):
+    """Deal `ids` round-robin into at most `workers` non-empty lists."""
+    workers = max(1, min(workers, len(ids)))
+    return [ids[i::workers] for i in range(workers)]
+
+
+def _worker_env(env):
+    """Return an environment on a brand new connection (forked child only).
+
+    The connection comes from a pool of its own rather than db_connect():
+    the module pool inherited from the parent holds the parent's sockets,
+    and reusing one of its idle connections would share a session with
+    it. No module state is changed; the inherited connections are left
+    alone, since closing a forked psycopg2 connection terminates the
+    parent's session on the server.
+    """
+    from odoo import api, sql_db
+
+    dbname, info = sql_db.connection_info_for(env.cr.dbname)
+    db = sql_db.Connection(sql_db.ConnectionPool(1), dbname, info)
+    # Only this process's copy of the registry is changed
+    env.registry.cursor = _no_registry_cursor
+    return api.Environment(db.cursor(), env.uid, dict(env.context))
+
+
+def _no_registry_cursor(*args, **kwargs):
+    raise RuntimeError("itsm_parallel workers must use the cursor of their env: "
+                       "the registry's connection pool belongs to the parent process")
+
+
+def _run_worker(env, ids, work, wfd):
+    """Child side: run `work` on `ids`, send the report down `wfd`, exit.
+
+    Everything the child prints, stderr included, travels back in the
+    report: the inherited streams may be shared with other processes
+    (the client socket under itsm_runner).
+    """
+    status = 1
+    output = io.StringIO()
+    error_output = io.StringIO()
+    sys.stdout, sys.stderr = output, error_output  # this process only
+    worker_begin()
+    try:
+        try:
+            worker_env = _worker_env(env)
+            count_cursor(worker_env.cr)
+            try:
+                totals, errors = work(worker_env, ids)
+                worker_env.cr.commit()
+            finally:
+                worker_env.cr.close()
+            report = {'totals': totals, 'errors': errors}
+            status = 0
+        except Exception as e:
+            report = {'totals': {}, 'errors': [f"  ✗ worker aborted ({len(ids)} types, uncommitted batch rolled back): {e}"]}
+            traceback.print_exc()
+        report['sections'] = worker_sections()  # closing the section prints its totals
+        report['output'] = output.getvalue()
+        report['stderr'] = error_output.getvalue()
+        with os.fdopen(wfd, 'wb') as pipe:
+            pickle.dump(report, pipe)
+    finally:
+        os._exit(status)  # skip atexit/finalizers that would touch inherited state
+
+
+def _invalidate_all(env):
+    if hasattr(env, 'invalidate_all'):
+        env.invalidate_all()  # Odoo 16+
+    else:
+        env.cache.invalidate()
+
+
+def run_partitioned(env, ids, work, workers=WORKERS):
+    """Run `work(env, ids)` over `ids` split across `workers` processes.
+
+    `work` must return `(totals, errors)`: a dict of integer counters and a
+    list of error lines, and commit its own batches. With a single worker
+    it runs here on `env`. Otherwise pending work is committed first so
+    the workers see it, and the summed totals and concatenated errors of
+    all workers are returned.
+    """
+    chunks = partition(list(ids), workers)
+    if len(chunks) <= 1:
+        return work(env, list(ids))
+
+    env.cr.commit()
+    end_section()  # the workers report their own sections
+    sys.stdout.flush()  # unflushed output would be duplicated in every child
+    sys.stderr.flush()
+
+    children = []
+    for chunk in chunks:
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            _run_worker(env, chunk, work, wfd)
+        os.close(wfd)
+        children.append((pid, rfd, chunk))
+
+    totals = {}
+    errors = []
+    for index, (pid, rfd, chunk) in enumerate(children, 1):
+        with os.fdopen(rfd, 'rb') as pipe:
+            data = pipe.read()
+        os.waitpid(pid, 0)
+        if data:
+            report = pickle.loads(data)
+        else:
+            report = {'totals': {}, 'output': '',
+                      'errors': [f"  ✗ worker {index} died without a report ({len(chunk)} types)"]}
+        print(f"\n  -- worker {index}/{len(children)}: {len(chunk)} types --")
+        print(report['output'], end='')
+        sys.stderr.write(report.get('stderr', ''))
+        for key, value in report['totals'].items():
+            totals[key] = totals.get(key, 0) + value
+        errors.extend(report['errors'])
+        merge_sections(report.get('sections', []))
+
+    # The workers changed rows this process may still have cached
+    _invalidate_all(env)
+    return totals, errors
@@ -0,0 +1,198 @@
+"""
+WestMetro ITSM - Progress Events and Console Rendering
+========================================================
+The setup scripts used to print one line per record. With thousands of
+request types over SSH the terminal output costs real time, and the
+error lines scroll away between the successes. Instead, every record a
+script handles is now one structured event:
+
+    record('created', rt.code, f"  ✓ {rt.code} -> {wf_name} (...)")
+
+Record lines grouped under a heading use note() for the heading, so it
+is only printed along with them.
+
+Each event (section, entity, action, seconds since the previous event,
+console line) is appended to a JSON-lines log next to the run report,
+<ITSM_REPORT_DIR>/<script>-<timestamp>.events.jsonl, whatever the
+verbosity. What reaches the console depends on ITSM_VERBOSITY:
+
+    0   errors and the totals of every section
+    1   as 0, plus a progress bar per section, redrawn at most every
+        0.2s (default)
+    2   as 0, plus every record line, as the scripts printed before
+
+Sections are the itsm_report sections: opening one starts a new bar and
+closing it prints its totals, e.g.
+    → STEP 6: STAGES AND ROUTES: 1000 records (✓ 988 ○ 10 ✗ 2) in 41.3s
+
+Without a terminal (output redirected, itsm_runner) the bar becomes a
+plain status line every 5 seconds. In itsm_parallel workers the bar is
+off; their section totals and errors come back with the worker output.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import json
+import os
+import sys
+import time
+
+VERBOSITY = int(os.environ.get('ITSM_VERBOSITY', 1))
+
+# Console mark of each action
+ACTIONS = {
+    'created': '✓',
+    'updated': '✓',
+    'unchanged': '○',
+    'skipped': '○',
+    'error': '✗',
+}
+MARKS = ('✓', '○', '✗')
+
+BAR_INTERVAL = 0.2     # seconds between bar redraws on a terminal
+STATUS_INTERVAL = 5.0  # seconds between status lines without one
+BAR_WIDTH = 24
+
+# The event log and section in progress (see start/begin), None outside a run
+_log = None
+_section = None
+_bar = True
+
+
+def _stdout_is_terminal():
+    try:
+        return sys.stdout.isatty()
+    except (AttributeError, ValueError):
+        return False
+
+
+def start(path):
+    """Open the event log of a run (called by itsm_report.start_run)."""
+    global _log, _bar
+    finish()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _log = open(path, 'a')
+    except OSError as e:
+        print(f"  ✗ could not open event log {path}: {e}")
+    _bar = True
+
+
+def begin(name):
+    """Start counting the records of section `name`."""
+    global _section
+    end()
+    now = time.perf_counter()
+    _section = {
+        'name': name, 't0': now, 'last': now, 'drawn': now, 'shown': False,
+        'total': None, 'count': 0, 'marks': dict.fromkeys(MARKS, 0),
+        'entity': '',
+    }
+
+
+def expect(total):
+    """Announce how many records the current section will handle (for the bar)."""
+    if _section is not None:
+        _section['total'] = total
+
+
+def record(action, entity, line):
+    """Log one handled record; `line` is its console line at verbosity 2.
+
+    `action` is one of ACTIONS; errors are always printed.
+    """
+    now = time.perf_counter()
+    mark = ACTIONS[action]
+    if _section is None:
+        begin('')
+    section = _section
+    if _log is not None:
+        _log.write(json.dumps({
+            'section': section['name'], 'entity': entity, 'action': action,
+            'seconds': round(now - section['last'], 4), 'line': line.strip(),
+        }) + '\n')
+    section['last'] = now
+    section['count'] += 1
+    section['marks'][mark] += 1
+    section['entity'] = entity
+
+    if VERBOSITY >= 2 or action == 'error':
+        _clear_bar()
+        print(line)
+    elif VERBOSITY == 1 and _bar:
+        interval = BAR_INTERVAL if _stdout_is_terminal() else STATUS_INTERVAL
+        if now - section['drawn'] >= interval:
+            section['drawn'] = now
+            _draw_bar()
+
+
+def note(line):
+    """Print a heading that only makes sense above record lines (verbosity 2)."""
+    if VERBOSITY >= 2:
+        print(line)
+
+
+def _counts(section):
+    return ' '.join(f"{mark} {section['marks'][mark]}" for mark in MARKS)
+
+
+def _draw_bar():
+    section = _section
+    total = section['total']
+    if total:
+        done = min(section['count'], total)
+        filled = BAR_WIDTH * done // total
+        progress = f"[{'#' * filled}{'-' * (BAR_WIDTH - filled)}] {done}/{total}"
+    else:
+        progress = f"{section['count']} records"
+    text = f"  {section['name'][:28]} {progress}  {_counts(section)}  {section['entity'][:20]}"
+    if _stdout_is_terminal():
+        sys.stdout.write('\r' + text.ljust(100)[:100])
+        sys.stdout.flush()
+        section['shown'] = True
+    else:
+        print(text)
+
+
+def _clear_bar():
+    if _section is not None and _section['shown']:
+        sys.stdout.write('\r' + ' ' * 100 + '\r')
+        _section['shown'] = False
+
+
+def end():
+    """Close the current section: clear its bar and print its totals."""
+    global _section
+    section, _section = _section, None
+    if section is None:
+        return
+    if section['shown']:
+        sys.stdout.write('\r' + ' ' * 100 + '\r')
+    if section['count']:
+        seconds = time.perf_counter() - section['t0']
+        name = f"{section['name']}: " if section['name'] else ''
+        print(f"  → {name}{section['count']} records ({_counts(section)}) in {seconds:.1f}s")
+    if _log is not None:
+        _log.flush()
+
+
+def worker_begin():
+    """In a freshly forked worker: no bar, and line-sized appends to the shared log."""
+    global _log, _section, _bar
+    _section = None
+    _bar = False
+    if _log is not None:
+        inherited = _log  # flushed by the parent before forking
+        inherited.close()
+        _log = open(inherited.name, 'a', buffering=1)
+
+
+def finish():
+    """Close the current section and the event log; returns the log path."""
+    global _log
+    end()
+    log, _log = _log, None
+    if log is None:
+        return None
+    log.close()
+    return log.name
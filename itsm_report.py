@@ -0,0 +1,300 @@
+"""
+WestMetro ITSM - Per-Section Run Report
+=========================================
+Measures every section of an itsm_*.py script run: wall time, SQL
+queries and the rows created, written and unlinked through the ORM. At
+the end of the run the figures are printed as a table and saved as a
+JSON report, one file per run, so the dominant section of a run and
+regressions between runs can be spotted.
+
+    start_run(env, 'itsm_shell_importer')
+    section('GROUPS')
+    ...
+    section('TEAMS')       # closes GROUPS
+    ...
+    finish_run()           # closes TEAMS, prints and writes the report
+
+Configuration (environment variables):
+    ITSM_REPORT_DIR   directory for the reports (default <ITSM_SCRIPT_DIR>/reports)
+    ITSM_PROFILE      1 to also cProfile each section into a .prof file
+                      next to the report (open with pstats or snakeviz)
+
+Sections are also the sections of the progress events (itsm_progress),
+whose log is written next to the report.
+
+Queries are counted on the shell thread, so raw SQL counts too. Row
+counts only see ORM calls on the cursors of the run: rows changed by raw
+SQL show up as queries only, and other cursors of the process (cron and
+http threads under itsm_runner) are not counted. The ORM methods are
+only wrapped during a run: finish_run() and abort_run() put the
+originals back. Sections run in itsm_parallel workers are sent back to
+the parent and merged by name (queries and rows summed, time of the
+slowest worker).
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import cProfile
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime
+
+import itsm_progress
+
+REPORT_DIR = os.environ.get('ITSM_REPORT_DIR') or os.path.join(
+    os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo'), 'reports')
+PROFILE = os.environ.get('ITSM_PROFILE', '0').lower() in ('1', 'true', 'yes')
+
+ROW_KEYS = ('created', 'written', 'unlinked')
+COUNT_KEYS = ('queries',) + ROW_KEYS
+
+# Rows passed through the ORM in this process, by operation
+_rows = dict.fromkeys(ROW_KEYS, 0)
+
+# The run in progress (see start_run), None outside a run
+_run = None
+
+
+def count_rows(operation, count):
+    """Add `count` rows to an ORM operation counter ('created', 'written' or 'unlinked')."""
+    _rows[operation] += count
+
+
+def _counted(records):
+    """Whether `records` are on a cursor of the run in progress."""
+    return _run is not None and any(records.env.cr is cr for cr in _run.cursors)
+
+
+def _patch_orm():
+    """Count the rows of BaseModel create/write/unlink on the run's cursors; returns the undo."""
+    try:
+        from odoo import api, models
+    except ImportError:
+        return lambda: None
+    base = models.BaseModel
+    create, write, unlink = base.create, base.write, base.unlink
+
+    @api.model_create_multi
+    def counted_create(self, vals_list):
+        records = create(self, vals_list)
+        if _counted(records):
+            count_rows('created', len(records))
+        return records
+
+    def counted_write(self, vals):
+        if _counted(self):
+            count_rows('written', len(self))
+        return write(self, vals)
+
+    def counted_unlink(self):
+        if _counted(self):
+            count_rows('unlinked', len(self))
+        return unlink(self)
+
+    base.create, base.write, base.unlink = counted_create, counted_write, counted_unlink
+
+    def undo():
+        base.create, base.write, base.unlink = create, write, unlink
+    return undo
+
+
+def _query_counts(env):
+    """(queries on this thread, queries on the shell cursor) so far."""
+    return getattr(threading.current_thread(), 'query_count', 0), getattr(env.cr, 'sql_log_count', 0)
+
+
+def _slug(name):
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+class RunReport:
+    """Sections of one script run; use the module functions below."""
+
+    def __init__(self, env, script):
+        self.env = env
+        self.script = script
+        self.started = datetime.now()
+        self.run_id = f"{script}-{self.started:%Y%m%d-%H%M%S}"
+        self.pid = os.getpid()
+        self.t0 = time.perf_counter()
+        self.sections = []
+        self.current = None
+        self.cursors = [env.cr]
+        self.undo = _patch_orm()
+        # Odoo adds every query of a cursor to the query_count of the
+        # thread executing it, if the thread has one (http and cron
+        # threads do, the shell does not)
+        thread = threading.current_thread()
+        if not hasattr(thread, 'query_count'):
+            thread.query_count = 0
+            thread.query_time = 0
+
+    def open(self, name):
+        self.close()
+        itsm_progress.begin(name)
+        self.current = {
+            'name': name,
+            't0': time.perf_counter(),
+            'queries0': _query_counts(self.env),
+            'rows0': dict(_rows),
+            'profiler': cProfile.Profile() if PROFILE else None,
+        }
+        if self.current['profiler']:
+            self.current['profiler'].enable()
+
+    def close(self):
+        current, self.current = self.current, None
+        if current is None:
+            return
+        seconds = time.perf_counter() - current['t0']
+        itsm_progress.end()
+        profiles = []
+        if current['profiler']:
+            current['profiler'].disable()
+            suffix = '' if os.getpid() == self.pid else f".worker{os.getpid()}"
+            path = os.path.join(REPORT_DIR, f"{self.run_id}.{_slug(current['name'])}{suffix}.prof")
+            try:
+                os.makedirs(REPORT_DIR, exist_ok=True)
+                current['profiler'].dump_stats(path)
+                profiles.append(path)
+            except OSError as e:
+                print(f"  ✗ could not write profile {path}: {e}")
+        thread_queries, cursor_queries = _query_counts(self.env)
+        entry = {
+            'name': current['name'],
+            'seconds': round(seconds, 4),
+            # Whichever counter Odoo maintains: the thread one also covers
+            # other cursors, the cursor one works on older versions
+            'queries': max(thread_queries - current['queries0'][0], cursor_queries - current['queries0'][1]),
+            'profiles': profiles,
+        }
+        for key in ROW_KEYS:
+            entry[key] = _rows[key] - current['rows0'][key]
+        self.sections.append(entry)
+
+    def merge(self, sections):
+        """Fold the sections of one worker into this report."""
+        merged = {entry['name']: entry for entry in self.sections if 'workers' in entry}
+        for section in sections:
+            entry = merged.get(section['name'])
+            if entry is None:
+                entry = dict(section, workers=0, seconds=0.0, profiles=[], **dict.fromkeys(COUNT_KEYS, 0))
+                merged[section['name']] = entry
+                self.sections.append(entry)
+            entry['workers'] += 1
+            entry['seconds'] = max(entry['seconds'], section['seconds'])
+            entry['profiles'] += section['profiles']
+            for key in COUNT_KEYS:
+                entry[key] += section[key]
+
+    def finish(self):
+        self.close()
+        self.undo()
+        return {
+            'script': self.script,
+            'database': self.env.cr.dbname,
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': round(time.perf_counter() - self.t0, 4),
+            'totals': {key: sum(entry[key] for entry in self.sections) for key in COUNT_KEYS},
+            'sections': self.sections,
+        }
+
+
+def start_run(env, script):
+    """Start measuring a run of `script` (name used for the report file)."""
+    global _run
+    if _run is not None:
+        _run.undo()
+    _run = RunReport(env, script)
+    itsm_progress.start(os.path.join(REPORT_DIR, _run.run_id + '.events.jsonl'))
+    return _run
+
+
+def section(name):
+    """Close the open section, if any, and start measuring `name`."""
+    if _run is not None:
+        _run.open(name)
+
+
+def end_section():
+    """Close the open section without starting another one."""
+    if _run is not None:
+        _run.close()
+
+
+def worker_begin():
+    """In a freshly forked worker: drop the sections inherited from the parent."""
+    if _run is not None:
+        _run.sections = []
+        _run.current = None
+    itsm_progress.worker_begin()
+
+
+def count_cursor(cr):
+    """Count the ORM rows of `cr` too (the cursor of an itsm_parallel worker)."""
+    if _run is not None:
+        _run.cursors.append(cr)
+
+
+def worker_sections():
+    """In a worker: close the open section and return the sections it measured."""
+    if _run is None:
+        return []
+    _run.close()
+    return _run.sections
+
+
+def merge_sections(sections):
+    """In the parent: merge the sections sent back by a worker."""
+    if _run is not None:
+        _run.merge(sections)
+
+
+def abort_run():
+    """Drop an unfinished run (the script failed) and remove the ORM counters."""
+    global _run
+    if _run is not None:
+        _run.undo()
+        _run = None
+    itsm_progress.finish()
+
+
+def finish_run():
+    """Close the run, print the section table and write the JSON report.
+
+    Returns the report path, or None if it could not be written.
+    """
+    global _run
+    if _run is None:
+        return None
+    run, _run = _run, None
+    report = run.finish()
+    events = itsm_progress.finish()
+
+    print("\n" + "="*60)
+    print("  RUN REPORT")
+    print("="*60)
+    print(f"  {'Section':<32}{'Time (s)':>9}{'Queries':>9}{'Created':>9}{'Written':>9}{'Unlinked':>9}")
+    for entry in report['sections']:
+        name = entry['name'] + (f" (x{entry['workers']})" if entry.get('workers') else '')
+        print(f"  {name[:31]:<32}{entry['seconds']:>9.3f}{entry['queries']:>9}"
+              f"{entry['created']:>9}{entry['written']:>9}{entry['unlinked']:>9}")
+    totals = report['totals']
+    print(f"  {'Total':<32}{report['seconds']:>9.3f}{totals['queries']:>9}"
+          f"{totals['created']:>9}{totals['written']:>9}{totals['unlinked']:>9}")
+
+    path = os.path.join(REPORT_DIR, run.run_id + '.json')
+    try:
+        os.makedirs(REPORT_DIR, exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+    except OSError as e:
+        print(f"  ✗ could not write report {path}: {e}")
+        return None
+    print(f"  → Report: {path}")
+    if events:
+        print(f"  → Events: {events}")
+    return path
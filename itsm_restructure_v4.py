@@ -8,10 +8,34 @@ DB: servicedesk.westmetro.ng
 This script:
 1. Creates new stage types for all workflow templates
 2. Adds Change Management category + request types per service
-3. Deletes ALL existing stages and routes for every request type
+3. Brings every request type's stages and routes in line with its
+   workflow template (see RESTRUCTURE_MODE below)
 4. Creates workflow-specific stages (with unique colors) and routes
 5. Sets start_stage_id for each type
 
+Modes (ITSM_RESTRUCTURE_MODE environment variable):
+  - reconcile (default): match stages by code and routes by from/to
+    stage, update only differing attributes, add/remove only the delta.
+    Stage ids are preserved and an unchanged rerun writes nothing.
+  - replace: delete ALL stages and routes of every type and recreate
+    them from the templates.
+
+Each request type runs inside its own savepoint, so a failing type is
+rolled back alone; work is committed every ITSM_COMMIT_BATCH types
+(default 50). Set ITSM_WORKERS to spread the types of step 6 across that
+many processes, each with its own connection.
+
+Step 6 journals every request type it finishes (itsm_journal.py). If a
+run dies halfway, rerun it with ITSM_RESUME=<run id> (printed at the
+start) or ITSM_RESUME=last to skip the types already done.
+
+Progress is shown as a bar per step; ITSM_VERBOSITY=2 prints every
+request type as before (see itsm_progress.py).
+
+Requires itsm_common.py, itsm_classify.py, itsm_journal.py,
+itsm_parallel.py, itsm_progress.py and itsm_report.py in the same
+directory (ITSM_SCRIPT_DIR).
+
 5 Workflow Templates:
   - Incident Management (technical support)
   - Service Request / Fulfillment
@@ -27,16 +51,46 @@ Run:
 Author: WestMetro Limited | www.westmetrong.com
 """
 
+import os
+import sys
 import traceback
 
+# Scripts are piped through odoo-bin shell, so locate the shared helpers explicitly
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+if ITSM_SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, ITSM_SCRIPT_DIR)
+
+from itsm_classify import classify_type
+from itsm_common import m2o_id, write_if_changed
+from itsm_journal import open_journal
+from itsm_parallel import WORKERS, run_partitioned
+from itsm_progress import expect, record
+from itsm_report import finish_run, section, start_run
+
+start_run(env, 'itsm_restructure_v4')
+
+RESTRUCTURE_MODE = os.environ.get('ITSM_RESTRUCTURE_MODE', 'reconcile')
+if RESTRUCTURE_MODE not in ('reconcile', 'replace'):
+    raise ValueError(f"Unknown ITSM_RESTRUCTURE_MODE: {RESTRUCTURE_MODE}")
+
+# Request types per commit in step 6; each type still gets its own savepoint
+COMMIT_BATCH_SIZE = max(1, int(os.environ.get('ITSM_COMMIT_BATCH', 50)))
+
 print("\n" + "=" * 70)
 print("  WML ITSM RESTRUCTURING v4 - ITIL-ALIGNED WORKFLOWS")
-print("  This will replace ALL existing stages and routes.")
+if RESTRUCTURE_MODE == 'replace':
+    print("  This will replace ALL existing stages and routes.")
+else:
+    print("  Stages and routes are reconciled in place (mode: reconcile).")
 print("=" * 70)
 
+# Step 6 journals every request type it finishes; ITSM_RESUME skips them
+journal = open_journal(env, 'itsm_restructure_v4', mode=RESTRUCTURE_MODE)
+
 # ================================================================
 # STEP 1: CREATE NEW STAGE TYPES
 # ================================================================
+section('STEP 1: STAGE TYPES')
 print("\n" + "-" * 70)
 print("  STEP 1: CREATING STAGE TYPES")
 print("-" * 70)
@@ -104,9 +158,9 @@ for name, code in STAGE_TYPES:
         })
         stage_type_map[code] = rec.id
         created_st += 1
-        print(f"  + Stage Type: {name} ({code}) id={rec.id}")
+        record('created', code, f"  + Stage Type: {name} ({code}) id={rec.id}")
     else:
-        print(f"  o Exists: {name} ({code})")
+        record('unchanged', code, f"  o Exists: {name} ({code})")
 
 env.cr.commit()
 print(f"\n  -> Created {created_st} new stage types")
@@ -118,6 +172,7 @@ for st in env['request.stage.type'].search([]):
 # ================================================================
 # STEP 2: ADD CHANGE MANAGEMENT CATEGORY
 # ================================================================
+section('STEP 2: CHANGE CATEGORY')
 print("\n" + "-" * 70)
 print("  STEP 2: ADDING CHANGE MANAGEMENT CATEGORY")
 print("-" * 70)
@@ -131,15 +186,16 @@ if not cat_change:
         'sequence': 10,
         'description': 'ITIL Change Management - RFC submission, CAB review, and controlled implementation of changes.',
     })
-    print(f"  + Created: Change Management (CAT-CHANGE) id={cat_change.id}")
+    record('created', 'CAT-CHANGE', f"  + Created: Change Management (CAT-CHANGE) id={cat_change.id}")
 else:
-    print(f"  o Exists: Change Management id={cat_change.id}")
+    record('unchanged', 'CAT-CHANGE', f"  o Exists: Change Management id={cat_change.id}")
 
 env.cr.commit()
 
 # ================================================================
 # STEP 3: CREATE CHANGE MANAGEMENT REQUEST TYPES PER SERVICE
 # ================================================================
+section('STEP 3: CHANGE REQUEST TYPES')
 print("\n" + "-" * 70)
 print("  STEP 3: CREATING CHANGE MANAGEMENT REQUEST TYPES")
 print("-" * 70)
@@ -173,96 +229,23 @@ for name, code, desc in CHANGE_TYPES:
             'description': desc,
         })
         change_type_ids.append(rec.id)
-        print(f"  + Created: {name} ({code}) id={rec.id}")
+        record('created', code, f"  + Created: {name} ({code}) id={rec.id}")
     else:
         change_type_ids.append(existing.id)
-        print(f"  o Exists: {name} ({code}) id={existing.id}")
+        record('unchanged', code, f"  o Exists: {name} ({code}) id={existing.id}")
 
 env.cr.commit()
 
 # ================================================================
 # STEP 4: CLASSIFY ALL REQUEST TYPES INTO WORKFLOW TEMPLATES
 # ================================================================
+section('STEP 4: CLASSIFY')
 print("\n" + "-" * 70)
 print("  STEP 4: CLASSIFYING REQUEST TYPES")
 print("-" * 70)
 
-# Suffix-based classification rules
-# Order matters: first match wins
-
-INCIDENT_SUFFIXES = [
-    '-SUBMIT', '-VALID', '-CSID', '-API', '-REPORT', '-ACCESS', '-DEVICE',
-    '-COMPLY', '-TECH', '-UPLOAD', '-FORMAT', '-DELAY', '-ALERT',
-    '-REG', '-DASH', '-DOC', '-VENDOR', '-PO', '-MATCH', '-WF',
-    '-SYNC', '-LOGIN', '-CLIENT', '-OUTAGE', '-CONNECT', '-HARDWARE',
-    '-PERF', '-PWD', '-PAYMENT',
-]
-
-SERVICE_REQUEST_SUFFIXES = [
-    '-FEATURE', '-UPGRADE', '-DOWNGRADE', '-CONFIG', '-TEMPLATE',
-    '-ADDUSER', '-REMOVEUSER', '-ROLECHANGE', '-BILLING', '-INVOICE',
-    '-AMEND', '-RENEWAL', '-INSTALL', '-SURVEY', '-MAINT',
-    '-ESCALATE', '-CANCEL',
-]
-
-CHANGE_SUFFIXES = ['-CHANGE']
-
-ONBOARD_SUFFIXES = [
-    '-ONBOARD', '-GOLIVE', '-POSTLIVE', '-REQ', '-DATAMIG',
-    '-INTEG', '-UAT',
-]
-
-SALES_SUFFIXES = [
-    '-QUERY', '-PRICING', '-DEMO', '-PROPOSAL', '-PARTNER',
-    '-FEEDBACK', '-INFO', '-TRAIN', '-ADMINTRAIN',
-]
-
-# Special cases for types that don't match suffix rules
-SPECIAL_OVERRIDES = {
-    'api-key': 'service_request',
-    'ERPDEP-CONFIG': 'onboarding',
-    'ERPDEP-GOLIVE': 'onboarding',
-    'ERPDEP-POSTLIVE': 'onboarding',
-    'ERPDEP-REQ': 'onboarding',
-    'ERPDEP-DATAMIG': 'onboarding',
-    'ERPDEP-INTEG': 'onboarding',
-    'ERPDEP-UAT': 'onboarding',
-    'ERPINT-NEW': 'onboarding',
-    'AKRAA-AUDIT': 'incident',
-    'FIBER-MAINT': 'service_request',
-}
-
-
-def classify_type(code):
-    """Classify a request type code into a workflow template."""
-    if code in SPECIAL_OVERRIDES:
-        return SPECIAL_OVERRIDES[code]
-
-    upper = code.upper()
-
-    for suffix in CHANGE_SUFFIXES:
-        if upper.endswith(suffix):
-            return 'change'
-
-    for suffix in ONBOARD_SUFFIXES:
-        if upper.endswith(suffix):
-            return 'onboarding'
-
-    for suffix in SALES_SUFFIXES:
-        if upper.endswith(suffix):
-            return 'sales'
-
-    for suffix in SERVICE_REQUEST_SUFFIXES:
-        if upper.endswith(suffix):
-            return 'service_request'
-
-    for suffix in INCIDENT_SUFFIXES:
-        if upper.endswith(suffix):
-            return 'incident'
-
-    # Default: incident
-    return 'incident'
-
+# Suffix-based classification rules and the compiled matcher live in
+# itsm_classify.py (shared with intake tooling). First match wins.
 
 # Build classification map
 all_types = env['request.type'].search([('active', '=', True)])
@@ -283,6 +266,7 @@ print(f"    Total: {sum(counts.values())} types")
 # ================================================================
 # STEP 5: DEFINE WORKFLOW TEMPLATES
 # ================================================================
+section('STEP 5: WORKFLOW TEMPLATES')
 # Each template: list of (name, code, sequence, closed, stage_type_code, bg_color, label_color)
 
 WHITE_LABEL = "rgba(255,255,255,1)"
@@ -427,102 +411,274 @@ WORKFLOWS = {
 }
 
 # ================================================================
-# STEP 6: DELETE ALL EXISTING STAGES AND ROUTES, RECREATE
+# STEP 6: RECONCILE (OR REPLACE) STAGES AND ROUTES
 # ================================================================
 print("\n" + "-" * 70)
-print("  STEP 6: REPLACING STAGES AND ROUTES")
+if RESTRUCTURE_MODE == 'replace':
+    print("  STEP 6: REPLACING STAGES AND ROUTES")
+else:
+    print("  STEP 6: RECONCILING STAGES AND ROUTES")
 print("-" * 70)
 
-total_deleted_routes = 0
-total_deleted_stages = 0
-total_created_stages = 0
-total_created_routes = 0
-errors = []
-
-for rt in all_types:
-    wf_name = classification[rt.id]
-    wf = WORKFLOWS[wf_name]
-
-    try:
-        # Delete existing routes for this type
-        old_routes = env['request.stage.route'].search([('request_type_id', '=', rt.id)])
-        if old_routes:
-            total_deleted_routes += len(old_routes)
-            old_routes.unlink()
-
-        # Delete existing stages for this type
-        old_stages = env['request.stage'].search([('request_type_id', '=', rt.id)])
-        if old_stages:
-            total_deleted_stages += len(old_stages)
-            old_stages.unlink()
-
-        env.cr.commit()
-
-        # Create new stages
-        stage_map = {}
-        for sname, scode, seq, closed, st_code, bg, lbl in wf['stages']:
-            st_id = stage_type_map.get(st_code)
-            vals = {
-                'name': sname,
-                'code': scode,
-                'sequence': seq,
-                'closed': closed,
-                'request_type_id': rt.id,
-                'active': True,
-                'bg_color': bg,
-                'label_color': lbl,
-                'use_custom_colors': True,
-            }
-            if st_id:
-                vals['type_id'] = st_id
-            stage = env['request.stage'].create(vals)
-            stage_map[scode] = stage.id
-            total_created_stages += 1
-
-        env.cr.commit()
-
-        # Set start stage
-        first_code = wf['stages'][0][1]
-        rt.write({'start_stage_id': stage_map[first_code]})
-
-        # Create routes
-        for rname, from_code, to_code, close, seq, btn in wf['routes']:
-            from_id = stage_map.get(from_code)
-            to_id = stage_map.get(to_code)
-            if not from_id or not to_id:
-                continue
-            env['request.stage.route'].create({
-                'name': rname,
-                'sequence': seq,
-                'stage_from_id': from_id,
-                'stage_to_id': to_id,
-                'request_type_id': rt.id,
-                'close': close,
-                'button_style': btn,
-                'website_published': True,
-            })
-            total_created_routes += 1
-
-        env.cr.commit()
-        print(f"  ✓ {rt.code} -> {wf_name} ({len(wf['stages'])} stages, {len(wf['routes'])} routes)")
-
-    except Exception as e:
-        env.cr.rollback()
-        errors.append(f"  ✗ {rt.code}: {str(e)}")
-        print(f"  ✗ {rt.code}: {str(e)}")
-        traceback.print_exc()
+TOTAL_KEYS = ('deleted_routes', 'deleted_stages', 'created_stages', 'created_routes',
+              'updated_stages', 'updated_routes')
+totals = dict.fromkeys(TOTAL_KEYS, 0)
+
+STAGE_FIELDS = ['code', 'name', 'sequence', 'closed', 'type_id', 'bg_color', 'label_color',
+                'use_custom_colors', 'request_type_id']
+ROUTE_FIELDS = ['name', 'sequence', 'stage_from_id', 'stage_to_id', 'close', 'button_style',
+                'website_published', 'request_type_id']
+
+
+def stage_vals(rt_id, stage_def):
+    """Create vals for one WORKFLOWS stage entry."""
+    sname, scode, seq, closed, st_code, bg, lbl = stage_def
+    vals = {
+        'name': sname,
+        'code': scode,
+        'sequence': seq,
+        'closed': closed,
+        'request_type_id': rt_id,
+        'active': True,
+        'bg_color': bg,
+        'label_color': lbl,
+        'use_custom_colors': True,
+    }
+    st_id = stage_type_map.get(st_code)
+    if st_id:
+        vals['type_id'] = st_id
+    return vals
+
+
+def route_vals(rt_id, route_def, stage_map):
+    """Create vals for one WORKFLOWS route entry, or None if a stage is missing."""
+    rname, from_code, to_code, close, seq, btn = route_def
+    from_id = stage_map.get(from_code)
+    to_id = stage_map.get(to_code)
+    if not from_id or not to_id:
+        return None
+    return {
+        'name': rname,
+        'sequence': seq,
+        'stage_from_id': from_id,
+        'stage_to_id': to_id,
+        'request_type_id': rt_id,
+        'close': close,
+        'button_style': btn,
+        'website_published': True,
+    }
+
+
+def replace_type(env, rt, wf, tally):
+    """Delete every stage and route of `rt` and recreate them from `wf`."""
+    # Delete existing routes for this type
+    old_routes = env['request.stage.route'].search([('request_type_id', '=', rt.id)])
+    if old_routes:
+        tally['deleted_routes'] += len(old_routes)
+        old_routes.unlink()
+
+    # Delete existing stages for this type
+    old_stages = env['request.stage'].search([('request_type_id', '=', rt.id)])
+    if old_stages:
+        tally['deleted_stages'] += len(old_stages)
+        old_stages.unlink()
+
+    # Create new stages
+    stage_map = {}
+    for stage_def in wf['stages']:
+        stage = env['request.stage'].create(stage_vals(rt.id, stage_def))
+        stage_map[stage_def[1]] = stage.id
+        tally['created_stages'] += 1
+
+    # Set start stage
+    first_code = wf['stages'][0][1]
+    rt.write({'start_stage_id': stage_map[first_code]})
+
+    # Create routes
+    for route_def in wf['routes']:
+        vals = route_vals(rt.id, route_def, stage_map)
+        if not vals:
+            continue
+        env['request.stage.route'].create(vals)
+        tally['created_routes'] += 1
+
+
+def reconcile_type(env, rt, wf, stage_rows, route_rows, tally):
+    """Bring `rt` in line with `wf`, touching only what differs.
+
+    `stage_rows` and `route_rows` are the type's current stages and
+    routes as read by search_read. Stages are matched by code, routes by
+    (from stage, to stage). Returns the number of rows changed.
+    """
+    changed = 0
+
+    # Stages: keep the first stage per code, anything else is surplus
+    stage_by_code = {}
+    for row in stage_rows:
+        stage_by_code.setdefault(row['code'], row)
+    wanted_codes = {stage_def[1] for stage_def in wf['stages']}
+    surplus_stages = [row['id'] for row in stage_rows
+                      if row['code'] not in wanted_codes or stage_by_code[row['code']] is not row]
+
+    stage_map = {}
+    stage_updates = {}
+    missing_stages = []
+    for stage_def in wf['stages']:
+        vals = stage_vals(rt.id, stage_def)
+        row = stage_by_code.get(vals['code'])
+        if row:
+            stage_map[vals['code']] = row['id']
+            del vals['request_type_id'], vals['active'], vals['code']
+            stage_updates[row['id']] = vals
+        else:
+            missing_stages.append(vals)
+    if missing_stages:
+        created = env['request.stage'].create(missing_stages)
+        stage_map.update(zip([vals['code'] for vals in missing_stages], created.ids))
+        tally['created_stages'] += len(missing_stages)
+    updated = write_if_changed(env, 'request.stage', stage_updates,
+                               current={row['id']: row for row in stage_rows})
+    tally['updated_stages'] += len(updated)
+    changed += len(missing_stages) + len(updated)
+
+    # Start stage must move before surplus stages can go
+    first_id = stage_map[wf['stages'][0][1]]
+    if rt.start_stage_id.id != first_id:
+        rt.write({'start_stage_id': first_id})
+        changed += 1
+
+    # Routes: keyed by (from, to); surplus includes routes of surplus stages
+    wanted_routes = {}
+    for route_def in wf['routes']:
+        vals = route_vals(rt.id, route_def, stage_map)
+        if vals:
+            wanted_routes[(vals['stage_from_id'], vals['stage_to_id'])] = vals
+    route_by_pair = {}
+    surplus_routes = []
+    for row in route_rows:
+        pair = (m2o_id(row['stage_from_id']), m2o_id(row['stage_to_id']))
+        if pair in wanted_routes and pair not in route_by_pair:
+            route_by_pair[pair] = row
+        else:
+            surplus_routes.append(row['id'])
+
+    route_updates = {}
+    missing_routes = []
+    for pair, vals in wanted_routes.items():
+        row = route_by_pair.get(pair)
+        if row:
+            route_updates[row['id']] = {key: vals[key] for key in
+                                        ('name', 'sequence', 'close', 'button_style', 'website_published')}
+        else:
+            missing_routes.append(vals)
+
+    if surplus_routes:
+        env['request.stage.route'].browse(surplus_routes).unlink()
+        tally['deleted_routes'] += len(surplus_routes)
+    updated = write_if_changed(env, 'request.stage.route', route_updates,
+                               current={row['id']: row for row in route_rows})
+    tally['updated_routes'] += len(updated)
+    if missing_routes:
+        env['request.stage.route'].create(missing_routes)
+        tally['created_routes'] += len(missing_routes)
+    if surplus_stages:
+        env['request.stage'].browse(surplus_stages).unlink()
+        tally['deleted_stages'] += len(surplus_stages)
+    changed += len(surplus_routes) + len(updated) + len(missing_routes) + len(surplus_stages)
+    return changed
+
+
+def apply_types(env, type_ids):
+    """Rebuild the given request types; returns (totals, errors).
+
+    Runs in the shell process or in an itsm_parallel worker, on whichever
+    `env` it is handed.
+    """
+    section('STEP 6: STAGES AND ROUTES')
+    types = env['request.type'].browse(type_ids)
+    expect(len(types))
+    totals = dict.fromkeys(TOTAL_KEYS, 0)
+    errors = []
+
+    # Reconcile mode reads the current stages and routes of these types up front
+    stages_by_type = {}
+    routes_by_type = {}
+    if RESTRUCTURE_MODE == 'reconcile':
+        for row in env['request.stage'].search_read([('request_type_id', 'in', types.ids)], STAGE_FIELDS):
+            stages_by_type.setdefault(m2o_id(row['request_type_id']), []).append(row)
+        for row in env['request.stage.route'].search_read([('request_type_id', 'in', types.ids)], ROUTE_FIELDS):
+            routes_by_type.setdefault(m2o_id(row['request_type_id']), []).append(row)
+
+    uncommitted = 0
+    for rt in types:
+        wf_name = classification[rt.id]
+        wf = WORKFLOWS[wf_name]
+        tally = dict.fromkeys(TOTAL_KEYS, 0)
+
+        try:
+            # A failing type rolls back to its own savepoint, not the whole batch
+            with env.cr.savepoint():
+                if RESTRUCTURE_MODE == 'replace':
+                    replace_type(env, rt, wf, tally)
+                    changed = None
+                else:
+                    changed = reconcile_type(env, rt, wf, stages_by_type.get(rt.id, []),
+                                             routes_by_type.get(rt.id, []), tally)
+            for key in TOTAL_KEYS:
+                totals[key] += tally[key]
+            journal.mark('STEP 6', rt.id)
+            if changed is None:
+                record('created', rt.code,
+                       f"  ✓ {rt.code} -> {wf_name} ({len(wf['stages'])} stages, {len(wf['routes'])} routes)")
+            elif changed:
+                record('updated', rt.code, f"  ✓ {rt.code} -> {wf_name} ({changed} rows changed)")
+            else:
+                record('unchanged', rt.code, f"  o {rt.code} -> {wf_name} (up to date)")
+
+        except Exception as e:
+            errors.append(f"  ✗ {rt.code}: {str(e)}")
+            record('error', rt.code, f"  ✗ {rt.code}: {str(e)}")
+            traceback.print_exc()
+
+        uncommitted += 1
+        if uncommitted >= COMMIT_BATCH_SIZE:
+            journal.commit(env)
+            uncommitted = 0
+
+    journal.commit(env)
+    return totals, errors
+
+
+# A resumed run only applies the types not journaled as finished
+finished_ids = journal.done_ids('STEP 6')
+pending_ids = [type_id for type_id in all_types.ids if type_id not in finished_ids]
+skipped_types = len(all_types) - len(pending_ids)
+if skipped_types:
+    print(f"  Skipping {skipped_types} request types finished by run {journal.run_id}")
+
+worker_totals, errors = run_partitioned(env, pending_ids, apply_types, WORKERS)
+totals.update(worker_totals)
+journal.finish()
 
 # ================================================================
 # SUMMARY
 # ================================================================
+section('SUMMARY')
 print("\n" + "=" * 70)
 print("  RESTRUCTURING COMPLETE")
 print("=" * 70)
-print(f"  Request Types processed:  {len(all_types)}")
-print(f"  Stages deleted:           {total_deleted_stages}")
-print(f"  Stages created:           {total_created_stages}")
-print(f"  Routes deleted:           {total_deleted_routes}")
-print(f"  Routes created:           {total_created_routes}")
+print(f"  Request Types processed:  {len(pending_ids)}")
+if skipped_types:
+    print(f"  Already done (resumed):   {skipped_types}")
+print(f"  Mode:                     {RESTRUCTURE_MODE}")
+print(f"  Run:                      {journal.run_id}")
+print(f"  Workers:                  {WORKERS}")
+print(f"  Stages deleted:           {totals['deleted_stages']}")
+print(f"  Stages created:           {totals['created_stages']}")
+print(f"  Stages updated:           {totals['updated_stages']}")
+print(f"  Routes deleted:           {totals['deleted_routes']}")
+print(f"  Routes created:           {totals['created_routes']}")
+print(f"  Routes updated:           {totals['updated_routes']}")
 print(f"  Change Management types:  {len(change_type_ids)}")
 
 if errors:
@@ -550,3 +706,5 @@ print("  3. Assign team members and configure SLAs")
 print("  4. Update training materials with new workflows")
 print("=" * 70)
 print()
+
+finish_run()
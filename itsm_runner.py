@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+WestMetro ITSM - Warm Script Runner
+=====================================
+`odoo-bin shell` loads the whole module registry every time it starts,
+which costs more than most of the setup scripts themselves. This runner
+is a long-lived process that keeps one loaded registry per database and
+runs the itsm_*.py scripts submitted to it over a local Unix socket.
+
+Every script runs exactly as it would under odoo-bin shell (same `env`,
+`odoo` and `self` globals) on a fresh cursor, committed when it ends.
+The scripts also commit along the way (every batch), so a script that
+raises is aborted, not undone: only the work since its last commit is
+rolled back, and it is rerun to finish the job (see ITSM_RESUME in
+itsm_journal.py). Its stdout and stderr are streamed back to the
+submitting terminal as they are printed.
+Scripts run one at a time in submission order.
+
+The ITSM_* variables of the submitting shell (ITSM_WORKERS,
+ITSM_RESTRUCTURE_MODE, ...) apply to the script it submits, and the
+itsm_*.py helper modules are reloaded for every script, so edits to
+them are picked up without restarting the runner.
+
+Start the runner (as the odoo user, with Odoo importable):
+    cd /opt/odoo/odoo
+    sudo -u odoo PYTHONPATH=. python3 /opt/odoo/itsm_runner.py serve \
+      -c /opt/odoo/conf/odoo.conf -d servicedesk.westmetro.ng
+
+Submit scripts (stops at the first one that fails):
+    sudo -u odoo python3 /opt/odoo/itsm_runner.py run -d servicedesk.westmetro.ng \
+      itsm_shell_importer.py itsm_shell_importer_v2.py itsm_teams_v3.py \
+      itsm_restructure_v4.py itsm_digest_emails.py
+
+    sudo -u odoo python3 /opt/odoo/itsm_runner.py status
+
+The socket defaults to <ITSM_SCRIPT_DIR>/itsm_runner.sock (override with
+--socket or ITSM_RUNNER_SOCKET) and is created mode 0600: whoever can
+connect to it runs code as the odoo user.
+
+Author: WestMetro Limited | www.westmetrong.com
+"""
+
+import argparse
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+import time
+import traceback
+from contextlib import redirect_stderr, redirect_stdout
+
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+SOCKET_PATH = os.environ.get('ITSM_RUNNER_SOCKET') or os.path.join(ITSM_SCRIPT_DIR, 'itsm_runner.sock')
+
+
+# ============================================================
+# PROTOCOL
+# ============================================================
+# One JSON object per line. The client sends a single request:
+#   {"cmd": "run", "db": ..., "path": ..., "source": ..., "environ": {...}}
+#   {"cmd": "status"}
+# and the runner answers with any number of {"out": text} / {"err": text}
+# messages followed by one {"status": "ok" | "error", ...} message.
+def _send(stream, message):
+    stream.write((json.dumps(message) + '\n').encode())
+    stream.flush()
+
+
+class _StreamWriter(io.TextIOBase):
+    """Text stream forwarding what the running script writes to the client as `key` messages.
+
+    sys.stdout and sys.stderr are process-wide: writes from other threads
+    (cron, http) or from forked processes go to `fallback` instead, so
+    they never interleave with the client's output.
+    """
+
+    def __init__(self, stream, key, fallback):
+        self.stream = stream
+        self.key = key
+        self.fallback = fallback
+        self.thread = threading.get_ident()
+        self.pid = os.getpid()
+
+    def writable(self):
+        return True
+
+    def write(self, text):
+        if threading.get_ident() != self.thread or os.getpid() != self.pid:
+            return self.fallback.write(text)
+        if text:
+            _send(self.stream, {self.key: text})
+        return len(text)
+
+    def flush(self):
+        if threading.get_ident() != self.thread or os.getpid() != self.pid:
+            self.fallback.flush()
+
+
+# ============================================================
+# SERVER
+# ============================================================
+class ScriptRunner:
+    """Loaded registries, one per database, and the scripts run on them."""
+
+    def __init__(self):
+        import odoo
+        self.odoo = odoo
+        self.runs = 0
+        self.started = time.time()
+
+    def registry(self, db):
+        """The warm registry of `db`, reloaded if another process changed it."""
+        from odoo.modules.registry import Registry
+        return Registry(db).check_signaling()
+
+    def status(self):
+        from odoo.modules.registry import Registry
+        return {
+            'status': 'ok',
+            'databases': sorted(Registry.registries.keys()),
+            'runs': self.runs,
+            'uptime': round(time.time() - self.started),
+        }
+
+    def run(self, request, stream):
+        """Run one submitted script; returns the final status message."""
+        odoo = self.odoo
+        registry = self.registry(request['db'])
+        code = compile(request['source'], request['path'], 'exec')
+        self.runs += 1
+
+        saved_environ = {key: os.environ.get(key) for key in request.get('environ', {})}
+        os.environ.update(request.get('environ', {}))
+        _unload_helpers()  # re-read with this submission's ITSM_* settings
+        out = _StreamWriter(stream, 'out', sys.stdout)
+        err = _StreamWriter(stream, 'err', sys.stderr)
+        start = time.perf_counter()
+        try:
+            with registry.cursor() as cr:  # commits on success, rolls back the uncommitted tail on error
+                env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, {})
+                env = odoo.api.Environment(cr, odoo.SUPERUSER_ID, env['res.users'].context_get())
+                namespace = {'env': env, 'self': env.user, 'odoo': odoo, 'openerp': odoo}
+                try:
+                    with redirect_stdout(out), redirect_stderr(err):
+                        exec(code, namespace)
+                except SystemExit as e:  # exit() ends the script, as in the shell
+                    if e.code not in (None, 0):
+                        raise
+            registry.signal_changes()
+            result = {'status': 'ok'}
+        except BaseException as e:
+            registry.reset_changes()
+            traceback.print_exc(file=err)
+            result = {'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+            if isinstance(e, KeyboardInterrupt):
+                raise
+        finally:
+            _abort_report()
+            for key, value in saved_environ.items():
+                if value is None:
+                    os.environ.pop(key, None)
+                else:
+                    os.environ[key] = value
+        result['seconds'] = round(time.perf_counter() - start, 3)
+        return result
+
+
+def _unload_helpers():
+    """Forget the itsm_* helper modules so the next import re-reads them."""
+    for name in [name for name in sys.modules if name.startswith('itsm_')]:
+        del sys.modules[name]
+
+
+def _abort_report():
+    """Undo the ORM counters of a run report the script did not finish."""
+    report = sys.modules.get('itsm_report')
+    if report is not None:
+        report.abort_run()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        runner = self.server.runner
+        try:
+            request = json.loads(self.rfile.readline())
+            if request.get('cmd') == 'status':
+                _send(self.wfile, runner.status())
+                return
+            print(f"[itsm_runner] {request['db']}: {request['path']}", file=sys.__stderr__)
+            result = runner.run(request, self.wfile)
+            print(f"[itsm_runner] {request['path']}: {result['status']} in {result['seconds']}s",
+                  file=sys.__stderr__)
+            _send(self.wfile, result)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client gone mid-run: its script was aborted after its last commit
+            print("[itsm_runner] client disconnected", file=sys.__stderr__)
+        except Exception as e:
+            _send(self.wfile, {'status': 'error', 'error': f"{type(e).__name__}: {e}"})
+
+
+def serve(args):
+    import odoo
+    from odoo.service import server
+    from odoo.tools import config
+
+    odoo_args = ['-c', args.config] if args.config else []
+    config.parse_config(odoo_args)
+    server.load_server_wide_modules()
+
+    runner = ScriptRunner()
+    for db in args.database or []:
+        start = time.perf_counter()
+        runner.registry(db)
+        print(f"  ✓ Registry loaded: {db} ({time.perf_counter() - start:.1f}s)")
+
+    if os.path.exists(args.socket):
+        try:
+            with socket.socket(socket.AF_UNIX) as probe:
+                probe.connect(args.socket)
+            raise SystemExit(f"  ✗ A runner is already listening on {args.socket}")
+        except ConnectionRefusedError:
+            os.unlink(args.socket)  # left behind by a runner that died
+
+    old_umask = os.umask(0o177)  # socket created 0600
+    try:
+        listener = socketserver.UnixStreamServer(args.socket, _Handler)
+    finally:
+        os.umask(old_umask)
+    listener.runner = runner
+    print(f"  → Listening on {args.socket} (Odoo {odoo.release.version})")
+    try:
+        listener.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        listener.server_close()
+        os.unlink(args.socket)
+
+
+# ============================================================
+# CLIENT
+# ============================================================
+def _request(socket_path, request, out=sys.stdout, err=sys.stderr):
+    """Send `request`, relay the streamed output; returns the final status message."""
+    with socket.socket(socket.AF_UNIX) as conn:
+        conn.connect(socket_path)
+        stream = conn.makefile('rwb')
+        _send(stream, request)
+        for line in stream:
+            message = json.loads(line)
+            if 'out' in message:
+                out.write(message['out'])
+                out.flush()
+            elif 'err' in message:
+                err.write(message['err'])
+                err.flush()
+            else:
+                return message
+    return {'status': 'error', 'error': 'runner closed the connection'}
+
+
+def run(args):
+    environ = {key: value for key, value in os.environ.items() if key.startswith('ITSM_')}
+    for path in args.scripts:
+        path = os.path.abspath(path)
+        with open(path) as f:
+            source = f.read()
+        result = _request(args.socket, {'cmd': 'run', 'db': args.database, 'path': path,
+                                        'source': source, 'environ': environ})
+        if result['status'] != 'ok':
+            print(f"\n  ✗ {os.path.basename(path)} failed after {result.get('seconds', '?')}s "
+                  f"(aborted, batches committed before the failure are kept): {result.get('error')}")
+            return 1
+        print(f"\n  ✓ {os.path.basename(path)} done in {result['seconds']}s")
+    return 0
+
+
+def status(args):
+    result = _request(args.socket, {'cmd': 'status'})
+    print(f"  Databases: {', '.join(result['databases']) or '-'}")
+    print(f"  Scripts run: {result['runs']}")
+    print(f"  Uptime: {result['uptime']}s")
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--socket', default=SOCKET_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    serve_parser = commands.add_parser('serve', help="start the runner")
+    serve_parser.add_argument('-c', '--config', help="Odoo configuration file")
+    serve_parser.add_argument('-d', '--database', action='append',
+                              help="database to load up front (repeatable)")
+    serve_parser.set_defaults(func=serve)
+
+    run_parser = commands.add_parser('run', help="run scripts on a warm registry")
+    run_parser.add_argument('-d', '--database', required=True)
+    run_parser.add_argument('scripts', nargs='+')
+    run_parser.set_defaults(func=run)
+
+    status_parser = commands.add_parser('status', help="show the loaded databases")
+    status_parser.set_defaults(func=status)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -6,6 +6,25 @@ Run directly on your Odoo server. No XML-RPC, no network.
 
 Server: servicedesk.westmetro.ng
 
+Master data (groups, teams, stages, ticket types, SLAs) is loaded with
+one search_read per model and missing rows are created in one batch, so
+a rerun against a provisioned database costs a handful of queries.
+
+On-create and stage-change routes run through two dispatcher
+automations that look up (team, old stage, new stage) in a generated
+table and call only the matching handler server actions.
+
+With the wml_itsm_helpdesk addon (addons/wml_itsm_helpdesk) installed,
+each handler is a Python method on helpdesk.ticket and the server
+actions hold a one-line records._itsm_route('<route key>') call instead
+of the inline code below.
+
+Progress is shown as a bar per section; ITSM_VERBOSITY=2 prints every
+record (see itsm_progress.py).
+
+Requires itsm_common.py, itsm_progress.py and itsm_report.py in the
+same directory (ITSM_SCRIPT_DIR).
+
 Run:
     cd /opt/odoo/odoo
     python3 odoo-bin shell -c /opt/odoo/odoo.conf -d servicedesk.westmetro.ng --no-http < /opt/odoo/itsm_shell_importer.py
@@ -13,9 +32,25 @@ Run:
 Author: WestMetro Limited | www.westmetrong.com
 """
 
+import os
+import re
+import sys
+
+# Scripts are piped through odoo-bin shell, so locate the shared helpers explicitly
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+if ITSM_SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, ITSM_SCRIPT_DIR)
+
+from itsm_common import m2o_id, reconcile
+from itsm_progress import note, record
+from itsm_report import finish_run, section, start_run
+
+start_run(env, 'itsm_shell_importer')
+
 # ============================================================
 # SECURITY GROUPS
 # ============================================================
+section('GROUPS')
 print("\n" + "="*60)
 print("  IMPORTING SECURITY GROUPS")
 print("="*60)
@@ -31,13 +66,14 @@ GROUPS = [
     "Fulfillment Team", "Request Approver", "Data Owner",
 ]
 
-group_ids = {}
+group_ids, created = reconcile(
+    env, 'res.groups',
+    {g: {'name': g, 'category_id': cat_id} for g in GROUPS},
+    [('name', 'in', GROUPS)], ['name'],
+    lambda row: [row['name']],
+)
 for g in GROUPS:
-    rec = env['res.groups'].search([('name', '=', g)], limit=1)
-    if not rec:
-        rec = env['res.groups'].create({'name': g, 'category_id': cat_id})
-    group_ids[g] = rec.id
-    print(f"  ✓ {g}")
+    record('created' if g in created else 'unchanged', g, f"  ✓ {g}")
 
 print(f"  → {len(group_ids)} groups ready")
 env.cr.commit()
@@ -45,6 +81,7 @@ env.cr.commit()
 # ============================================================
 # HELPDESK TEAMS
 # ============================================================
+section('TEAMS')
 print("\n" + "="*60)
 print("  IMPORTING HELPDESK TEAMS")
 print("="*60)
@@ -62,13 +99,15 @@ TEAMS = [
     {"name": "Maintenance Request", "use_sla": True, "use_rating": False, "assign_method": "manual"},
 ]
 
-team_ids = {}
+team_ids, created = reconcile(
+    env, 'helpdesk.team',
+    {t['name']: t for t in TEAMS},
+    [('name', 'in', [t['name'] for t in TEAMS])], ['name'],
+    lambda row: [row['name']],
+)
 for t in TEAMS:
-    rec = env['helpdesk.team'].search([('name', '=', t['name'])], limit=1)
-    if not rec:
-        rec = env['helpdesk.team'].create(t)
-    team_ids[t['name']] = rec.id
-    print(f"  ✓ {t['name']} (id={rec.id})")
+    record('created' if t['name'] in created else 'unchanged', t['name'],
+           f"  ✓ {t['name']} (id={team_ids[t['name']]})")
 
 print(f"  → {len(team_ids)} teams ready")
 env.cr.commit()
@@ -76,6 +115,7 @@ env.cr.commit()
 # ============================================================
 # STAGES
 # ============================================================
+section('STAGES')
 print("\n" + "="*60)
 print("  IMPORTING STAGES")
 print("="*60)
@@ -177,33 +217,41 @@ STAGES = {
     ],
 }
 
-stage_ids = {}  # (team_name, stage_name) -> id
-total_stages = 0
-
+declared_stages = {}  # (team_name, stage_name) -> create vals
 for team_name, stages in STAGES.items():
     tid = team_ids.get(team_name)
     if not tid:
-        print(f"  ✗ Team '{team_name}' not found, skipping")
+        record('error', team_name, f"  ✗ Team '{team_name}' not found, skipping")
         continue
+    for name, seq, fold, is_close in stages:
+        declared_stages[(team_name, name)] = {
+            'name': name,
+            'sequence': seq,
+            'fold': fold,
+            'is_close': is_close,
+            'team_ids': [(4, tid)],
+        }
+
+# A stage shared by several teams answers to one key per team
+team_names = {tid: name for name, tid in team_ids.items()}
+stage_ids, created = reconcile(  # (team_name, stage_name) -> id
+    env, 'helpdesk.stage', declared_stages,
+    [('team_ids', 'in', list(team_names)),
+     ('name', 'in', list({name for _, name in declared_stages}))],
+    ['name', 'team_ids'],
+    lambda row: [(team_names[tid], row['name']) for tid in row['team_ids'] if tid in team_names],
+)
 
-    print(f"\n  [{team_name}]")
+total_stages = 0
+for team_name, stages in STAGES.items():
+    if team_name not in team_ids:
+        continue
+    note(f"\n  [{team_name}]")
     for name, seq, fold, is_close in stages:
-        rec = env['helpdesk.stage'].search([
-            ('name', '=', name),
-            ('team_ids', 'in', [tid])
-        ], limit=1)
-        if not rec:
-            rec = env['helpdesk.stage'].create({
-                'name': name,
-                'sequence': seq,
-                'fold': fold,
-                'is_close': is_close,
-                'team_ids': [(4, tid)],
-            })
-        stage_ids[(team_name, name)] = rec.id
         total_stages += 1
         tag = " [CLOSE]" if is_close else ""
-        print(f"    ✓ {name} (seq={seq}){tag}")
+        record('created' if (team_name, name) in created else 'unchanged', f"{team_name}/{name}",
+               f"    ✓ {name} (seq={seq}){tag}")
 
 print(f"\n  → {total_stages} stages imported")
 env.cr.commit()
@@ -211,6 +259,7 @@ env.cr.commit()
 # ============================================================
 # TICKET TYPES
 # ============================================================
+section('TICKET TYPES')
 print("\n" + "="*60)
 print("  IMPORTING TICKET TYPES")
 print("="*60)
@@ -235,12 +284,15 @@ TICKET_TYPES = [
     "Backup/Recovery Test", "Infrastructure Maintenance",
 ]
 
-tt_count = 0
+_, created = reconcile(
+    env, 'helpdesk.ticket.type',
+    {tt: {'name': tt} for tt in TICKET_TYPES},
+    [('name', 'in', TICKET_TYPES)], ['name'],
+    lambda row: [row['name']],
+)
 for tt in TICKET_TYPES:
-    rec = env['helpdesk.ticket.type'].search([('name', '=', tt)], limit=1)
-    if not rec:
-        env['helpdesk.ticket.type'].create({'name': tt})
-    tt_count += 1
+    record('created' if tt in created else 'unchanged', tt, f"  ✓ {tt}")
+tt_count = len(TICKET_TYPES)
 
 print(f"  → {tt_count} ticket types imported")
 env.cr.commit()
@@ -248,6 +300,7 @@ env.cr.commit()
 # ============================================================
 # SLA POLICIES
 # ============================================================
+section('SLA POLICIES')
 print("\n" + "="*60)
 print("  IMPORTING SLA POLICIES")
 print("="*60)
@@ -300,30 +353,46 @@ SLAS = {
     ],
 }
 
-sla_count = 0
+declared_slas = {}  # (sla_name, team_id) -> create vals
+sla_lines = []  # (team_name, key or None if its stage is missing, sla_name, console line)
 for team_name, slas in SLAS.items():
     tid = team_ids.get(team_name)
     if not tid:
         continue
-    print(f"\n  [{team_name}]")
     for sla_name, priority, target_stage, hours, days in slas:
         sid = stage_ids.get((team_name, target_stage))
         if not sid:
-            print(f"    ✗ Stage '{target_stage}' not found")
+            sla_lines.append((team_name, None, sla_name, f"    ✗ Stage '{target_stage}' not found"))
             continue
-        rec = env['helpdesk.sla'].search([('name', '=', sla_name), ('team_id', '=', tid)], limit=1)
-        if not rec:
-            env['helpdesk.sla'].create({
-                'name': sla_name,
-                'team_id': tid,
-                'priority': priority,
-                'stage_id': sid,
-                'time': hours,
-                'time_days': days,
-            })
-        sla_count += 1
+        declared_slas[(sla_name, tid)] = {
+            'name': sla_name,
+            'team_id': tid,
+            'priority': priority,
+            'stage_id': sid,
+            'time': hours,
+            'time_days': days,
+        }
         t = f"{hours}h" if hours else f"{days}d"
-        print(f"    ✓ {sla_name} → {target_stage} ({t})")
+        sla_lines.append((team_name, (sla_name, tid), sla_name, f"    ✓ {sla_name} → {target_stage} ({t})"))
+
+_, created = reconcile(
+    env, 'helpdesk.sla', declared_slas,
+    [('team_id', 'in', list(team_ids.values())),
+     ('name', 'in', list({name for name, _ in declared_slas}))],
+    ['name', 'team_id'],
+    lambda row: [(row['name'], m2o_id(row['team_id']))],
+)
+
+heading = None
+for team_name, key, sla_name, line in sla_lines:
+    if team_name != heading:
+        note(f"\n  [{team_name}]")
+        heading = team_name
+    if key is None:
+        record('error', sla_name, line)
+    else:
+        record('created' if key in created else 'unchanged', sla_name, line)
+sla_count = len(declared_slas)
 
 print(f"\n  → {sla_count} SLA policies imported")
 env.cr.commit()
@@ -331,6 +400,7 @@ env.cr.commit()
 # ============================================================
 # ROUTES (AUTOMATED ACTIONS)
 # ============================================================
+section('ROUTES')
 print("\n" + "="*60)
 print("  IMPORTING ROUTES (AUTOMATED ACTIONS)")
 print("="*60)
@@ -344,16 +414,94 @@ write_date_field = env['ir.model.fields'].search([
 ], limit=1)
 write_date_id = write_date_field.id
 
+stage_field = env['ir.model.fields'].search([
+    ('model', '=', 'helpdesk.ticket'),
+    ('name', '=', 'stage_id')
+], limit=1)
+
+# On-create and stage-change routes are no longer one base.automation
+# each. Every handler is a plain server action and one dispatcher
+# automation per trigger looks the ticket up in a table generated from
+# the route definitions below:
+#   on_create: team id -> [action ids]
+#   on_write:  (team id, old stage id, new stage id) -> [action ids]
+# on_time routes keep their own automation (they need a date filter).
+DISPATCH = {'on_create': {}, 'on_write': {}}
+dispatched_names = []
+
+# Existing handler actions, read once (automations own server actions
+# too, so only plain ones count)
+handler_rows = {row['name']: row for row in env['ir.actions.server'].search_read(
+    [('model_id', '=', model_id), ('usage', '=', 'ir_actions_server'), ('state', '=', 'code')],
+    ['name', 'code'])}
+
+
+# Route handlers shipped as methods by the wml_itsm_helpdesk addon
+route_handler_keys = set()
+if env['ir.module.module'].search_count([('name', '=', 'wml_itsm_helpdesk'), ('state', '=', 'installed')]):
+    route_handler_keys = set(env['helpdesk.ticket']._itsm_route_keys())
+    print(f"  Route handlers: wml_itsm_helpdesk installed ({len(route_handler_keys)} handlers)")
+else:
+    print("  Route handlers: wml_itsm_helpdesk not installed - using inline code")
+
+
+def route_key(name):
+    """Handler key of a route in wml_itsm_helpdesk ('INC: Start Work' -> 'inc_start_work')."""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
 def get_stage(team, name):
     return stage_ids.get((team, name), False)
 
+
+def upsert_handler(name, code):
+    """Server action holding a route's code; returns (id, status)."""
+    row = handler_rows.get(name)
+    if not row:
+        action = env['ir.actions.server'].create({
+            'name': name,
+            'model_id': model_id,
+            'state': 'code',
+            'usage': 'ir_actions_server',
+            'code': code,
+        })
+        return action.id, 'created'
+    if row['code'] != code:
+        env['ir.actions.server'].browse(row['id']).write({'code': code})
+        return row['id'], 'code updated'
+    return row['id'], 'exists'
+
+
 def create_route(name, team_name, trigger, code, from_stage=None, to_stage=None, target_stage=None, close_stage=None, days=None):
-    """Create a single automation route."""
+    """Register a route: a dispatched handler, or an automation for on_time."""
     tid = team_ids[team_name]
+    code = code.strip()
+    handler_key = route_key(name)
+    if handler_key in route_handler_keys:
+        # The addon method replaces the inline code
+        if trigger == 'on_time':
+            code = "records._itsm_route(%r, close_stage_id={CLOSE_STAGE_ID})" % handler_key
+        else:
+            code = "records._itsm_route(%r)" % handler_key
 
-    existing = env['base.automation'].search([('name', '=', name)], limit=1)
-    if existing:
-        print(f"    ○ {name} (exists)")
+    if trigger in ('on_create', 'on_write'):
+        if trigger == 'on_create':
+            key = tid
+        else:
+            fs = get_stage(team_name, from_stage)
+            ts = get_stage(team_name, to_stage)
+            if not fs or not ts:
+                record('error', name, f"    ✗ {name} - stage not found (from={from_stage}, to={to_stage})")
+                return
+            key = (tid, fs, ts)
+        action_id, status = upsert_handler(name, code)
+        DISPATCH[trigger].setdefault(key, []).append(action_id)
+        dispatched_names.append(name)
+        label = f"({from_stage} → {to_stage})" if trigger == 'on_write' else "(On Create)"
+        if status == 'created':
+            record('created', name, f"    ✓ {name}  {label}")
+        else:
+            record('updated' if status == 'code updated' else 'unchanged', name, f"    ○ {name} ({status})")
         return
 
     vals = {
@@ -361,51 +509,60 @@ def create_route(name, team_name, trigger, code, from_stage=None, to_stage=None,
         'model_id': model_id,
         'state': 'code',
         'active': True,
-        'code': code.strip(),
+        'code': code,
     }
 
-    if trigger == 'on_create':
-        vals['trigger'] = 'on_create'
-        vals['filter_domain'] = "[('team_id', '=', %d)]" % tid
-
-    elif trigger == 'on_write':
-        fs = get_stage(team_name, from_stage)
-        ts = get_stage(team_name, to_stage)
-        if not fs or not ts:
-            print(f"    ✗ {name} - stage not found (from={from_stage}, to={to_stage})")
-            return
-        vals['trigger'] = 'on_write'
-        vals['filter_domain'] = "[('team_id', '=', %d), ('stage_id', '=', %d)]" % (tid, ts)
-        vals['filter_pre_domain'] = "[('stage_id', '=', %d)]" % fs
-
-    elif trigger == 'on_time':
-        ts = get_stage(team_name, target_stage)
-        cs = get_stage(team_name, close_stage)
-        if not ts or not cs:
-            print(f"    ✗ {name} - stage not found")
-            return
-        vals['trigger'] = 'on_time'
-        vals['trg_date_id'] = write_date_id
-        vals['trg_date_range'] = days
-        vals['trg_date_range_type'] = 'day'
-        vals['filter_domain'] = "[('team_id', '=', %d), ('stage_id', '=', %d)]" % (tid, ts)
-        vals['code'] = code.strip().replace('{CLOSE_STAGE_ID}', str(cs))
+    ts = get_stage(team_name, target_stage)
+    cs = get_stage(team_name, close_stage)
+    if not ts or not cs:
+        record('error', name, f"    ✗ {name} - stage not found")
+        return
+    vals['trigger'] = 'on_time'
+    vals['trg_date_id'] = write_date_id
+    vals['trg_date_range'] = days
+    vals['trg_date_range_type'] = 'day'
+    vals['filter_domain'] = "[('team_id', '=', %d), ('stage_id', '=', %d)]" % (tid, ts)
+    vals['code'] = code.replace('{CLOSE_STAGE_ID}', str(cs))
+
+    existing = env['base.automation'].search([('name', '=', name)], limit=1)
+    if existing:
+        # Only the handler code is kept in sync on existing routes
+        if existing.code != vals['code']:
+            existing.write({'code': vals['code']})
+            record('updated', name, f"    ○ {name} (code updated)")
+        else:
+            record('unchanged', name, f"    ○ {name} (exists)")
+        return
 
     try:
         env['base.automation'].create(vals)
-        if trigger == 'on_write':
-            print(f"    ✓ {name}  ({from_stage} → {to_stage})")
-        elif trigger == 'on_time':
-            print(f"    ✓ {name}  (After {days}d)")
-        else:
-            print(f"    ✓ {name}  (On Create)")
+        record('created', name, f"    ✓ {name}  (After {days}d)")
     except Exception as e:
-        print(f"    ✗ {name} - ERROR: {e}")
+        record('error', name, f"    ✗ {name} - ERROR: {e}")
+
+
+# Shared handler for the "auto-close after N days" routes: the whole
+# recordset due in this run moves in one write and the closing notes are
+# logged in one batch instead of one write + message_post per ticket.
+AUTO_CLOSE_CODE = """
+closed_stage = env['helpdesk.stage'].browse({CLOSE_STAGE_ID})
+tickets = records.filtered(lambda t: t.stage_id != closed_stage)
+if tickets:
+    tickets.write({'stage_id': closed_stage.id})
+    tickets._message_log_batch(bodies=dict.fromkeys(tickets.ids, {NOTE}))
+"""
+
+
+def create_auto_close_route(name, team_name, note, target_stage, close_stage, days):
+    """on_time route closing tickets left in target_stage for `days` days."""
+    code = AUTO_CLOSE_CODE.replace('{NOTE}', repr(note))
+    create_route(name, team_name, "on_time", code,
+                 target_stage=target_stage, close_stage=close_stage, days=days)
 
 
 # ---- INCIDENT MANAGEMENT ----
 tn = "Incident Management"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("INC: Auto-Acknowledge", tn, "on_create", """
 if record.partner_id and record.partner_id.email:
@@ -454,12 +611,8 @@ if record.partner_id:
     record.message_post(body='Your incident has been closed. Thank you for contacting IT Support.', message_type='notification', partner_ids=[record.partner_id.id])
 """, from_stage="Resolved", to_stage="Closed")
 
-create_route("INC: Auto-Close After 5 Days", tn, "on_time", """
-closed_stage = env['helpdesk.stage'].browse({CLOSE_STAGE_ID})
-for ticket in records:
-    ticket.write({'stage_id': closed_stage.id})
-    ticket.message_post(body='Incident auto-closed after 5 days with no response.')
-""", target_stage="Resolved", close_stage="Closed", days=5)
+create_auto_close_route("INC: Auto-Close After 5 Days", tn, 'Incident auto-closed after 5 days with no response.',
+                        target_stage="Resolved", close_stage="Closed", days=5)
 
 create_route("INC: Reopen Ticket", tn, "on_write", """
 record.message_post(body='Incident reopened.')
@@ -471,7 +624,7 @@ env.cr.commit()
 
 # ---- SERVICE REQUEST ----
 tn = "Service Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("SR: Auto-Acknowledge", tn, "on_create", """
 record.message_post(body='Service request received. Your request is being processed.')
@@ -499,18 +652,14 @@ if record.partner_id:
     record.message_post(body='Your service request has been completed. Please confirm.', message_type='notification', partner_ids=[record.partner_id.id])
 """, from_stage="In Progress", to_stage="Resolved")
 
-create_route("SR: Auto-Close After 3 Days", tn, "on_time", """
-closed_stage = env['helpdesk.stage'].browse({CLOSE_STAGE_ID})
-for ticket in records:
-    ticket.write({'stage_id': closed_stage.id})
-    ticket.message_post(body='Request auto-closed after 3 days with no response.')
-""", target_stage="Resolved", close_stage="Closed", days=3)
+create_auto_close_route("SR: Auto-Close After 3 Days", tn, 'Request auto-closed after 3 days with no response.',
+                        target_stage="Resolved", close_stage="Closed", days=3)
 
 env.cr.commit()
 
 # ---- CHANGE MANAGEMENT ----
 tn = "Change Management"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("CHG: Submit for Review", tn, "on_write", """
 record.message_post(body='Change request submitted for CAB review.')
@@ -552,7 +701,7 @@ env.cr.commit()
 
 # ---- PROBLEM MANAGEMENT ----
 tn = "Problem Management"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("PRB: Assign Investigation", tn, "on_write", """
 record.message_post(body='Problem assigned for investigation.')
@@ -582,7 +731,7 @@ env.cr.commit()
 
 # ---- ASSET REQUEST ----
 tn = "Asset Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("AST: Auto-Acknowledge", tn, "on_create", """
 record.message_post(body='Asset request received. Checking entitlement and availability.')
@@ -612,7 +761,7 @@ env.cr.commit()
 
 # ---- ACCESS REQUEST ----
 tn = "Access Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("ACC: Data Owner Approval", tn, "on_write", """
 record.message_post(body='Access request sent to data owner for approval.')
@@ -638,18 +787,14 @@ if record.partner_id:
     record.message_post(body='Your access request could not be approved.', message_type='notification', partner_ids=[record.partner_id.id])
 """, from_stage="Security Review", to_stage="Rejected")
 
-create_route("ACC: Auto-Confirm After 3 Days", tn, "on_time", """
-closed_stage = env['helpdesk.stage'].browse({CLOSE_STAGE_ID})
-for ticket in records:
-    ticket.write({'stage_id': closed_stage.id})
-    ticket.message_post(body='Access auto-confirmed after 3 days.')
-""", target_stage="Access Granted", close_stage="Confirmed", days=3)
+create_auto_close_route("ACC: Auto-Confirm After 3 Days", tn, 'Access auto-confirmed after 3 days.',
+                        target_stage="Access Granted", close_stage="Confirmed", days=3)
 
 env.cr.commit()
 
 # ---- GENERAL INQUIRY ----
 tn = "General Inquiry"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("INQ: Auto-Acknowledge", tn, "on_create", """
 record.message_post(body='Thank you for your inquiry. A team member will respond shortly.')
@@ -665,18 +810,14 @@ if record.partner_id:
     record.message_post(body='Your inquiry has been answered. Please let us know if you need anything else.', message_type='notification', partner_ids=[record.partner_id.id])
 """, from_stage="In Progress", to_stage="Answered")
 
-create_route("INQ: Auto-Close After 5 Days", tn, "on_time", """
-closed_stage = env['helpdesk.stage'].browse({CLOSE_STAGE_ID})
-for ticket in records:
-    ticket.write({'stage_id': closed_stage.id})
-    ticket.message_post(body='Inquiry auto-closed after 5 days.')
-""", target_stage="Answered", close_stage="Closed", days=5)
+create_auto_close_route("INQ: Auto-Close After 5 Days", tn, 'Inquiry auto-closed after 5 days.',
+                        target_stage="Answered", close_stage="Closed", days=5)
 
 env.cr.commit()
 
 # ---- ONBOARDING ----
 tn = "Onboarding Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("ONB: Generate Checklist", tn, "on_create", """
 checklist = 'Onboarding Checklist:\\n- Create AD/Email account\\n- Provision laptop/workstation\\n- Configure required software\\n- Set up phone/extension\\n- Create badge/access card\\n- Assign to security groups\\n- Schedule Day 1 orientation\\n- Prepare welcome documentation'
@@ -691,7 +832,7 @@ env.cr.commit()
 
 # ---- OFFBOARDING ----
 tn = "Offboarding Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("OFF: Generate Revocation Checklist", tn, "on_create", """
 checklist = 'Offboarding Security Checklist:\\n- Backup mailbox and files\\n- Disable AD account\\n- Revoke VPN access\\n- Disable badge/physical access\\n- Remove from security groups\\n- Collect laptop/equipment\\n- Collect mobile devices\\n- Transfer shared resources\\n- Archive account\\n- Final security audit'
@@ -706,7 +847,7 @@ env.cr.commit()
 
 # ---- MAINTENANCE ----
 tn = "Maintenance Request"
-print(f"\n  [{tn}]")
+note(f"\n  [{tn}]")
 
 create_route("MNT: Approved", tn, "on_write", """
 record.message_post(body='Maintenance window approved. User notifications should be sent.')
@@ -722,9 +863,79 @@ record.message_post(body='Maintenance completed successfully. All systems operat
 
 env.cr.commit()
 
+# ============================================================
+# ROUTE DISPATCHERS
+# ============================================================
+section('ROUTE DISPATCHERS')
+print("\n" + "="*60)
+print("  IMPORTING ROUTE DISPATCHERS")
+print("="*60)
+
+DISPATCH_RUN = """for action_id in ROUTES.get(KEY, []):
+    env['ir.actions.server'].browse(action_id).with_context(
+        active_model='helpdesk.ticket', active_id=record.id, active_ids=record.ids).run()
+"""
+
+CREATE_DISPATCHER_CODE = """
+# Generated by itsm_shell_importer.py - team id -> handler action ids
+ROUTES = %r
+for record in records:
+    """ + DISPATCH_RUN.replace('KEY', 'record.team_id.id').replace('\n', '\n    ')
+
+WRITE_DISPATCHER_CODE = """
+# Generated by itsm_shell_importer.py - (team id, old stage id, new stage id) -> handler action ids
+ROUTES = %r
+old_values = env.context.get('old_values') or {}
+for record in records:
+    old_stage = (old_values.get(record.id) or {}).get('stage_id')
+    if isinstance(old_stage, (list, tuple)):
+        old_stage = old_stage[0]
+    """ + DISPATCH_RUN.replace('KEY', '(record.team_id.id, old_stage, record.stage_id.id)').replace('\n', '\n    ')
+
+DISPATCHERS = [
+    ("ITSM: Route Dispatcher (On Create)", 'on_create', CREATE_DISPATCHER_CODE % DISPATCH['on_create']),
+    ("ITSM: Route Dispatcher (On Stage Change)", 'on_write', WRITE_DISPATCHER_CODE % DISPATCH['on_write']),
+]
+
+for name, trigger, code in DISPATCHERS:
+    code = code.strip()
+    existing = env['base.automation'].search([('name', '=', name)], limit=1)
+    if existing:
+        if existing.code != code:
+            existing.write({'code': code})
+            record('updated', name, f"  ○ {name} (table updated)")
+        else:
+            record('unchanged', name, f"  ○ {name} (exists)")
+        continue
+    vals = {
+        'name': name,
+        'model_id': model_id,
+        'state': 'code',
+        'active': True,
+        'trigger': trigger,
+        'code': code,
+    }
+    if trigger == 'on_write':
+        # Only stage changes can match a route
+        vals['trigger_field_ids'] = [(6, 0, stage_field.ids)]
+    env['base.automation'].create(vals)
+    record('created', name, f"  ✓ {name}  ({len(DISPATCH[trigger])} keys)")
+
+# Per-route automations from earlier runs are replaced by the dispatchers
+old_automations = env['base.automation'].search([
+    ('name', 'in', dispatched_names),
+    ('trigger', 'in', ['on_create', 'on_write']),
+])
+if old_automations:
+    old_automations.write({'active': False})
+    print(f"  → Archived {len(old_automations)} per-route automations")
+
+env.cr.commit()
+
 # ============================================================
 # SUMMARY
 # ============================================================
+section('SUMMARY')
 print("\n" + "="*60)
 print("  IMPORT COMPLETE")
 print("="*60)
@@ -733,7 +944,7 @@ print(f"  Teams:            {len(team_ids)}")
 print(f"  Stages:           {total_stages}")
 print(f"  Ticket Types:     {tt_count}")
 print(f"  SLA Policies:     {sla_count}")
-print(f"  Routes:           Check Settings → Technical → Automations")
+print(f"  Routes:           {len(dispatched_names)} dispatched handlers + on_time automations")
 print("="*60)
 print("\n  NEXT STEPS:")
 print("  1. Helpdesk → Configuration → Teams → Assign members")
@@ -741,3 +952,5 @@ print("  2. Settings → Users → Groups → Assign ITSM roles")
 print("  3. Helpdesk → Configuration → SLA → Adjust times")
 print("  4. Settings → Technical → Automations → Verify routes")
 print()
+
+finish_run()
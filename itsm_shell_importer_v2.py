@@ -7,6 +7,22 @@ DB: servicedesk.westmetro.ng
 
 Adds missing stages and full route set to ALL request types.
 
+Set ITSM_WORKERS to split the request types across that many processes,
+each with its own connection and transaction (default 1).
+
+Routes are committed every ITSM_COMMIT_BATCH request types (default
+50), and the types of each commit are journaled with it
+(itsm_journal.py). If a run dies halfway, rerun it with
+ITSM_RESUME=<run id> (printed at the start) or ITSM_RESUME=last to skip
+the types already done.
+
+Progress is shown as a bar per step; ITSM_VERBOSITY=2 prints every
+request type (see itsm_progress.py).
+
+Requires itsm_common.py, itsm_journal.py, itsm_parallel.py,
+itsm_progress.py and itsm_report.py in the same directory
+(ITSM_SCRIPT_DIR).
+
 Run:
     cd /opt/odoo/odoo
     sudo -u odoo python3 odoo-bin shell -c /opt/odoo/conf/odoo.conf -d servicedesk.westmetro.ng --no-http < /path/to/itsm_shell_importer_v2.py
@@ -14,6 +30,26 @@ Run:
 Author: WestMetro Limited | www.westmetrong.com
 """
 
+import os
+import sys
+
+# Scripts are piped through odoo-bin shell, so locate the shared helpers explicitly
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+if ITSM_SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, ITSM_SCRIPT_DIR)
+
+from itsm_common import m2o_id, write_if_changed
+from itsm_journal import open_journal
+from itsm_parallel import WORKERS, run_partitioned
+from itsm_progress import expect, record
+from itsm_report import finish_run, section, start_run
+
+start_run(env, 'itsm_shell_importer_v2')
+journal = open_journal(env, 'itsm_shell_importer_v2')
+
+# Request types per route commit in step 4
+COMMIT_BATCH_SIZE = max(1, int(os.environ.get('ITSM_COMMIT_BATCH', 50)))
+
 # ============================================================
 # STAGE TEMPLATE (matching 3P-API setup)
 # ============================================================
@@ -50,6 +86,7 @@ ROUTE_TEMPLATE = [
 # ============================================================
 # STEP 1: GET ALL REQUEST TYPES
 # ============================================================
+section('STEP 1: REQUEST TYPES')
 print("\n" + "="*60)
 print("  WML ITSM BULK IMPORTER v2")
 print("  Bureaucrat/CRND Service Desk")
@@ -59,168 +96,244 @@ all_types = env['request.type'].search([('active', '=', True)])
 print(f"\n  Found {len(all_types)} active request types")
 
 # ============================================================
-# STEP 2: ADD MISSING STAGES TO EACH TYPE
+# STEPS 2-4: STAGES, START STAGES AND ROUTES PER TYPE
 # ============================================================
-print("\n" + "="*60)
-print("  IMPORTING STAGES")
-print("="*60)
-
-total_stages_created = 0
-total_stages_skipped = 0
-
-for rtype in all_types:
-    existing_stages = env['request.stage'].search([
-        ('request_type_id', '=', rtype.id)
-    ])
-    existing_codes = {s.code: s for s in existing_stages}
-
-    created_this_type = 0
-    for name, code, seq, closed, type_id in STAGE_TEMPLATE:
-        if code in existing_codes:
-            # Stage exists - check if type_id needs updating
-            stage = existing_codes[code]
-            updates = {}
-            if stage.type_id.id != type_id and type_id:
-                updates['type_id'] = type_id
-            if stage.closed != closed:
-                updates['closed'] = closed
-            if stage.sequence != seq:
-                updates['sequence'] = seq
-            if updates:
-                stage.write(updates)
-            total_stages_skipped += 1
+# Every stage and route is scoped by request_type_id, so the steps below
+# run per share of types, in this process or in itsm_parallel workers.
+TOTAL_KEYS = ('stages_created', 'stages_skipped', 'stages_updated', 'start_stages',
+              'routes_created', 'routes_removed', 'routes_skipped')
+
+
+def apply_routes(env, stale_route_ids, new_route_vals):
+    """Unlink and create the queued routes in one call each, then empty the queues."""
+    if stale_route_ids:
+        env['request.stage.route'].browse(stale_route_ids).unlink()
+    if new_route_vals:
+        env['request.stage.route'].create(new_route_vals)
+    stale_route_ids.clear()
+    new_route_vals.clear()
+
+
+def import_types(env, type_ids):
+    """Import stages and routes for the given request types; returns (totals, errors)."""
+    all_types = env['request.type'].browse(type_ids)
+
+    # ============================================================
+    # STEP 2: ADD MISSING STAGES TO EACH TYPE
+    # ============================================================
+    section('STEP 2: STAGES')
+    expect(len(all_types))
+    print("\n" + "="*60)
+    print("  IMPORTING STAGES")
+    print("="*60)
+
+    total_stages_created = 0
+    total_stages_skipped = 0
+    stage_updates = {}  # id -> declared attributes
+    stage_rows = {}     # id -> attributes as found
+
+    # One read for every stage of every type, grouped in memory
+    stage_ids_by_type = {rtype.id: {} for rtype in all_types}  # type id -> {code: stage id}
+    for row in env['request.stage'].search_read(
+            [('request_type_id', 'in', all_types.ids)],
+            ['code', 'request_type_id', 'type_id', 'closed', 'sequence']):
+        stage_ids_by_type[m2o_id(row['request_type_id'])].setdefault(row['code'], row['id'])
+        stage_rows[row['id']] = row
+
+    new_stage_vals = []
+    for rtype in all_types:
+        existing_codes = stage_ids_by_type[rtype.id]
+
+        created_this_type = 0
+        for name, code, seq, closed, type_id in STAGE_TEMPLATE:
+            if code in existing_codes:
+                # Stage exists - queue its attributes, written below only if changed
+                stage_id = existing_codes[code]
+                stage_updates[stage_id] = {'closed': closed, 'sequence': seq}
+                if type_id:
+                    stage_updates[stage_id]['type_id'] = type_id
+                total_stages_skipped += 1
+                continue
+
+            # Queue missing stage
+            new_stage_vals.append({
+                'name': name,
+                'code': code,
+                'sequence': seq,
+                'closed': closed,
+                'type_id': type_id,
+                'request_type_id': rtype.id,
+                'active': True,
+            })
+            created_this_type += 1
+            total_stages_created += 1
+
+        if created_this_type > 0:
+            record('created', rtype.code, f"  ✓ {rtype.code}: +{created_this_type} stages")
+        else:
+            record('unchanged', rtype.code, f"  ○ {rtype.code}: stages complete")
+
+    if new_stage_vals:
+        new_stages = env['request.stage'].create(new_stage_vals)
+        for vals, stage_id in zip(new_stage_vals, new_stages.ids):
+            stage_ids_by_type[vals['request_type_id']][vals['code']] = stage_id
+
+    stages_updated = write_if_changed(env, 'request.stage', stage_updates, current=stage_rows)
+
+    env.cr.commit()
+    print(f"\n  → Created: {total_stages_created} | Existing: {total_stages_skipped} | Updated: {len(stages_updated)}")
+
+    # ============================================================
+    # STEP 3: SET start_stage_id FOR EACH TYPE
+    # ============================================================
+    section('STEP 3: START STAGES')
+    print("\n" + "="*60)
+    print("  SETTING START STAGES")
+    print("="*60)
+
+    # Through the ORM, so request.type constraints, dependents, tracking
+    # and automations still run. Every type has its own 'new' stage, so
+    # no two types take the same value and this is one write per type
+    # whose start stage is wrong: the queries of this step grow with
+    # the types on a first run, and are none on a rerun.
+    start_count = 0
+    for rtype in all_types:
+        new_stage_id = stage_ids_by_type[rtype.id].get('new')
+        if new_stage_id and rtype.start_stage_id.id != new_stage_id:
+            rtype.write({'start_stage_id': new_stage_id})
+            start_count += 1
+
+    env.cr.commit()
+    print(f"  → Updated {start_count} start stages")
+
+    # ============================================================
+    # STEP 4: REMOVE OLD New→Closed ROUTES & CREATE FULL ROUTES
+    # ============================================================
+    section('STEP 4: ROUTES')
+    expect(len(all_types))
+    print("\n" + "="*60)
+    print("  IMPORTING ROUTES")
+    print("="*60)
+
+    total_routes_created = 0
+    total_routes_removed = 0
+    total_routes_skipped = 0
+    errors = []
+
+    # Whole route table for the active types, indexed by (type, from, to)
+    route_index = {}
+    for row in env['request.stage.route'].search_read(
+            [('request_type_id', 'in', all_types.ids)],
+            ['request_type_id', 'stage_from_id', 'stage_to_id']):
+        key = (m2o_id(row['request_type_id']), m2o_id(row['stage_from_id']), m2o_id(row['stage_to_id']))
+        route_index.setdefault(key, []).append(row['id'])
+
+    stale_route_ids = []
+    new_route_vals = []
+    for index, rtype in enumerate(all_types):
+        if index and index % COMMIT_BATCH_SIZE == 0:
+            # Checkpoint: the types journaled so far are committed with their routes
+            apply_routes(env, stale_route_ids, new_route_vals)
+            journal.commit(env)
+
+        # Stages for this type keyed by code (read or created in step 2)
+        stage_map = stage_ids_by_type[rtype.id]
+
+        # Verify all required stages exist
+        missing = [code for _, code, _, _, _ in STAGE_TEMPLATE if code not in stage_map]
+        if missing:
+            errors.append(f"  ✗ {rtype.code}: missing stages {missing}")
+            record('error', rtype.code, errors[-1])
             continue
+        journal.mark('STEPS 2-4', rtype.id)
 
-        # Create missing stage
-        env['request.stage'].create({
-            'name': name,
-            'code': code,
-            'sequence': seq,
-            'closed': closed,
-            'type_id': type_id,
-            'request_type_id': rtype.id,
-            'active': True,
-        })
-        created_this_type += 1
-        total_stages_created += 1
-
-    if created_this_type > 0:
-        print(f"  ✓ {rtype.code}: +{created_this_type} stages")
-
-env.cr.commit()
-print(f"\n  → Created: {total_stages_created} | Existing: {total_stages_skipped}")
-
-# ============================================================
-# STEP 3: SET start_stage_id FOR EACH TYPE
-# ============================================================
-print("\n" + "="*60)
-print("  SETTING START STAGES")
-print("="*60)
-
-start_count = 0
-for rtype in all_types:
-    new_stage = env['request.stage'].search([
-        ('request_type_id', '=', rtype.id),
-        ('code', '=', 'new')
-    ], limit=1)
-    if new_stage and rtype.start_stage_id.id != new_stage.id:
-        rtype.write({'start_stage_id': new_stage.id})
-        start_count += 1
-
-env.cr.commit()
-print(f"  → Updated {start_count} start stages")
-
-# ============================================================
-# STEP 4: REMOVE OLD New→Closed ROUTES & CREATE FULL ROUTES
-# ============================================================
-print("\n" + "="*60)
-print("  IMPORTING ROUTES")
-print("="*60)
-
-total_routes_created = 0
-total_routes_removed = 0
-total_routes_skipped = 0
-errors = []
-
-for rtype in all_types:
-    # Get all stages for this type keyed by code
-    stages = env['request.stage'].search([
-        ('request_type_id', '=', rtype.id)
-    ])
-    stage_map = {s.code: s for s in stages}
-
-    # Verify all required stages exist
-    missing = [code for _, code, _, _, _ in STAGE_TEMPLATE if code not in stage_map]
-    if missing:
-        errors.append(f"  ✗ {rtype.code}: missing stages {missing}")
-        continue
-
-    # Remove old direct New→Closed route
-    old_routes = env['request.stage.route'].search([
-        ('request_type_id', '=', rtype.id),
-        ('stage_from_id', '=', stage_map['new'].id),
-        ('stage_to_id', '=', stage_map['close'].id),
-    ])
-    if old_routes:
-        old_routes.unlink()
+        # Queue old direct New→Closed route for removal
+        old_routes = route_index.pop((rtype.id, stage_map['new'], stage_map['close']), [])
+        stale_route_ids.extend(old_routes)
         total_routes_removed += len(old_routes)
 
-    # Get existing routes for this type
-    existing_routes = env['request.stage.route'].search([
-        ('request_type_id', '=', rtype.id)
-    ])
-    existing_pairs = {(r.stage_from_id.id, r.stage_to_id.id) for r in existing_routes}
-
-    created_this_type = 0
-    for rname, from_code, to_code, close, seq, btn_style in ROUTE_TEMPLATE:
-        from_stage = stage_map.get(from_code)
-        to_stage = stage_map.get(to_code)
-
-        if not from_stage or not to_stage:
-            continue
-
-        # Skip if route already exists
-        if (from_stage.id, to_stage.id) in existing_pairs:
-            total_routes_skipped += 1
-            continue
-
-        env['request.stage.route'].create({
-            'name': rname,
-            'sequence': seq,
-            'stage_from_id': from_stage.id,
-            'stage_to_id': to_stage.id,
-            'request_type_id': rtype.id,
-            'close': close,
-            'button_style': btn_style,
-            'website_published': True,
-        })
-        created_this_type += 1
-        total_routes_created += 1
-
-    if created_this_type > 0:
-        print(f"  ✓ {rtype.code}: +{created_this_type} routes")
-
-env.cr.commit()
+        created_this_type = 0
+        for rname, from_code, to_code, close, seq, btn_style in ROUTE_TEMPLATE:
+            from_id = stage_map.get(from_code)
+            to_id = stage_map.get(to_code)
+
+            if not from_id or not to_id:
+                continue
+
+            # Skip if route already exists
+            if (rtype.id, from_id, to_id) in route_index:
+                total_routes_skipped += 1
+                continue
+
+            new_route_vals.append({
+                'name': rname,
+                'sequence': seq,
+                'stage_from_id': from_id,
+                'stage_to_id': to_id,
+                'request_type_id': rtype.id,
+                'close': close,
+                'button_style': btn_style,
+                'website_published': True,
+            })
+            created_this_type += 1
+            total_routes_created += 1
+
+        if created_this_type > 0:
+            record('created', rtype.code, f"  ✓ {rtype.code}: +{created_this_type} routes")
+        else:
+            record('unchanged', rtype.code, f"  ○ {rtype.code}: routes complete")
+
+    apply_routes(env, stale_route_ids, new_route_vals)
+    journal.commit(env)
+    print(f"\n  → Created: {total_routes_created} | Removed old: {total_routes_removed} | Existing: {total_routes_skipped}")
+
+    return {
+        'stages_created': total_stages_created,
+        'stages_skipped': total_stages_skipped,
+        'stages_updated': len(stages_updated),
+        'start_stages': start_count,
+        'routes_created': total_routes_created,
+        'routes_removed': total_routes_removed,
+        'routes_skipped': total_routes_skipped,
+    }, errors
+
+
+# A resumed run only imports the types not journaled as finished
+finished_ids = journal.done_ids('STEPS 2-4')
+pending_ids = [type_id for type_id in all_types.ids if type_id not in finished_ids]
+skipped_types = len(all_types) - len(pending_ids)
+if skipped_types:
+    print(f"  Skipping {skipped_types} request types finished by run {journal.run_id}")
+
+totals = dict.fromkeys(TOTAL_KEYS, 0)
+worker_totals, errors = run_partitioned(env, pending_ids, import_types, WORKERS)
+totals.update(worker_totals)
+journal.finish()
 
 if errors:
     print("\n  ERRORS:")
     for e in errors:
         print(e)
 
-print(f"\n  → Created: {total_routes_created} | Removed old: {total_routes_removed} | Existing: {total_routes_skipped}")
-
 # ============================================================
 # SUMMARY
 # ============================================================
+section('SUMMARY')
 print("\n" + "="*60)
 print("  IMPORT COMPLETE")
 print("="*60)
-print(f"  Request Types processed:  {len(all_types)}")
-print(f"  Stages created:           {total_stages_created}")
-print(f"  Stages already existed:   {total_stages_skipped}")
-print(f"  Routes created:           {total_routes_created}")
-print(f"  Old New→Closed removed:   {total_routes_removed}")
-print(f"  Routes already existed:   {total_routes_skipped}")
+print(f"  Request Types processed:  {len(pending_ids)}")
+if skipped_types:
+    print(f"  Already done (resumed):   {skipped_types}")
+print(f"  Run:                      {journal.run_id}")
+print(f"  Workers:                  {WORKERS}")
+print(f"  Stages created:           {totals['stages_created']}")
+print(f"  Stages already existed:   {totals['stages_skipped']}")
+print(f"  Stages updated:           {totals['stages_updated']}")
+print(f"  Start stages set:         {totals['start_stages']}")
+print(f"  Routes created:           {totals['routes_created']}")
+print(f"  Old New→Closed removed:   {totals['routes_removed']}")
+print(f"  Routes already existed:   {totals['routes_skipped']}")
 print("="*60)
 
 # Verify totals
@@ -231,3 +344,5 @@ print(f"  Stages: {final_stages}")
 print(f"  Routes: {final_routes}")
 print("="*60)
 print()
+
+finish_run()
@@ -7,6 +7,17 @@ DB: servicedesk.westmetro.ng
 
 Creates 6 teams and maps all 17 services to the correct team.
 
+Open requests created before their service was mapped are then moved
+to the service's team (step 4), in chunks of ITSM_BACKFILL_CHUNK
+requests (default 1000), one short transaction each, so it can run on
+the live database.
+
+Progress is shown as a bar per step; ITSM_VERBOSITY=2 prints every
+team and service (see itsm_progress.py).
+
+Requires itsm_common.py, itsm_progress.py and itsm_report.py in the same
+directory (ITSM_SCRIPT_DIR).
+
 Run:
     cd /opt/odoo/odoo
     sudo -u odoo python3 odoo-bin shell -c /opt/odoo/conf/odoo.conf -d servicedesk.westmetro.ng --no-http < /path/to/itsm_teams_v3.py
@@ -14,6 +25,21 @@ Run:
 Author: WestMetro Limited | www.westmetrong.com
 """
 
+import os
+import sys
+import time
+
+# Scripts are piped through odoo-bin shell, so locate the shared helpers explicitly
+ITSM_SCRIPT_DIR = os.environ.get('ITSM_SCRIPT_DIR', '/opt/odoo')
+if ITSM_SCRIPT_DIR not in sys.path:
+    sys.path.insert(0, ITSM_SCRIPT_DIR)
+
+from itsm_common import flush, invalidate
+from itsm_progress import expect, record
+from itsm_report import finish_run, section, start_run
+
+start_run(env, 'itsm_teams_v3')
+
 # ============================================================
 # TEAM DEFINITIONS
 # ============================================================
@@ -82,6 +108,7 @@ SERVICE_TEAM_MAP = {
 # ============================================================
 # STEP 1: CREATE TEAMS
 # ============================================================
+section('STEP 1: TEAMS')
 print("\n" + "="*60)
 print("  WML ITSM TEAM SETUP v3")
 print("="*60)
@@ -103,9 +130,9 @@ for t in TEAMS:
             'active': True,
             'leader_id': DEFAULT_LEADER_ID,
         })
-        print(f"  ✓ Created: {t['name']} (id={rec.id})")
+        record('created', t['name'], f"  ✓ Created: {t['name']} (id={rec.id})")
     else:
-        print(f"  ○ Exists:  {t['name']} (id={rec.id})")
+        record('unchanged', t['name'], f"  ○ Exists:  {t['name']} (id={rec.id})")
     team_ids[t['name']] = rec.id
 
 env.cr.commit()
@@ -114,32 +141,40 @@ print(f"\n  → {len(team_ids)} teams ready")
 # ============================================================
 # STEP 2: ASSIGN TEAMS TO SERVICES
 # ============================================================
+section('STEP 2: SERVICE TEAMS')
 print("\n" + "-"*60)
 print("  MAPPING SERVICES → TEAMS")
 print("-"*60)
 
 mapped = 0
 unmapped = []
+moves = {}  # team id -> ids of the services to move to it
 all_services = env['generic.service'].search([('active', '=', True)])
+expect(len(all_services))
 
 for svc in all_services:
     team_name = SERVICE_TEAM_MAP.get(svc.name)
     if not team_name:
         unmapped.append(svc.name)
+        record('skipped', svc.name, f"  ○ {svc.name} (no team mapping)")
         continue
 
     tid = team_ids.get(team_name)
     if not tid:
-        print(f"  ✗ Team '{team_name}' not found for service '{svc.name}'")
+        record('error', svc.name, f"  ✗ Team '{team_name}' not found for service '{svc.name}'")
         continue
 
     if svc.team_id.id != tid:
-        svc.write({'team_id': tid})
-        print(f"  ✓ {svc.name} → {team_name}")
+        moves.setdefault(tid, []).append(svc.id)
+        record('updated', svc.name, f"  ✓ {svc.name} → {team_name}")
     else:
-        print(f"  ○ {svc.name} → {team_name} (already set)")
+        record('unchanged', svc.name, f"  ○ {svc.name} → {team_name} (already set)")
     mapped += 1
 
+# One write per team, on all the services moving to it
+for tid, service_ids in moves.items():
+    env['generic.service'].browse(service_ids).write({'team_id': tid})
+
 env.cr.commit()
 
 if unmapped:
@@ -152,6 +187,7 @@ print(f"\n  → {mapped} services mapped to teams")
 # ============================================================
 # STEP 3: CREATE ASSIGNMENT POLICY FOR REQUESTS
 # ============================================================
+section('STEP 3: ASSIGNMENT POLICY')
 print("\n" + "-"*60)
 print("  SETTING UP ASSIGNMENT POLICY")
 print("-"*60)
@@ -172,7 +208,7 @@ user_field = env['ir.model.fields'].search([
 ], limit=1)
 
 if not req_model or not team_field:
-    print("  ✗ Could not find request.request model or team_id field")
+    record('error', 'ITSM Team Assignment', "  ✗ Could not find request.request model or team_id field")
 else:
     # Check if policy already exists
     policy = env['generic.assign.policy'].search([
@@ -191,7 +227,7 @@ else:
             policy_vals['assign_user_field_id'] = user_field.id
 
         policy = env['generic.assign.policy'].create(policy_vals)
-        print(f"  ✓ Created policy: ITSM Team Assignment (id={policy.id})")
+        record('created', policy.name, f"  ✓ Created policy: ITSM Team Assignment (id={policy.id})")
 
         # Create rule: assign by team with round-robin
         rule = env['generic.assign.policy.rule'].create({
@@ -203,30 +239,126 @@ else:
             'assign_team_choice_type': 'least_loaded',
             'assign_team_sort_direction': 'asc',
         })
-        print(f"  ✓ Created rule: Round Robin by Team (id={rule.id})")
+        record('created', rule.name, f"  ✓ Created rule: Round Robin by Team (id={rule.id})")
     else:
-        print(f"  ○ Policy already exists (id={policy.id})")
+        record('unchanged', policy.name, f"  ○ Policy already exists (id={policy.id})")
 
 env.cr.commit()
 
+# ============================================================
+# STEP 4: BACKFILL TEAM ON OPEN REQUESTS
+# ============================================================
+# Requests keep the team they were created with, so the ones opened
+# before their service was (re)mapped carry a stale or empty team_id.
+# It is recomputed from the service with set-based UPDATEs over chunks
+# of requests taken in id order (keyset pagination, no OFFSET), each
+# chunk in its own short transaction. A chunk whose rows stay locked by
+# users past the lock timeout is retried, then skipped: rerun the
+# script to pick it up.
+section('STEP 4: REQUEST TEAMS')
+print("\n" + "-"*60)
+print("  BACKFILLING TEAMS OF OPEN REQUESTS")
+print("-"*60)
+
+BACKFILL_CHUNK = int(os.environ.get('ITSM_BACKFILL_CHUNK', 1000))
+BACKFILL_LOCK_TIMEOUT = '2s'
+BACKFILL_ATTEMPTS = 3
+RETRYABLE_PGCODES = ('55P03', '40P01')  # lock_not_available, deadlock_detected
+
+
+def backfill_chunk(request_ids):
+    """Move the requests of one chunk to their service's team; returns [(id, new team id)]."""
+    env.cr.execute("SET LOCAL lock_timeout = %s", [BACKFILL_LOCK_TIMEOUT])
+    env.cr.execute("""
+        UPDATE request_request AS r
+           SET team_id = s.team_id,
+               write_uid = %s,
+               write_date = (now() at time zone 'UTC')
+          FROM generic_service AS s
+         WHERE r.id = ANY(%s)
+           AND s.id = r.service_id
+           AND s.team_id IS NOT NULL
+           AND r.team_id IS DISTINCT FROM s.team_id
+     RETURNING r.id, r.team_id
+    """, [env.uid, request_ids], log_exceptions=False)
+    return env.cr.fetchall()
+
+
+# Step 2 wrote through the ORM: make sure the SQL below sees it
+flush(env['generic.service'], ['team_id'])
+flush(env['request.request'], ['team_id', 'service_id', 'closed'])
+
+moved_by_team = {}  # team id -> requests moved to it
+skipped_chunks = 0
+last_id = 0
+while True:
+    env.cr.execute("""
+        SELECT id FROM request_request
+         WHERE id > %s AND service_id IS NOT NULL AND closed IS NOT TRUE
+         ORDER BY id
+         LIMIT %s
+    """, [last_id, BACKFILL_CHUNK])
+    request_ids = [row[0] for row in env.cr.fetchall()]
+    if not request_ids:
+        break
+    last_id = request_ids[-1]
+
+    for attempt in range(1, BACKFILL_ATTEMPTS + 1):
+        try:
+            moved = backfill_chunk(request_ids)
+            break
+        except Exception as e:
+            if getattr(e, 'pgcode', None) not in RETRYABLE_PGCODES:
+                raise
+            env.cr.rollback()
+            if attempt < BACKFILL_ATTEMPTS:
+                time.sleep(attempt)  # let the user's transaction finish
+    else:
+        skipped_chunks += 1
+        record('error', f"requests {request_ids[0]}-{last_id}",
+               f"  ✗ Requests {request_ids[0]}-{last_id}: still locked after {BACKFILL_ATTEMPTS} attempts, skipped")
+        continue
+
+    if moved:
+        # Raw SQL bypassed the ORM: drop the cached teams and let fields
+        # computed from team_id be recomputed (flushed by the commit)
+        requests = env['request.request'].browse([request_id for request_id, _ in moved])
+        invalidate(requests, ['team_id'])
+        requests.modified(['team_id'])
+        for _, tid in moved:
+            moved_by_team[tid] = moved_by_team.get(tid, 0) + 1
+    env.cr.commit()
+
+backfilled = sum(moved_by_team.values())
+team_names = {row['id']: row['name'] for row in env['generic.team'].browse(list(moved_by_team)).read(['name'])}
+for tid, count in sorted(moved_by_team.items(), key=lambda item: team_names[item[0]]):
+    print(f"  {team_names[tid]}: {count} requests")
+print(f"\n  → {backfilled} open requests moved to their service's team")
+if skipped_chunks:
+    print(f"  ⚠ {skipped_chunks} chunks skipped on locked rows - rerun the script to finish them")
+
 # ============================================================
 # SUMMARY
 # ============================================================
+section('SUMMARY')
 print("\n" + "="*60)
 print("  SETUP COMPLETE")
 print("="*60)
 print(f"  Teams created:        {len(team_ids)}")
 print(f"  Services mapped:      {mapped}")
+print(f"  Requests backfilled:  {backfilled}")
+
+# Show final mapping, from one grouped read of the services of all teams
+services_by_team = {}
+for group in env['generic.service'].read_group(
+        [('team_id', 'in', list(team_ids.values()))], ['name:array_agg'], ['team_id']):
+    services_by_team[group['team_id'][0]] = sorted(group['name'])
 
-# Show final mapping
 print(f"\n  TEAM → SERVICE MAPPING:")
 for team_name in [t['name'] for t in TEAMS]:
-    tid = team_ids[team_name]
-    services = env['generic.service'].search([('team_id', '=', tid)])
-    svc_names = ', '.join(s.name for s in services) if services else '(none)'
     print(f"    {team_name}:")
-    for s in services:
-        print(f"      • {s.name}")
+    for svc_name in services_by_team.get(team_ids[team_name], []):
+        print(f"      • {svc_name}")
 
 print("\n" + "="*60)
 print("  NEXT STEPS:")
@@ -237,3 +369,5 @@ print("  4. Test: create a request for a FIBER-* type,")
 print("     verify it routes to Connectivity & Infrastructure")
 print("="*60)
 print()
+
+finish_run()